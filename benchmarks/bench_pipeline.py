@@ -0,0 +1,158 @@
+"""This modules implements the benchmark of the ETL and plots stages on
+synthetic sources scaled from the bundled data. Each stage runs twice in
+new processes: once timed, reporting its wall time and its max RSS, and
+once under tracemalloc, which slows it down, reporting its peak memory.
+
+    python -m benchmarks.bench_pipeline --scales 1,10 --output bench.json
+"""
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+import io
+import json
+import multiprocessing
+import tempfile
+import time
+import tracemalloc
+import click
+import yaml
+from scripts.profiling import peak_rss
+from scripts.utils import parse_config
+from benchmarks.synthetic import synthetic_config
+
+# stages measured at each scale, in the order they run
+STAGES = ["etl", "etl_streaming", "plots_load", "plot_graph1", "plot_graph2"]
+
+
+def measure(stage: str, config_path: str, trace: bool) -> dict:
+    """
+    This function executes a stage and measures it, in the process of a
+    single-worker pool so the peak RSS belongs to the stage
+    Args:
+        stage (str): name of the stage, one of STAGES.
+        config_path (str): path of the synthetic config file.
+        trace (bool): measures the peak memory with tracemalloc.
+    Returns:
+        dict: seconds and max RSS of the process in bytes, or the
+            tracemalloc peak in bytes when trace is set.
+    """
+    # the imports are measured apart from the stage
+    from scripts.etl import ExchangeETL
+    from scripts.plots import GeneratePlots
+
+    with redirect_stdout(io.StringIO()):
+        plots = None
+        if stage in ("plot_graph1", "plot_graph2"):
+            plots = GeneratePlots(config_path)
+
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        if stage == "etl":
+            ExchangeETL(config_path).processing()
+        elif stage == "etl_streaming":
+            etl = ExchangeETL(config_path)
+            etl.config['etl']['streaming'] = True
+            etl.processing()
+        elif stage == "plots_load":
+            GeneratePlots(config_path)
+        else:
+            getattr(plots, stage)()
+        seconds = time.perf_counter() - start
+        if trace:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return {'traced_peak': peak}
+
+    return {'seconds': seconds, 'max_rss': peak_rss()}
+
+
+def run_stage(stage: str, config_path: str) -> dict:
+    """
+    This function measures a stage in new processes, the timed run apart
+    from the traced one
+    Args:
+        stage (str): name of the stage.
+        config_path (str): path of the synthetic config file.
+    Returns:
+        dict: the measures of the stage.
+    """
+    result = {}
+    context = multiprocessing.get_context("spawn")
+    for trace in (False, True):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result.update(
+                pool.submit(measure, stage, config_path, trace).result())
+    return result
+
+
+@click.command()
+@click.argument("config_file", type=str, default="./config.yml")
+@click.option("--scales", default="1,10,100",
+              help="Comma separated scales of the rows of the sources.")
+@click.option("--extra-currencies", type=int, default=0,
+              help="Synthetic currencies added to both sources.")
+@click.option("--currencies", default=None,
+              help='Currencies processed, e.g. "all" (default: config).')
+@click.option("--downsample", default=None,
+              help='Downsampling of the plot lines, "minmax" or "lttb".')
+@click.option("--stages", default=",".join(STAGES),
+              help="Comma separated stages to measure.")
+@click.option("--workdir", default=None,
+              help="Directory of the synthetic data (default: temporary).")
+@click.option("--output", default=None, help="Path of the json report.")
+def benchmark(config_file: str, scales: str, extra_currencies: int,
+              currencies: str, downsample: str, stages: str, workdir: str,
+              output: str) -> None:
+    """
+    Benchmark function that measures the pipeline stages on synthetic data
+    Args:
+        config_file (str): path to the config file of the repository
+        scales (str): comma separated scales of the rows of the sources
+        extra_currencies (int): synthetic currencies added to both sources
+        currencies (str): currencies processed, overriding the config
+        downsample (str): downsampling of the plot lines
+        stages (str): comma separated stages to measure
+        workdir (str): directory of the synthetic data
+        output (str): path of the json report
+    """
+    config = parse_config(config_file)
+    if currencies is not None:
+        config['etl']['currencies'] = \
+            currencies if currencies == "all" else currencies.split(",")
+    if downsample is not None:
+        config['plots']['downsample'] = downsample
+
+    results = []
+    with tempfile.TemporaryDirectory() as temporary:
+        root = Path(workdir or temporary)
+        for scale in [int(scale) for scale in scales.split(",")]:
+            directory = root / f"scale_{scale}"
+            scaled = synthetic_config(config, directory, scale,
+                                      extra_currencies)
+            config_path = directory / "config.yml"
+            config_path.write_text(yaml.safe_dump(scaled), encoding="utf-8")
+            source_bytes = sum(Path(source['path']).stat().st_size
+                               for source in scaled['etl']['sources'])
+
+            # the plots read the processed data written by the etl
+            if "etl" not in stages.split(","):
+                run_stage("etl", str(config_path))
+
+            for stage in stages.split(","):
+                result = {'scale': scale, 'stage': stage,
+                          'source_bytes': source_bytes,
+                          **run_stage(stage, str(config_path))}
+                results.append(result)
+                click.echo(f"scale {scale:>4}  {stage:<14}"
+                           f"{result['seconds']:>9.3f} s"
+                           f"{result['traced_peak'] / 2 ** 20:>10.1f} MiB traced"
+                           f"{result['max_rss'] / 2 ** 20:>10.1f} MiB rss")
+
+    if output is not None:
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    benchmark()
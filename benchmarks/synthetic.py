@@ -0,0 +1,141 @@
+"""
+This module implements the functions that generate synthetic sources
+with the shape of the ECB and Fed files, scaled in rows and currencies,
+and the config pointing the pipeline to them.
+"""
+from pathlib import Path
+import copy
+import numpy as np
+import pandas as pd
+
+# dates covered by each source, as in the bundled data
+ECB_DATES = ("1999-01-04", "2021-11-18")
+FED_DATES = ("2000-01-03", "2019-12-31")
+
+
+def timestamps(start: str, end: str, scale: int) -> pd.DatetimeIndex:
+    """
+    This function returns the business days between start and end with
+    scale evenly spaced timestamps in each day, like intraday rates
+    Args:
+        start (str): first day.
+        end (str): last day.
+        scale (int): timestamps per day.
+    Returns:
+        pd.DatetimeIndex: the sorted timestamps.
+    """
+    days = pd.bdate_range(start, end)
+    offsets = pd.to_timedelta(np.arange(scale) * (24 / scale), unit='h')
+    return pd.DatetimeIndex((days.values[:, None] + offsets.values).ravel())
+
+
+def random_rates(rows: int, columns: int, seed: int) -> np.ndarray:
+    """
+    This function returns positive random walks of exchange rates
+    Args:
+        rows (int): number of dates.
+        columns (int): number of currencies.
+        seed (int): seed of the generator.
+    Returns:
+        np.ndarray: the rates with shape (rows, columns).
+    """
+    generator = np.random.default_rng(seed)
+    levels = generator.uniform(0.5, 100.0, size=columns)
+    steps = generator.normal(0.0, 0.004, size=(rows, columns))
+    return levels * np.exp(np.cumsum(steps, axis=0))
+
+
+def write_ecb(path: Path, scale: int, codes: list, seed: int = 0) -> int:
+    """
+    This function writes an ECB shaped file: newest date first, one column
+    per currency code and the HXL hashtag row below the header
+    Args:
+        path (Path): path of the csv file.
+        scale (int): timestamps per business day.
+        codes (list): currency codes of the columns.
+        seed (int): seed of the generator.
+    Returns:
+        int: number of rows written.
+    """
+    dates = timestamps(*ECB_DATES, scale)[::-1]
+    dataframe = pd.DataFrame(random_rates(len(dates), len(codes), seed),
+                             columns=codes)
+    dataframe.insert(0, 'Date', dates.strftime('%Y-%m-%d %H:%M:%S')
+                     if scale > 1 else dates.strftime('%Y-%m-%d'))
+
+    hxl = ['#date'] + [f'#value+{code.lower()}' for code in codes]
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        file.write(','.join(dataframe.columns) + '\n')
+        file.write(','.join(hxl) + '\n')
+        dataframe.to_csv(file, header=False, index=False,
+                         float_format='%.10g')
+    return len(dataframe)
+
+
+def write_fed(path: Path, scale: int, columns: dict, seed: int = 1) -> int:
+    """
+    This function writes a Fed shaped file: oldest date first, an unnamed
+    index column, one column per currency name and 'ND' markers
+    Args:
+        path (Path): path of the csv file.
+        scale (int): timestamps per business day.
+        columns (dict): column name of each currency code.
+        seed (int): seed of the generator.
+    Returns:
+        int: number of rows written.
+    """
+    dates = timestamps(*FED_DATES, scale)
+    rates = random_rates(len(dates), len(columns), seed)
+    dataframe = pd.DataFrame(rates.round(6),
+                             columns=list(columns.values())).astype(str)
+
+    # one percent of the rates without data
+    missing = np.random.default_rng(seed).random(rates.shape) < 0.01
+    dataframe = dataframe.mask(missing, 'ND')
+
+    dataframe.insert(0, 'Time Serie', dates.strftime('%Y-%m-%d %H:%M:%S')
+                     if scale > 1 else dates.strftime('%Y-%m-%d'))
+    dataframe.to_csv(path, index=True, index_label='')
+    return len(dataframe)
+
+
+def synthetic_config(config: dict, directory: Path, scale: int,
+                     extra_currencies: int = 0) -> dict:
+    """
+    This function writes the synthetic sources of a scale in directory and
+    returns the config of the pipeline reading them
+    Args:
+        config (dict): the parsed config file of the repository.
+        directory (Path): directory of the sources, outputs and logs.
+        scale (int): timestamps per business day.
+        extra_currencies (int): currencies added to both sources.
+    Returns:
+        dict: the config of the synthetic pipeline.
+    """
+    config = copy.deepcopy(config)
+    directory.mkdir(parents=True, exist_ok=True)
+    etl = config['etl']
+
+    ecb, fed = (next(source for source in etl['sources']
+                     if source['name'] == name) for name in ['ecb', 'fed'])
+
+    extra = [f'X{number:02d}' for number in range(extra_currencies)]
+    ecb_codes = list(ecb['schema']['currency_columns']) + extra
+    fed_columns = dict(fed['schema']['currency_columns'])
+    fed_columns.update({code: f'SYNTHETIC - {code}/US$' for code in extra})
+
+    ecb['schema']['currency_columns'] = ecb_codes
+    fed['schema']['currency_columns'] = fed_columns
+    ecb['path'] = str(directory / 'ECB_FX_USD-base.csv')
+    fed['path'] = str(directory / 'Foreign_Exchange_Rates.csv')
+    etl['processed_path'] = str(directory / 'processed_data.csv')
+
+    write_ecb(Path(ecb['path']), scale, ecb_codes)
+    write_fed(Path(fed['path']), scale, fed_columns)
+
+    for key in config['log']:
+        config['log'][key] = str(directory / 'log' / f'{key}.log')
+    for key in ['plot1_path', 'plot2_path']:
+        config['plots'][key] = str(directory / Path(config['plots'][key]).name)
+    config['build']['manifest_path'] = str(directory / 'manifest.json')
+    return config
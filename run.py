@@ -1,83 +1,311 @@
 """This modules implements basic cli to perform executation of the ETL
-and visualization pipeline
+and visualization pipeline. pandas and matplotlib are only imported by the
+stages that are executed, so checking an up to date pipeline is fast.
+
+    python run.py [all|etl|plot|status|serve] [CONFIG_FILE] [OPTIONS]
 """
+from functools import partial
 from pathlib import Path
+from typing import List
+import logging
+import tracemalloc
 import click
-from scripts.etl import ExchangeETL
-from scripts.plots import GeneratePlots
-from scripts.utils import parse_config, set_logger
+from scripts.build import BuildGraph, Stage
+from scripts.commands import serve
+from scripts.paths import (aggregate_paths, columnar_path, database_path,
+                           series_index_path)
+from scripts.profiling import ProfileCollector
+from scripts.context import PipelineContext
 
+# source files of the stages, a change in the code rebuilds their outputs
+SCRIPTS_DIR = Path(__file__).parent / "scripts"
 
-@click.command()
-@click.argument("config_file", type=str, default="./config.yml")
-def etl(config_file: str) -> None:
+# stages executed by the command plot
+PLOT_STAGES = ["plot1", "plot2", "charts"]
+
+# keys of the plots section read by each plot stage, fingerprinted with it
+PLOT_KEYS = {"plot1": ["plot1_path", "downsample", "terms"],
+             "plot2": ["plot2_path", "downsample", "windows"],
+             "charts": ["downsample", "terms", "windows", "render_jobs"]}
+
+
+def run_etl(context: PipelineContext, incremental: bool, jobs: int) -> None:
     """
-    ETL function that load raw data, apply transformations and export data
+    This function executes the ETL stage, publishing the processed data in
+    the context for the plots
     Args:
-        config_file (str): path to config file
+        context (PipelineContext): context of the run
+        incremental (bool): update the processed dataframe with the new dates
+        jobs (int): number of processes loading the raw data
+    """
+    # imported by the stage, it loads pandas
+    from scripts.etl import ExchangeETL
+    ExchangeETL(context=context).processing(incremental=incremental,
+                                            jobs=jobs)
+
+
+def run_plot1(context: PipelineContext) -> None:
+    """
+    This function executes the stage of the first plot
+    Args:
+        context (PipelineContext): context of the run
+    """
+    # imported by the stage, it loads pandas and matplotlib
+    from scripts.plots import GeneratePlots
+    GeneratePlots(context=context, currencies=['BRL']).plot_graph1()
+
+
+def run_plot2(context: PipelineContext) -> None:
+    """
+    This function executes the stage of the second plot
+    Args:
+        context (PipelineContext): context of the run
+    """
+    # imported by the stage, it loads pandas and matplotlib
+    from scripts.plots import GeneratePlots
+    GeneratePlots(context=context, currencies=['BRL']).plot_graph2()
+
+
+def run_charts(context: PipelineContext, jobs: int) -> None:
+    """
+    This function executes the stage of the charts of the render jobs
+    Args:
+        context (PipelineContext): context of the run
+        jobs (int): number of processes rendering the charts
+    """
+    # imported by the stage, it loads pandas and matplotlib
+    from scripts.plots import RenderJob, render_jobs
+    render_jobs([RenderJob(**job)
+                 for job in context.config['plots']['render_jobs']],
+                processes=jobs, context=context)
+
+
+def plot_config(config: dict, stage: str) -> dict:
+    """
+    This function returns the part of the plots section a plot stage
+    depends on, so changing the settings of a plot does not rebuild the others
+    Args:
+        config (dict): the parsed config file
+        stage (str): name of the plot stage
+    Returns:
+        dict: the keys of the plots section read by the stage
+    """
+    return {key: config['plots'].get(key) for key in PLOT_KEYS[stage]}
+
+
+def build_graph(context: PipelineContext, incremental: bool = False,
+                jobs: int = 1) -> BuildGraph:
+    """
+    This function creates the graph raw data -> processed data -> plots
+    Args:
+        context (PipelineContext): context of the run, with the parsed config
+        incremental (bool): update the processed dataframe with the new dates
+        jobs (int): number of processes loading the raw data
     Returns:
-        None
+        BuildGraph: the graph of the pipeline stages
+    """
+    config = context.config
+
+    # the file read by the plots and all the files written by the ETL
+    processed_data = str(columnar_path(config) or config['etl']['processed_path'])
+    processed_outputs = [processed_data]
+    if processed_data != config['etl']['processed_path'] and \
+            config['etl'].get('keep_csv', True):
+        processed_outputs.append(config['etl']['processed_path'])
+    processed_outputs += [str(path) for path in aggregate_paths(config)]
+
+    # the plots read the database when it is enabled
+    plot_data = [processed_data]
+    if database_path(config) is not None:
+        processed_outputs.append(str(database_path(config)))
+        plot_data.append(str(database_path(config)))
+
+    # the plots map the series store in memory when it is enabled
+    if series_index_path(config) is not None:
+        processed_outputs.append(str(series_index_path(config)))
+        plot_data.append(str(series_index_path(config)))
+
+    graph = BuildGraph(config['build']['manifest_path'])
+    graph.add_stage(Stage(
+        "etl", partial(run_etl, context, incremental, jobs),
+        inputs=[source['path'] for source in config['etl']['sources']] +
+               [str(SCRIPTS_DIR / "etl.py"),
+                str(SCRIPTS_DIR / "sources.py"),
+                str(SCRIPTS_DIR / "store.py"),
+                str(SCRIPTS_DIR / "database.py"),
+                str(SCRIPTS_DIR / "aggregates.py"),
+                str(SCRIPTS_DIR / "validation.py"),
+                str(SCRIPTS_DIR / "series.py")],
+        outputs=processed_outputs,
+        config=dict(config['etl'], aggregates=config.get('aggregates'),
+                    validation=config.get('validation'),
+                    series=config.get('series'))))
+    graph.add_stage(Stage(
+        "plot1", partial(run_plot1, context),
+        inputs=plot_data + [str(SCRIPTS_DIR / "plots.py"),
+                            str(SCRIPTS_DIR / "rendering.py"),
+                            str(SCRIPTS_DIR / "series.py")],
+        outputs=[config['plots']['plot1_path']],
+        config=plot_config(config, "plot1"), depends=["etl"]))
+    graph.add_stage(Stage(
+        "plot2", partial(run_plot2, context),
+        inputs=plot_data + [str(SCRIPTS_DIR / "plots.py"),
+                            str(SCRIPTS_DIR / "rendering.py"),
+                            str(SCRIPTS_DIR / "series.py")],
+        outputs=[config['plots']['plot2_path']],
+        config=plot_config(config, "plot2"), depends=["etl"]))
+    if config['plots'].get('render_jobs'):
+        graph.add_stage(Stage(
+            "charts", partial(run_charts, context, jobs),
+            inputs=plot_data + [str(SCRIPTS_DIR / "plots.py"),
+                                str(SCRIPTS_DIR / "rendering.py"),
+                                str(SCRIPTS_DIR / "series.py")],
+            outputs=[job['output'] for job in config['plots']['render_jobs']],
+            config=plot_config(config, "charts"), depends=["etl"]))
+    return graph
+
+
+def run_pipeline(config_file: str, stages: List[str] = None,
+                 incremental: bool = False, force: bool = False,
+                 jobs: int = 1, profile: str = None,
+                 trace_memory: bool = False) -> None:
+    """
+    This function executes the outdated stages of the pipeline
+    Args:
+        config_file (str): path to config file
+        stages (List[str]): names of the stages to execute, the stages
+            missing in the graph are ignored; all the stages when None
+        incremental (bool): update the processed dataframe with the new dates
+        force (bool): execute the stages even if they are up to date
+        jobs (int): number of processes executing independent stages
+        profile (str): path of the json summary of the steps
+        trace_memory (bool): measure the python allocations of each step
     """
-    # parsing the configuration file YAML
-    config = parse_config(config_file)
+    # parsing the configuration file YAML once for all the stages
+    context = PipelineContext(config_file)
 
     # configuring the logger for this module
-    logger = set_logger("run", config['log']['log_run_path'])
-
-    # initializing files for verification
-    processed_data = Path(config['etl']['processed_path'])
-    plot1 = Path(config['plots']['plot1_path'])
-    plot2 = Path(config['plots']['plot2_path'])
-
-    # initalizing objects
-    etl_pipeline = ExchangeETL(config_file)
-    plot_pipeline = GeneratePlots(config_file)
-
-    logger.info("Verifying if the processed dataframe file is already exists.")
-    if processed_data.is_file() is False:
-        logger.info(
-            "The processed dataframe file doesn'exist, so the ETL will be performed.")
-        etl_pipeline.processing()
-        logger.info(
-            "------ The ETL operations was terminated successfully -------")
-
-        logger.info("Verifying if the plot1.png file is already exists.")
-        if plot1.is_file() is False:
-            logger.info("Generating the plot1")
-            plot_pipeline.plot_graph1()
-            logger.info("------- The plot1 was saved successfully --------")
-
-        else:
-            logger.info("------- The plot1 already exists --------")
-
-        logger.info("Verifying if the plot2.png file is already exists.")
-        if plot2.is_file() is False:
-            logger.info("Generating the plot2")
-            plot_pipeline.plot_graph2()
-            logger.info("------- The plot2 was saved successfully --------")
-        else:
-            logger.info("------- The plot2 already exists --------")
-
-    else:
-        logger.info(
-            "--------The processed dataframe file already exists.-------")
-
-        logger.info("Verifying if the plot1.png file is already exists.")
-        if plot1.is_file() is False:
-            logger.info("Generating the plot1")
-            plot_pipeline.plot_graph1()
-            logger.info("------- The plot1 was saved successfully --------")
-        else:
-            logger.info("------- The plot1 already exists --------")
-
-        logger.info("Verifying if the plot2.png file is already exists.")
-        if plot2.is_file() is False:
-            logger.info("Generating the plot2")
-            plot_pipeline.plot_graph2()
-            logger.info("------- The plot2 was saved successfully --------")
-        else:
-            logger.info("------- The plot2 already exists --------")
+    logger = context.logger("run", 'log_run_path')
+
+    # collecting the measures of the steps logged by all the stages
+    collector = ProfileCollector()
+    logging.getLogger().addHandler(collector)
+    if trace_memory:
+        tracemalloc.start()
+
+    # executing only the stages whose inputs changed since the last run
+    logger.info("Verifying which stages of the pipeline are outdated.")
+    graph = build_graph(context, incremental, jobs)
+    if stages is not None:
+        stages = [name for name in stages if name in graph.stages]
+    try:
+        executed = graph.run(logger, force=force, jobs=jobs, stages=stages)
+    finally:
+        logging.getLogger().removeHandler(collector)
+    logger.info("------ The pipeline was terminated successfully, executed "
+                "stages: %s -------", ", ".join(executed) or "none")
+
+    # exporting the summary of the steps
+    if profile is not None:
+        collector.write(profile)
+        logger.info("The profile of %d steps was exported to %s.",
+                    len(collector.records), profile)
+
+
+def pipeline_options(command):
+    """
+    This function adds the config file argument and the options of the
+    execution of the stages to a command
+    """
+    options = [
+        click.argument("config_file", type=str, default="./config.yml"),
+        click.option("--force", is_flag=True,
+                     help="Execute the stages even if they are up to date."),
+        click.option("--jobs", "-j", type=click.IntRange(min=1), default=1,
+                     help="Number of processes executing independent "
+                          "stages."),
+        click.option("--profile", type=str, default=None,
+                     help="Path of a json summary of the time, rows and "
+                          "memory of each step."),
+        click.option("--trace-memory", is_flag=True,
+                     help="Measure the python allocations of each step with "
+                          "tracemalloc, which slows the pipeline down.")]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+# option of the commands executing the ETL stage
+incremental_option = click.option(
+    "--incremental", is_flag=True,
+    help="Merge only the new dates of the raw data into the existing "
+         "processed dataframe.")
+
+
+@click.group(invoke_without_command=True)
+@click.pass_context
+def cli(context: click.Context) -> None:
+    """
+    ETL and visualization pipeline, all the stages when no command is given
+    """
+    if context.invoked_subcommand is None:
+        context.invoke(all_stages)
+
+
+@cli.command("all")
+@pipeline_options
+@incremental_option
+def all_stages(config_file: str, force: bool, jobs: int, profile: str,
+               trace_memory: bool, incremental: bool) -> None:
+    """
+    Load the raw data, apply the transformations and export the data and
+    the plots
+    """
+    run_pipeline(config_file, None, incremental, force, jobs, profile,
+                 trace_memory)
+
+
+@cli.command()
+@pipeline_options
+@incremental_option
+def etl(config_file: str, force: bool, jobs: int, profile: str,
+        trace_memory: bool, incremental: bool) -> None:
+    """
+    Load the raw data, apply the transformations and export the data
+    """
+    run_pipeline(config_file, ["etl"], incremental, force, jobs, profile,
+                 trace_memory)
+
+
+@cli.command()
+@pipeline_options
+def plot(config_file: str, force: bool, jobs: int, profile: str,
+         trace_memory: bool) -> None:
+    """
+    Export the plots and the charts of the processed data
+    """
+    run_pipeline(config_file, PLOT_STAGES, False, force, jobs, profile,
+                 trace_memory)
+
+
+@cli.command()
+@click.argument("config_file", type=str, default="./config.yml")
+@click.option("--exit-code", is_flag=True,
+              help="Exit with status 1 when a stage is outdated.")
+def status(config_file: str, exit_code: bool) -> None:
+    """
+    Report which stages are outdated, without importing pandas
+    """
+    outdated = build_graph(PipelineContext(config_file)).status()
+    for name, stage_outdated in outdated.items():
+        click.echo(f"{name}: {'outdated' if stage_outdated else 'up to date'}")
+    if exit_code and any(outdated.values()):
+        raise SystemExit(1)
+
+
+# the server of the rates, shared with python -m scripts.serve
+cli.add_command(serve)
 
 
 if __name__ == '__main__':
-    etl()
+    cli()
@@ -0,0 +1,289 @@
+"""
+This module implements the functions responsible to compute the aggregates
+materialized by the ETL next to the processed store: the rolling means and
+volatilities of each currency, the open, high, low and close of each period
+of a frequency and the statistics of named periods, e.g. the presidential
+terms. Given the last date of the materialized tables, each function only
+computes the rows changed by the later dates.
+"""
+from typing import Callable, Dict, List
+from functools import partial
+from pathlib import Path
+import json
+import numpy as np
+import pandas as pd
+from .paths import aggregate_names, aggregate_path, aggregates_manifest_path
+from .store import read_table, write_table
+
+# columns of the table of the periods
+PERIOD_COLUMNS = ['period', 'start', 'end', 'currency', 'first', 'last',
+                  'min', 'max', 'mean', 'count']
+
+
+def currency_series(rates: pd.DataFrame) -> Dict[str, pd.Series]:
+    """
+    This function returns the dates with a rate of each currency
+    Args:
+        rates (pd.DataFrame): the rates indexed by the sorted dates.
+    Returns:
+        Dict[str, pd.Series]: the rates of each currency without missing values.
+    """
+    return {currency: rates[currency].dropna() for currency in rates.columns}
+
+
+def rolling_table(rates: pd.DataFrame, windows: List[int],
+                  since: pd.Timestamp = None) -> pd.DataFrame:
+    """
+    This function computes the rolling mean of the rates and the rolling
+    volatility, the standard deviation of the log returns, of each currency
+    over windows of rates
+    Args:
+        rates (pd.DataFrame): the rates indexed by the sorted dates.
+        windows (List[int]): number of rates of each window.
+        since (pd.Timestamp): only the dates after it are computed, all the
+            dates when it is None.
+    Returns:
+        pd.DataFrame: 'Date' and the columns '<currency>_mean_<window>' and
+            '<currency>_vol_<window>'.
+    """
+    dates = rates.index if since is None else rates.index[rates.index > since]
+    history = max(windows)
+    columns = {}
+    for currency, series in currency_series(rates).items():
+        if since is not None:
+            # the new rates and the rates of the longest window before them
+            first = series.index.searchsorted(since, side='right')
+            series = series.iloc[max(first - history, 0):]
+        returns = np.log(series).diff()
+        for window in windows:
+            columns[f"{currency}_mean_{window}"] = series.rolling(window).mean()
+            columns[f"{currency}_vol_{window}"] = returns.rolling(window).std()
+
+    table = pd.DataFrame(columns, index=dates)
+    return table.rename_axis('Date').reset_index()
+
+
+def ohlc_table(rates: pd.DataFrame, freq: str,
+               since: pd.Timestamp = None) -> pd.DataFrame:
+    """
+    This function computes the open, high, low and close rates of each
+    currency in each period of a frequency
+    Args:
+        rates (pd.DataFrame): the rates indexed by the sorted dates.
+        freq (str): pandas period frequency, e.g. "W", "M", "Q" or "Y".
+        since (pd.Timestamp): only the period of since and the later periods
+            are computed, all the periods when it is None.
+    Returns:
+        pd.DataFrame: 'Date', the start of the period, 'currency', 'open',
+            'high', 'low' and 'close', without the periods without rates.
+    """
+    tables = []
+    for currency, series in currency_series(rates).items():
+        if since is not None:
+            first = pd.Period(since, freq).start_time
+            series = series.iloc[series.index.searchsorted(first):]
+        table = series.groupby(series.index.to_period(freq)).agg(
+            ['first', 'max', 'min', 'last'])
+        table.columns = ['open', 'high', 'low', 'close']
+        table.index = table.index.start_time.rename('Date')
+        tables.append(table.reset_index().assign(currency=currency))
+
+    columns = ['Date', 'currency', 'open', 'high', 'low', 'close']
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(tables, ignore_index=True)[columns]
+
+
+def period_table(rates: pd.DataFrame, periods: Dict[str, list],
+                 since: pd.Timestamp = None) -> pd.DataFrame:
+    """
+    This function computes the first and last dates, the minimum, maximum
+    and mean rates and the number of rates of each currency in named periods
+    Args:
+        rates (pd.DataFrame): the rates indexed by the sorted dates.
+        periods (Dict[str, list]): first date and date after the last one of
+            each period, None for a period without end.
+        since (pd.Timestamp): only the periods with dates after it are
+            computed, all the periods when it is None.
+    Returns:
+        pd.DataFrame: the columns of PERIOD_COLUMNS, a row by period and
+            currency.
+    """
+    series = currency_series(rates)
+    rows = []
+    for name, (start, end) in periods.items():
+        start = pd.Timestamp(start)
+        end = pd.NaT if end is None else pd.Timestamp(end)
+        if since is not None and not pd.isna(end) and end <= since:
+            # the period ended before the new dates
+            continue
+
+        for currency, values in series.items():
+            stop = len(values) if pd.isna(end) else \
+                values.index.searchsorted(end)
+            selected = values.iloc[values.index.searchsorted(start):stop]
+            rows.append({'period': name, 'start': start, 'end': end,
+                         'currency': currency,
+                         'first': selected.index.min(),
+                         'last': selected.index.max(),
+                         'min': selected.min(), 'max': selected.max(),
+                         'mean': selected.mean(), 'count': len(selected)})
+
+    return pd.DataFrame(rows, columns=PERIOD_COLUMNS)
+
+
+class AggregateTable():
+    """
+    This class describes a materialized table: the function computing its
+    rows changed by the dates after a date, the columns identifying a row
+    and the columns ordering the rows
+    """
+
+    name: str
+    compute: Callable[..., pd.DataFrame]
+    keys: List[str]
+    order: List[str]
+    dates: List[str]
+
+    def __init__(self, name: str, compute: Callable[..., pd.DataFrame],
+                 keys: List[str], order: List[str] = None,
+                 dates: List[str] = None) -> None:
+        """
+        Constructor to the class AggregateTable
+        Args:
+            name (str): name of the file of the table, without suffix.
+            compute (Callable): function of the rates and since returning
+                the rows of the table.
+            keys (List[str]): columns identifying a row.
+            order (List[str]): columns ordering the rows, the keys when it
+                is None.
+            dates (List[str]): datetime columns, parsed when the table is
+                loaded from a csv.
+        """
+        self.name = name
+        self.compute = compute
+        self.keys = keys
+        self.order = order or keys
+        self.dates = dates or ['Date']
+
+    def path(self, config: dict) -> Path:
+        """
+        This function returns the path of the table
+        """
+        return aggregate_path(config, self.name)
+
+    def materialize(self, rates: pd.DataFrame, config: dict,
+                    since: pd.Timestamp = None) -> int:
+        """
+        This function computes and exports the table. When since is given,
+        the rows computed from the dates after it replace the rows with
+        the same keys of the exported table.
+        Args:
+            rates (pd.DataFrame): the rates indexed by the sorted dates.
+            config (dict): the parsed config file.
+            since (pd.Timestamp): last date of the exported table, None to
+                compute the whole table.
+        Returns:
+            int: number of rows of the table.
+        """
+        table = self.compute(rates, since=since)
+        if since is not None:
+            previous = read_table(self.path(config), self.dates)
+            table = pd.concat([previous, table], ignore_index=True)
+            table = table.drop_duplicates(subset=self.keys, keep='last')
+
+        table = table.sort_values(self.order, kind='stable', ignore_index=True)
+        write_table(table, self.path(config))
+        return len(table)
+
+
+def aggregate_tables(config: dict) -> List[AggregateTable]:
+    """
+    This function returns the tables selected in the aggregates section of
+    the config
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        List[AggregateTable]: the tables, empty when the aggregates are not
+            enabled.
+    """
+    settings = config.get('aggregates') or {}
+    tables = []
+    for name in aggregate_names(config):
+        if name == 'rolling':
+            tables.append(AggregateTable(
+                name, partial(rolling_table,
+                              windows=settings['rolling_windows']),
+                keys=['Date']))
+        elif name == 'periods':
+            tables.append(AggregateTable(
+                name, partial(period_table, periods=settings['periods']),
+                keys=['period', 'currency'],
+                order=['start', 'period', 'currency'],
+                dates=['start', 'end', 'first', 'last']))
+        else:
+            freq = settings['ohlc'][name[len('ohlc_'):]]
+            tables.append(AggregateTable(
+                name, partial(ohlc_table, freq=freq),
+                keys=['Date', 'currency']))
+    return tables
+
+
+def aggregate_settings(config: dict, currencies: List[str]) -> dict:
+    """
+    This function returns the settings that the materialized tables depend
+    on, a change in them recomputes the whole tables
+    Args:
+        config (dict): the parsed config file.
+        currencies (List[str]): the currencies of the processed dataframe.
+    Returns:
+        dict: the settings, as they are loaded from the manifest.
+    """
+    settings = {key: value for key, value in config['aggregates'].items()
+                if key not in ('enabled', 'path')}
+    settings['currencies'] = currencies
+    settings['format'] = config['etl'].get('processed_format', 'csv')
+    return json.loads(json.dumps(settings, default=str))
+
+
+def materialized_since(config: dict, settings: dict) -> pd.Timestamp:
+    """
+    This function returns the last date of the materialized tables, when
+    they exist and were computed with the same settings
+    Args:
+        config (dict): the parsed config file.
+        settings (dict): the settings returned by aggregate_settings.
+    Returns:
+        pd.Timestamp: the last date, None when the tables must be computed
+            from the first date.
+    """
+    path = aggregates_manifest_path(config)
+    if not path.is_file():
+        return None
+
+    manifest = json.loads(path.read_text())
+    if manifest.get('settings') != settings or \
+            manifest.get('last_date') is None or \
+            not all(table.path(config).is_file()
+                    for table in aggregate_tables(config)):
+        return None
+    return pd.Timestamp(manifest['last_date'])
+
+
+def write_manifest(config: dict, settings: dict,
+                   last_date: pd.Timestamp) -> None:
+    """
+    This function exports the settings and the last date of the tables,
+    after the tables, so an interrupted materialization is computed again
+    from the previous last date
+    Args:
+        config (dict): the parsed config file.
+        settings (dict): the settings returned by aggregate_settings.
+        last_date (pd.Timestamp): last date of the processed dataframe.
+    """
+    path = aggregates_manifest_path(config)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(
+        {'settings': settings,
+         'last_date': None if last_date is None else last_date.isoformat()},
+        indent=2))
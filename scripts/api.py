@@ -0,0 +1,398 @@
+"""
+This module implements the API of the processed rates for the notebooks and
+the analysis scripts: load_processed, period_slices, rolling_stats,
+period_stats and cross_rates. Their results are memoized in a cache on disk, keyed by the
+fingerprints of the sources and of the code of the ETL, the config and the
+arguments, so a restarted kernel reloads them without parsing the sources.
+"""
+from typing import Callable, Dict, List, Tuple
+from functools import wraps
+from pathlib import Path
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import pandas as pd
+from .aggregates import period_table, rolling_table
+from .context import PROCESSED, PipelineContext
+from .cross import CrossRates
+from .paths import store_path
+from .series import SeriesStore
+from .store import read_processed
+from .utils import parse_config
+
+# source files of the code whose results are memoized
+SCRIPTS_DIR = Path(__file__).parent
+CODE_FILES = ("api.py", "aggregates.py", "cross.py", "database.py", "etl.py",
+              "series.py", "sources.py", "store.py", "validation.py")
+
+# sections of the config the results depend on
+CONFIG_SECTIONS = ("etl", "validation", "plots", "aggregates")
+
+# suffix of the files of the cache
+CACHE_SUFFIX = ".pkl"
+
+
+class DiskCache():
+    """
+    This class keeps pickled results in a directory, one file by key. A
+    result read is marked as recently used, and the least recently used
+    results are removed when the files exceed the size of the cache.
+    """
+
+    directory: Path
+    max_bytes: int
+
+    def __init__(self, directory: str, max_bytes: int = 268435456) -> None:
+        """
+        Constructor to the class DiskCache
+        Args:
+            directory (str): directory of the files.
+            max_bytes (int): largest size of the files.
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(name: str, payload: dict) -> str:
+        """
+        This function returns the key of a result
+        Args:
+            name (str): name of the function.
+            payload (dict): what the result depends on, serializable as json.
+        Returns:
+            str: the sha256 of the name and the payload.
+        """
+        content = json.dumps({'name': name, 'payload': payload},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> Path:
+        """
+        This function returns the path of the file of a key
+        """
+        return self.directory / (key + CACHE_SUFFIX)
+
+    def get(self, key: str) -> Tuple[bool, object]:
+        """
+        This function reads a result, a file that is not readable is removed
+        Args:
+            key (str): the key.
+        Returns:
+            bool: True when the result was found.
+            object: the result, None when it was not found.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                result = pickle.load(file)
+        except FileNotFoundError:
+            return False, None
+        except (pickle.UnpicklingError, EOFError, AttributeError):
+            path.unlink(missing_ok=True)
+            return False, None
+
+        # marking the result as recently used
+        os.utime(path)
+        return True, result
+
+    def put(self, key: str, result: object) -> None:
+        """
+        This function writes a result with a temporary name and replaces the
+        file, then removes the least recently used results over the size
+        Args:
+            key (str): the key.
+            result (object): the result, it must be picklable.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(key)
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(temporary, "wb") as file:
+            pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+        self.evict()
+
+    def entries(self) -> List[Tuple[float, int, Path]]:
+        """
+        This function returns the last use, the size and the path of each
+        result, from the least recently used
+        """
+        entries = []
+        for path in self.directory.glob("*" + CACHE_SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self) -> None:
+        """
+        This function removes the least recently used results until the
+        files fit in the size of the cache
+        """
+        entries = self.entries()
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+
+    @property
+    def nbytes(self) -> int:
+        """
+        This function returns the size of the files of the cache
+        """
+        return sum(entry[1] for entry in self.entries())
+
+    def clear(self) -> None:
+        """
+        This function removes all the results
+        """
+        for _, _, path in self.entries():
+            path.unlink(missing_ok=True)
+
+
+def file_fingerprint(path: str) -> list:
+    """
+    This function returns the fingerprint of a file, changed by any write
+    Args:
+        path (str): path of the file.
+    Returns:
+        list: the resolved path, the size and the modification time, or
+            the path and 'missing' when the file does not exist.
+    """
+    path = Path(path).resolve()
+    if not path.is_file():
+        return [str(path), 'missing']
+    stat = path.stat()
+    return [str(path), stat.st_size, stat.st_mtime_ns]
+
+
+def input_fingerprints(config: dict) -> List[list]:
+    """
+    This function returns the fingerprints of the sources of the config and
+    of the code of the ETL and of the API
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        List[list]: the fingerprint of each file.
+    """
+    paths = [source['path'] for source in config['etl']['sources']]
+    paths += [str(SCRIPTS_DIR / name) for name in CODE_FILES]
+    return [file_fingerprint(path) for path in paths]
+
+
+def config_cache(config: dict) -> DiskCache:
+    """
+    This function returns the cache of the config, None when it is disabled
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        DiskCache: the cache.
+    """
+    settings = config.get('cache') or {}
+    if not settings.get('enabled', False):
+        return None
+    return DiskCache(settings['path'], settings.get('max_bytes', 268435456))
+
+
+def memoized(function: Callable) -> Callable:
+    """
+    This function memoizes the results of a function of the API in the cache
+    of its config. The key is made of the arguments, the sections of the
+    config and the fingerprints of the inputs, so a new source, a new config
+    or a new version of the code computes the result again. The argument
+    refresh=True computes it again in any case.
+    Args:
+        function (Callable): function whose last argument is config_path.
+    Returns:
+        Callable: the memoized function.
+    """
+    signature = inspect.signature(function)
+
+    @wraps(function)
+    def memoized_function(*args, refresh: bool = False, **kwargs):
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        config = parse_config(arguments.arguments['config_path'])
+        cache = config_cache(config)
+        if cache is None:
+            return function(*arguments.args, **arguments.kwargs)
+
+        key = cache.key(function.__name__, {
+            'arguments': {name: value for name, value
+                          in arguments.arguments.items()
+                          if name != 'config_path'},
+            'config': {section: config.get(section)
+                       for section in CONFIG_SECTIONS},
+            'inputs': input_fingerprints(config)})
+        if not refresh:
+            found, result = cache.get(key)
+            if found:
+                return result
+
+        result = function(*arguments.args, **arguments.kwargs)
+        cache.put(key, result)
+        return result
+
+    return memoized_function
+
+
+def stored_processed(config: dict) -> pd.DataFrame:
+    """
+    This function reads the processed store exported by the pipeline when
+    it was written after the last change of the sources and it has the
+    currencies of the config
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        pd.DataFrame: the processed dataframe, None when the store is
+            missing or older than a source.
+    """
+    path = store_path(config)
+    sources = [Path(source['path']) for source in config['etl']['sources']]
+    if not path.is_file() or any(
+            not source.is_file() or
+            source.stat().st_mtime_ns > path.stat().st_mtime_ns
+            for source in sources):
+        return None
+
+    processed = read_processed(config)
+    currencies = config['etl'].get('currencies', ['BRL'])
+    if currencies != 'all' and list(processed.columns) != ['Date'] + \
+            list(currencies):
+        return None
+    return processed
+
+
+@memoized
+def load_processed(config_path: str = "./config.yml") -> pd.DataFrame:
+    """
+    This function returns the processed dataframe of the sources of the
+    config when the result is not in the cache. It reads the processed
+    store when it is up to date with the sources, else it executes the ETL
+    in memory, without exporting its outputs.
+    Args:
+        config_path (str): path to the config yaml file.
+    Returns:
+        pd.DataFrame: the processed dataframe, from the newest date.
+    """
+    processed = stored_processed(parse_config(config_path))
+    if processed is None:
+        # imported by the function, the ETL is only needed without the store
+        from .etl import ExchangeETL
+        context = PipelineContext(config_path)
+        ExchangeETL(context=context).processing(export=False)
+        processed = context.artifact(PROCESSED)
+    return processed.reset_index(drop=True)
+
+
+@memoized
+def period_slices(currency: str = "BRL", periods: Dict[str, list] = None,
+                  config_path: str = "./config.yml") -> Dict[str, pd.DataFrame]:
+    """
+    This function returns the dates with a rate of a currency in each period
+    Args:
+        currency (str): code of the currency.
+        periods (Dict[str, list]): first date and date after the last one of
+            each period, None for an open period; the terms of the plots of
+            the config by default.
+        config_path (str): path to the config yaml file.
+    Returns:
+        Dict[str, pd.DataFrame]: 'Date' and the rates of each period, from
+            the oldest date.
+    """
+    if periods is None:
+        periods = parse_config(config_path)['plots']['terms']
+
+    processed = load_processed(config_path=config_path)
+    if currency not in processed.columns[1:]:
+        raise ValueError(f"The currency {currency} is not in the processed "
+                         "dataframe")
+    series = SeriesStore.from_processed(processed[['Date', currency]])[currency]
+    slices = {}
+    for name, (start, end) in periods.items():
+        first = 0 if start is None else int(series.search([start])[0])
+        last = len(series) if end is None else int(series.search([end])[0])
+        slices[name] = series[first:max(first, last)].to_frame()
+    return slices
+
+
+@memoized
+def rolling_stats(currency: str = None, windows: List[int] = None,
+                  config_path: str = "./config.yml") -> pd.DataFrame:
+    """
+    This function returns the rolling means and volatilities of the rates
+    Args:
+        currency (str): code of the currency, all of them when it is None.
+        windows (List[int]): number of rates of each window; the rolling
+            windows of the aggregates of the config by default.
+        config_path (str): path to the config yaml file.
+    Returns:
+        pd.DataFrame: 'Date' and the columns '<currency>_mean_<window>' and
+            '<currency>_vol_<window>', see rolling_table.
+    """
+    if windows is None:
+        windows = parse_config(config_path)['aggregates']['rolling_windows']
+
+    rates = load_processed(config_path=config_path).set_index('Date') \
+        .sort_index()
+    if currency is not None:
+        rates = rates[[currency]]
+    return rolling_table(rates, windows)
+
+
+@memoized
+def period_stats(periods: Dict[str, list] = None,
+                 config_path: str = "./config.yml") -> pd.DataFrame:
+    """
+    This function returns the first and last dates, the minimum, maximum
+    and mean rates and the number of rates of each currency in each period
+    Args:
+        periods (Dict[str, list]): first date and date after the last one of
+            each period; the terms of the plots of the config by default.
+        config_path (str): path to the config yaml file.
+    Returns:
+        pd.DataFrame: a row by period and currency, see period_table.
+    """
+    if periods is None:
+        periods = parse_config(config_path)['plots']['terms']
+
+    rates = load_processed(config_path=config_path).set_index('Date') \
+        .sort_index()
+    return period_table(rates, periods)
+
+
+@memoized
+def cross_rates(pairs: List[str], start: str = None, end: str = None,
+                fill_limit: int = None,
+                config_path: str = "./config.yml") -> pd.DataFrame:
+    """
+    This function returns the rates of pairs of the currencies of the
+    processed dataframe, see CrossRates.pairs
+    Args:
+        pairs (List[str]): the pairs, e.g. ["BRL/EUR", "BRL/CNY"].
+        start (str): first date, None for the first processed date.
+        end (str): last date, None for the last processed date.
+        fill_limit (int): number of dates a missing rate takes the last
+            rate of its currency, None to keep the missing rates.
+        config_path (str): path to the config yaml file.
+    Returns:
+        pd.DataFrame: the rates of each pair indexed by the dates.
+    """
+    cross = CrossRates(load_processed(config_path=config_path), fill_limit)
+    return cross.pairs(pairs, start, end)
+
+
+def clear_cache(config_path: str = "./config.yml") -> None:
+    """
+    This function removes the memoized results of the cache of the config
+    Args:
+        config_path (str): path to the config yaml file.
+    """
+    cache = config_cache(parse_config(config_path))
+    if cache is not None:
+        cache.clear()
@@ -0,0 +1,267 @@
+"""
+This module implements the classes Stage and BuildGraph responsible
+to execute only the pipeline stages whose inputs changed since their
+last execution, recorded in a manifest file.
+"""
+from typing import Callable, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+from .utils import run_buffered, replay_records
+
+
+class Stage():
+    """
+    This class describes a stage of the pipeline, its input and output
+    files and the config section its result depends on
+    """
+
+    name: str
+    action: Callable[[], None]
+    inputs: List[str]
+    outputs: List[str]
+    config: dict
+    depends: List[str]
+
+    def __init__(self, name: str, action: Callable[[], None],
+                 inputs: List[str], outputs: List[str],
+                 config: dict = None, depends: List[str] = None) -> None:
+        """
+        Constructor to the class Stage
+        Args:
+            name (str): name of the stage.
+            action (Callable): function without arguments that executes it.
+            inputs (List[str]): paths of the files read by the stage.
+            outputs (List[str]): paths of the files written by the stage.
+            config (dict): config section the stage depends on.
+            depends (List[str]): names of the stages producing its inputs.
+        """
+        self.name = name
+        self.action = action
+        self.inputs = inputs
+        self.outputs = outputs
+        self.config = config or {}
+        self.depends = depends or []
+
+
+class BuildGraph():
+    """
+    This class executes the stages of the pipeline in the order of their
+    dependencies, skipping the stages whose fingerprint did not change
+    """
+
+    manifest_path: Path
+    manifest: dict
+    stages: Dict[str, Stage]
+
+    def __init__(self, manifest_path: str) -> None:
+        """
+        Constructor to the class BuildGraph
+        Args:
+            manifest_path (str): path of the json manifest with the
+                fingerprints of the last execution of each stage.
+        """
+        self.manifest_path = Path(manifest_path)
+        self.stages = {}
+
+        self.manifest = {'files': {}, 'stages': {}}
+        if self.manifest_path.is_file():
+            with open(self.manifest_path, "r", encoding="utf-8") as file:
+                self.manifest.update(json.load(file))
+
+    def add_stage(self, stage: Stage) -> None:
+        """
+        This function adds a stage to the graph
+        Args:
+            stage (Stage): the stage, its dependencies must be added before.
+        """
+        for name in stage.depends:
+            if name not in self.stages:
+                raise ValueError(
+                    f"The stage {stage.name} depends on the unknown stage {name}")
+        self.stages[stage.name] = stage
+
+    def file_hash(self, path: str) -> str:
+        """
+        This function returns the sha256 of a file, reusing the hash in the
+        manifest while the size and the modification time are the same
+        Args:
+            path (str): path of the file.
+        Returns:
+            str: the hash, or 'missing' when the file does not exist.
+        """
+        if not os.path.isfile(path):
+            return 'missing'
+
+        stat = os.stat(path)
+        key = str(Path(path).resolve())
+        cached = self.manifest['files'].get(key)
+        if cached and cached['size'] == stat.st_size \
+                and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+
+        self.manifest['files'][key] = {'size': stat.st_size,
+                                       'mtime_ns': stat.st_mtime_ns,
+                                       'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def fingerprint(self, stage: Stage) -> str:
+        """
+        This function computes the fingerprint of the inputs of a stage
+        Args:
+            stage (Stage): the stage.
+        Returns:
+            str: sha256 of the input hashes and of the config section.
+        """
+        content = {'inputs': {path: self.file_hash(path)
+                              for path in stage.inputs},
+                   'config': stage.config}
+        payload = json.dumps(content, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_outdated(self, stage: Stage) -> bool:
+        """
+        This function verifies if a stage must be executed, because an
+        output is missing or the inputs changed since the last execution
+        Args:
+            stage (Stage): the stage.
+        Returns:
+            bool: True when the stage must be executed.
+        """
+        if not all(os.path.isfile(path) for path in stage.outputs):
+            return True
+
+        return self.manifest['stages'].get(stage.name) != \
+            self.fingerprint(stage)
+
+    def status(self) -> Dict[str, bool]:
+        """
+        This function reports which stages are outdated, without executing
+        them. Stages depending on outdated stages are reported as outdated.
+        Returns:
+            Dict[str, bool]: True for each stage that must be executed.
+        """
+        outdated = {}
+        for name, stage in self.stages.items():
+            outdated[name] = self.is_outdated(stage) or \
+                any(outdated[depend] for depend in stage.depends)
+        return outdated
+
+    def save(self) -> None:
+        """
+        This function writes the manifest atomically
+        """
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.manifest_path.with_suffix(".tmp")
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self.manifest, file, indent=2, sort_keys=True)
+        os.replace(temporary, self.manifest_path)
+
+    def record(self, stage: Stage) -> None:
+        """
+        This function stores the fingerprint of an executed stage
+        Args:
+            stage (Stage): the stage.
+        """
+        self.manifest['stages'][stage.name] = self.fingerprint(stage)
+        self.save()
+
+    def execute(self, stages: List[Stage], logger: logging.Logger,
+                jobs: int, loggers: dict) -> None:
+        """
+        This function executes independent stages, in a process pool when
+        there are several of them and more than one job. The logs of the
+        workers are emitted in the order of the stages. When stages fail,
+        the other stages are recorded and the first error is raised.
+        Args:
+            stages (List[Stage]): the stages, none depends on another.
+            logger (logging.Logger): logger of the execution.
+            jobs (int): maximum number of processes.
+            loggers (dict): loggers receiving the records of the workers.
+        """
+        if not stages:
+            return
+
+        if jobs <= 1 or len(stages) == 1:
+            for stage in stages:
+                logger.info("Executing the stage %s", stage.name)
+                stage.action()
+                self.record(stage)
+                logger.info("------- The stage %s was executed successfully "
+                            "--------", stage.name)
+            return
+
+        logger.info("Executing the stages %s in %d processes",
+                    ", ".join(stage.name for stage in stages),
+                    min(jobs, len(stages)))
+        with ProcessPoolExecutor(max_workers=min(jobs, len(stages))) as pool:
+            futures = [pool.submit(run_buffered, stage.action)
+                       for stage in stages]
+            results = [future.result() for future in futures]
+
+        # every stage is replayed and recorded before the first error
+        first_error = None
+        for stage, (records, error) in zip(stages, results):
+            replay_records(records, loggers)
+            if error is not None:
+                logger.error("The stage %s failed: %s", stage.name, error)
+                first_error = first_error or error
+                continue
+            self.record(stage)
+            logger.info("------- The stage %s was executed successfully "
+                        "--------", stage.name)
+        if first_error is not None:
+            raise first_error
+
+    def run(self, logger: logging.Logger, force: bool = False,
+            jobs: int = 1, stages: List[str] = None) -> List[str]:
+        """
+        This function executes the outdated stages. The stages whose
+        dependencies were completed run together, in up to jobs processes.
+        Args:
+            logger (logging.Logger): logger of the execution.
+            force (bool): executes all the stages.
+            jobs (int): maximum number of processes.
+            stages (List[str]): names of the stages to verify and execute,
+                all the stages when it is None. The other stages are taken
+                as completed.
+        Returns:
+            List[str]: the names of the executed stages.
+        """
+        selected = set(self.stages if stages is None else stages)
+        for name in selected - set(self.stages):
+            raise ValueError(f"The stage {name} is not in the graph")
+
+        executed = []
+        completed = set()
+        loggers = {}
+        pending = list(self.stages)
+        while pending:
+            ready = [name for name in pending
+                     if set(self.stages[name].depends) <= completed]
+            pending = [name for name in pending if name not in ready]
+
+            outdated = []
+            for name in ready:
+                if name not in selected:
+                    continue
+                if force or self.is_outdated(self.stages[name]):
+                    outdated.append(self.stages[name])
+                else:
+                    logger.info("------- The stage %s is up to date --------",
+                                name)
+
+            self.execute(outdated, logger, jobs, loggers)
+            executed.extend(stage.name for stage in outdated)
+            completed.update(ready)
+
+        self.save()
+        return executed
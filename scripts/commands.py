@@ -0,0 +1,23 @@
+"""
+This module implements the command serve, shared by the cli of the pipeline
+and by python -m scripts.serve. It does not import pandas, the server is
+only imported when the command is executed.
+"""
+import click
+
+
+@click.command()
+@click.argument("config_file", type=str, default="./config.yml")
+@click.option("--host", type=str, default=None,
+              help="Address of the server, the host of the config by default.")
+@click.option("--port", type=int, default=None,
+              help="Port of the server, the port of the config by default.")
+@click.option("--socket", "socket_path", type=str, default=None,
+              help="Path of a unix socket to listen on instead of a port.")
+def serve(config_file: str, host: str, port: int, socket_path: str) -> None:
+    """
+    Serve the processed rates and the charts over HTTP
+    """
+    # imported by the command, it loads pandas and matplotlib
+    from .serve import run_server
+    run_server(config_file, host, port, socket_path)
@@ -0,0 +1,93 @@
+"""
+This module implements the context of a run of the pipeline: the config
+parsed once, the loggers configured once and the artifacts a stage produces
+in memory for the next stages, e.g. the processed dataframe of the ETL,
+plotted without writing and reading it again. It does not import pandas,
+so the stages of the pipeline can be verified without loading it.
+"""
+from typing import Dict
+import logging
+from .utils import parse_config, set_logger
+
+# artifact of the processed dataframe exported by the ETL
+PROCESSED = "processed"
+
+# artifact of the series store exported by the ETL
+SERIES = "series"
+
+
+class PipelineContext():
+    """
+    This class is shared by the stages of a run. The artifacts are kept
+    while the context exists and are sent with it to the worker processes.
+    """
+
+    config_path: str
+    config: dict
+    loggers: Dict[str, logging.Logger]
+    artifacts: Dict[str, object]
+
+    def __init__(self, config_path: str = "./config.yml",
+                 config: dict = None) -> None:
+        """
+        Constructor to the class PipelineContext
+        Args:
+            config_path (str): path to the config yaml file.
+            config (dict): the config already parsed, the file is parsed
+                when it is not given.
+        """
+        self.config_path = config_path
+        self.config = parse_config(config_path) if config is None else config
+        self.loggers = {}
+        self.artifacts = {}
+
+    def logger(self, name: str, log_key: str) -> logging.Logger:
+        """
+        This function returns a logger configured with the log settings of
+        the config, configuring it again is harmless, so it is also valid in
+        a worker process
+        Args:
+            name (str): name of the logger.
+            log_key (str): key of its log file in the log section, e.g.
+                "log_etl_path".
+        Returns:
+            logging.Logger: the logger.
+        """
+        self.loggers[name] = set_logger(name, self.config['log'][log_key],
+                                        self.config.get('logging'))
+        return self.loggers[name]
+
+    def publish(self, name: str, artifact: object) -> None:
+        """
+        This function keeps an artifact for the next stages
+        Args:
+            name (str): name of the artifact, e.g. PROCESSED.
+            artifact (object): the artifact.
+        """
+        self.artifacts[name] = artifact
+
+    def artifact(self, name: str, default: object = None) -> object:
+        """
+        This function returns an artifact of a previous stage
+        Args:
+            name (str): name of the artifact.
+            default (object): value returned when it was not published.
+        Returns:
+            object: the artifact.
+        """
+        return self.artifacts.get(name, default)
+
+    def discard(self, name: str) -> None:
+        """
+        This function releases an artifact that is no longer valid
+        Args:
+            name (str): name of the artifact.
+        """
+        self.artifacts.pop(name, None)
+
+    def __getstate__(self) -> dict:
+        """
+        This function pickles the context without its loggers, which are
+        configured again by the worker process
+        """
+        return dict(self.__dict__, loggers={})
@@ -0,0 +1,192 @@
+"""
+This module implements the class CrossRates responsible to derive the rate
+of any pair of currencies from the processed rates, which are units of each
+currency per US dollar. The rates of all the dates are kept aligned in one
+matrix, with a column of ones for the dollar, so the rates of many pairs or
+of all of them are one broadcasted division over the rows of a date range:
+the rate of A/B, units of A per unit of B, is (A/USD) / (B/USD).
+"""
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from .paths import store_path
+from .store import read_processed
+from .utils import parse_config
+
+# code of the base currency of the sources
+BASE = 'USD'
+
+# matrices loaded by from_config, by the path and the modification time of
+# the file they were read from and the forward fill
+_MATRICES: Dict[Tuple[str, int, int], "CrossRates"] = {}
+
+
+class CrossRates():
+    """
+    This class keeps the rates per dollar of the processed dataframe as a
+    matrix of dates by currencies, e.g. cross.pairs(['BRL/EUR', 'BRL/CNY'],
+    '2020-03-01', '2020-06-30') or cross.cube('2020-03-01', '2020-06-30').
+    """
+
+    dates: pd.DatetimeIndex
+    currencies: List[str]
+    columns: Dict[str, int]
+    matrix: np.ndarray
+
+    def __init__(self, processed: pd.DataFrame, fill_limit: int = None) -> None:
+        """
+        Constructor to the class CrossRates
+        Args:
+            processed (pd.DataFrame): the processed dataframe, with the
+                column 'Date' and the rates per dollar of each currency.
+            fill_limit (int): number of dates a missing rate takes the last
+                rate of its currency, None to keep the missing rates.
+        """
+        # a matrix of the dollar and one currency has no cross rate
+        codes = [code for code in processed.columns
+                 if code not in ('Date', BASE)]
+        if len(codes) < 2:
+            raise ValueError(
+                f"The cross rates need at least two currencies other than "
+                f"{BASE}, the processed dataframe has {codes}: select more "
+                "currencies in etl.currencies of the config, e.g. \"all\"")
+
+        rates = processed.set_index('Date').sort_index()
+        if fill_limit:
+            rates = rates.ffill(limit=fill_limit)
+
+        self.dates = pd.DatetimeIndex(rates.index)
+        self.currencies = [code for code in rates.columns if code != BASE] + \
+            [BASE]
+        self.columns = {code: number
+                        for number, code in enumerate(self.currencies)}
+
+        # the rates per dollar and, in the last column, the dollar itself
+        self.matrix = np.ones((len(rates), len(self.currencies)))
+        self.matrix[:, :-1] = rates[self.currencies[:-1]].to_numpy(
+            dtype='float64')
+
+    @classmethod
+    def from_config(cls, config_path: str = "./config.yml",
+                    fill_limit: int = None) -> "CrossRates":
+        """
+        This function loads the matrix of the processed dataframe, reusing
+        the matrix already loaded while its file is not modified
+        Args:
+            config_path (str): path to the config yaml file.
+            fill_limit (int): see the constructor.
+        Returns:
+            CrossRates: the matrix.
+        """
+        config = parse_config(config_path)
+        path = store_path(config)
+        key = (str(path.resolve()), path.stat().st_mtime_ns, fill_limit or 0)
+        if key not in _MATRICES:
+            # the matrix of an older version of the file is released
+            for stale in [stale for stale in _MATRICES if stale[0] == key[0]]:
+                del _MATRICES[stale]
+            _MATRICES[key] = cls(read_processed(config), fill_limit)
+        return _MATRICES[key]
+
+    def column(self, currency: str) -> int:
+        """
+        This function returns the column of a currency in the matrix
+        """
+        if currency not in self.columns:
+            raise ValueError(f"The currency {currency} is not in the "
+                             "processed dataframe")
+        return self.columns[currency]
+
+    def rows(self, start=None, end=None) -> slice:
+        """
+        This function returns the rows of the dates between two dates, both
+        included. A date without time includes the whole day.
+        Args:
+            start: first date, None for the first date of the matrix.
+            end: last date, None for the last date of the matrix.
+        Returns:
+            slice: the rows.
+        """
+        return self.dates.slice_indexer(start, end)
+
+    def pairs(self, pairs: List[str], start=None,
+              end=None) -> pd.DataFrame:
+        """
+        This function returns the rates of pairs of currencies between two
+        dates, all of them in one division
+        Args:
+            pairs (List[str]): the pairs, e.g. ["BRL/EUR", "BRL/CNY"] for the
+                reais per euro and per yuan.
+            start: first date, None for the first date of the matrix.
+            end: last date, None for the last date of the matrix.
+        Returns:
+            pd.DataFrame: the rates of each pair indexed by the dates, NaN
+                when a currency of the pair has no rate.
+        """
+        codes = [pair.split('/') for pair in pairs]
+        if any(len(pair) != 2 for pair in codes):
+            raise ValueError(f"The pairs {pairs} are not like 'BRL/EUR'")
+
+        rows = self.rows(start, end)
+        numerators = [self.column(numerator) for numerator, _ in codes]
+        denominators = [self.column(denominator) for _, denominator in codes]
+        rates = self.matrix[rows][:, numerators] / \
+            self.matrix[rows][:, denominators]
+        return pd.DataFrame(rates, index=self.dates[rows], columns=pairs)
+
+    def cube(self, start=None, end=None,
+             currencies: List[str] = None) -> np.ndarray:
+        """
+        This function returns the rates of all the pairs of currencies
+        between two dates, cube[date, a, b] being the units of the currency a
+        per unit of the currency b
+        Args:
+            start: first date, None for the first date of the matrix.
+            end: last date, None for the last date of the matrix.
+            currencies (List[str]): codes of the currencies, all of them,
+                the dollar last, when it is None.
+        Returns:
+            np.ndarray: the array of shape (dates, currencies, currencies).
+        """
+        matrix = self.matrix[self.rows(start, end)]
+        if currencies is not None:
+            matrix = matrix[:, [self.column(code) for code in currencies]]
+        return matrix[:, :, np.newaxis] / matrix[:, np.newaxis, :]
+
+    def basket(self, currency: str, basket: List[str] = None,
+               weights: List[float] = None, start=None,
+               end=None) -> pd.Series:
+        """
+        This function returns the rate of a currency against a basket of
+        currencies, the weighted geometric mean of its rates against each
+        currency of the basket
+        Args:
+            currency (str): code of the currency, e.g. "BRL".
+            basket (List[str]): codes of the currencies of the basket, all
+                the other currencies when it is None.
+            weights (List[float]): weight of each currency of the basket,
+                the same weight for all of them when it is None.
+            start: first date, None for the first date of the matrix.
+            end: last date, None for the last date of the matrix.
+        Returns:
+            pd.Series: the units of the currency per unit of the basket,
+                indexed by the dates, NaN when a rate is missing.
+        """
+        if basket is None:
+            basket = [code for code in self.currencies if code != currency]
+        weights = np.full(len(basket), 1 / len(basket)) if weights is None \
+            else np.asarray(weights, dtype='float64') / np.sum(weights)
+
+        rows = self.rows(start, end)
+        logs = np.log(self.matrix[rows])
+        columns = [self.column(code) for code in basket]
+        index = logs[:, [self.column(currency)]] - logs[:, columns]
+        return pd.Series(np.exp(index @ weights), index=self.dates[rows],
+                         name=f"{currency}/basket")
+
+    @property
+    def nbytes(self) -> int:
+        """
+        This function returns the bytes of the matrix
+        """
+        return self.matrix.nbytes
@@ -0,0 +1,242 @@
+"""
+This module implements the class RateDatabase, an embedded SQLite backend
+of the processed store. Each rate is a row keyed by its currency and its
+date, so the readers select a range of dates and some currencies with the
+indexes instead of loading the whole store, and the ETL writes the rates in
+one transaction of batched upserts, which the readers see as a whole.
+"""
+from typing import Iterator, List
+from itertools import islice
+from pathlib import Path
+import sqlite3
+import numpy as np
+import pandas as pd
+
+# tables of the rates and of the order of the currencies
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rates (
+    currency TEXT NOT NULL,
+    date TEXT NOT NULL,
+    rate REAL,
+    PRIMARY KEY (currency, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rates_date ON rates (date);
+CREATE TABLE IF NOT EXISTS currencies (
+    currency TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+"""
+
+# upsert of a rate, the rate of an existing currency and date is replaced
+UPSERT = ("INSERT INTO rates (currency, date, rate) VALUES (?, ?, ?) "
+          "ON CONFLICT (currency, date) DO UPDATE SET rate = excluded.rate")
+
+# formats of the dates in the database, sorted as text like the dates: the
+# days at midnight keep only their date, the other dates their time
+DATE_FORMAT = '%Y-%m-%d'
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+def date_text(date) -> str:
+    """
+    This function converts a date to the text of its day in the database
+    """
+    return pd.Timestamp(date).strftime(DATE_FORMAT)
+
+
+def dates_text(dates: pd.Series) -> List[str]:
+    """
+    This function converts the dates of a processed dataframe to the texts
+    of the database, with their time when they are not at midnight
+    Args:
+        dates (pd.Series): the datetime dates.
+    Returns:
+        List[str]: the texts of the dates.
+    """
+    texts = dates.dt.strftime(DATE_FORMAT)
+    intraday = dates != dates.dt.normalize()
+    if intraday.any():
+        texts[intraday] = dates[intraday].dt.strftime(TIME_FORMAT)
+    return texts.tolist()
+
+
+class RateDatabase():
+    """
+    This class reads and writes the processed rates in a SQLite database.
+    The database is in WAL mode, so the readers are not blocked while the
+    ETL writes and read the rates of the last committed write.
+    """
+
+    path: Path
+    batch_size: int
+    connection: sqlite3.Connection
+
+    def __init__(self, path: str, batch_size: int = 50000) -> None:
+        """
+        Constructor to the class RateDatabase
+        Args:
+            path (str): path of the database file.
+            batch_size (int): rates of each batch of the upserts.
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.connection = None
+
+    def connect(self, readonly: bool = False) -> sqlite3.Connection:
+        """
+        This function opens a connection to the database, creating its
+        tables when it is opened to write
+        Args:
+            readonly (bool): open the database only to read.
+        Returns:
+            sqlite3.Connection: the connection.
+        """
+        if readonly:
+            return sqlite3.connect(self.path.resolve().as_uri() + "?mode=ro",
+                                   uri=True)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.path, isolation_level=None)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def start(self, currencies: List[str], replace: bool = True) -> None:
+        """
+        This function starts the transaction of a write
+        Args:
+            currencies (List[str]): codes of the currencies of the rates.
+            replace (bool): delete the rates of the previous writes.
+        """
+        self.connection = self.connect()
+        self.connection.execute("BEGIN IMMEDIATE")
+        if replace:
+            self.connection.execute("DELETE FROM rates")
+            self.connection.execute("DELETE FROM currencies")
+        known = self.connection.execute(
+            "SELECT COUNT(*) FROM currencies").fetchone()[0]
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO currencies (currency, position) "
+            "VALUES (?, ?)",
+            [(code, known + number) for number, code in enumerate(currencies)])
+
+    @staticmethod
+    def rows(frame: pd.DataFrame) -> Iterator[tuple]:
+        """
+        This function returns the currency, the date and the rate of each
+        cell of a processed dataframe, None for a missing rate
+        """
+        if frame.empty:
+            return
+        dates = dates_text(frame['Date'])
+        for currency in frame.columns[frame.columns != 'Date']:
+            rates = frame[currency].to_numpy(dtype='float64')
+            rates = np.where(np.isnan(rates), None, rates).tolist()
+            yield from zip([currency] * len(dates), dates, rates)
+
+    def upsert(self, frame: pd.DataFrame) -> int:
+        """
+        This function upserts the rates of a processed dataframe, in batches,
+        inside the transaction started by start
+        Args:
+            frame (pd.DataFrame): the processed rows.
+        Returns:
+            int: the number of rates.
+        """
+        rows = self.rows(frame)
+        count = 0
+        batch = list(islice(rows, self.batch_size))
+        while batch:
+            self.connection.executemany(UPSERT, batch)
+            count += len(batch)
+            batch = list(islice(rows, self.batch_size))
+        return count
+
+    def commit(self) -> None:
+        """
+        This function commits the write and writes it to the database file
+        """
+        self.connection.execute("COMMIT")
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.connection.close()
+        self.connection = None
+
+    def abort(self) -> None:
+        """
+        This function discards the write
+        """
+        if self.connection is not None:
+            self.connection.execute("ROLLBACK")
+            self.connection.close()
+            self.connection = None
+
+    def write(self, processed: pd.DataFrame, replace: bool = True) -> int:
+        """
+        This function writes the rates of a processed dataframe in one
+        transaction
+        Args:
+            processed (pd.DataFrame): the processed dataframe or, when replace
+                is False, its new rows.
+            replace (bool): delete the rates of the previous writes.
+        Returns:
+            int: the number of rates.
+        """
+        self.start(list(processed.columns[processed.columns != 'Date']),
+                   replace)
+        try:
+            count = self.upsert(processed)
+        except Exception:
+            self.abort()
+            raise
+        self.commit()
+        return count
+
+    def read(self, start=None, end=None,
+             currencies: List[str] = None) -> pd.DataFrame:
+        """
+        This function selects the rates of the currencies between two days,
+        both included, by the indexes of the database
+        Args:
+            start: first day, None for the first date of the database.
+            end: last day, None for the last date of the database.
+            currencies (List[str]): codes of the currencies, all of them
+                when it is None. The currencies that are not in the database
+                are left out.
+        Returns:
+            pd.DataFrame: the column 'Date' and one column of rates by
+                currency, from the newest date, like the processed dataframe.
+        """
+        conditions, parameters = [], []
+        if currencies is not None:
+            conditions.append(
+                f"currency IN ({', '.join('?' * len(currencies))})")
+            parameters += list(currencies)
+        if start is not None:
+            conditions.append("date >= ?")
+            parameters.append(date_text(start))
+        if end is not None:
+            # the dates with a time of the last day are sorted after it
+            conditions.append("date < ?")
+            parameters.append(date_text(pd.Timestamp(end).normalize() +
+                                        pd.Timedelta(days=1)))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        connection = self.connect(readonly=True)
+        try:
+            order = [code for (code,) in connection.execute(
+                "SELECT currency FROM currencies ORDER BY position")]
+            rows = connection.execute(
+                "SELECT date, currency, rate FROM rates" + where,
+                parameters).fetchall()
+        finally:
+            connection.close()
+
+        codes = [code for code in order
+                 if currencies is None or code in currencies]
+        rates = pd.DataFrame(rows, columns=['Date', 'currency', 'rate'])
+        rates = rates.pivot(index='Date', columns='currency', values='rate')
+        rates = rates.reindex(columns=codes).astype('float64')
+        rates.index = pd.to_datetime(rates.index, format='ISO8601')
+        rates.columns.name = None
+        return rates.sort_index(ascending=False).reset_index()
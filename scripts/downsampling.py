@@ -0,0 +1,144 @@
+"""
+This module implements the functions responsible to reduce the points
+of a line to the number that the pixels of its plot can show, keeping its
+shape and its peaks.
+"""
+from typing import Callable, Tuple
+import numpy as np
+
+
+def numeric(values) -> np.ndarray:
+    """
+    This function returns the values as a float array, the datetimes as
+    their number of time units since the epoch
+    Args:
+        values: array-like of numbers or datetimes.
+    Returns:
+        np.ndarray: the float values.
+    """
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.view('int64').astype('float64')
+    return values.astype('float64')
+
+
+def bucket_starts(x_values: np.ndarray, buckets: int) -> np.ndarray:
+    """
+    This function splits the sorted x values in buckets of the same width,
+    like the columns of pixels of a plot
+    Args:
+        x_values (np.ndarray): the sorted x values.
+        buckets (int): number of buckets.
+    Returns:
+        np.ndarray: the first index of each bucket that is not empty.
+    """
+    first, last = x_values[0], x_values[-1]
+    if last <= first:
+        return np.array([0])
+    columns = ((x_values - first) * (buckets / (last - first))).astype('int64')
+    columns = np.minimum(columns, buckets - 1)
+    return np.flatnonzero(np.diff(columns, prepend=-1))
+
+
+def minmax(x, y, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    This function keeps the first, the lowest, the highest and the last point
+    of each bucket of the x axis, so the line drawn in each column of pixels
+    is the same as the one of all the points
+    Args:
+        x: the x values, sorted, as numbers or datetimes.
+        y: the y values.
+        buckets (int): number of buckets, the width of the plot in pixels.
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the x and y values of the kept points.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    if len(x) <= 4 * buckets:
+        return x, y
+
+    starts = bucket_starts(numeric(x), buckets)
+    ends = np.append(starts[1:], len(x)) - 1
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts,
+                                                                 len(x))))
+
+    # missing values are never the lowest nor the highest point
+    values = numeric(y)
+    lowest = np.where(np.isnan(values), np.inf, values)
+    highest = np.where(np.isnan(values), -np.inf, values)
+    minimums = np.minimum.reduceat(lowest, starts)
+    maximums = np.maximum.reduceat(highest, starts)
+
+    # the first point of each bucket equal to its minimum and its maximum
+    at_minimum = np.flatnonzero(lowest == minimums[bucket])
+    at_maximum = np.flatnonzero(highest == maximums[bucket])
+    first_minimum = at_minimum[np.unique(bucket[at_minimum],
+                                         return_index=True)[1]]
+    first_maximum = at_maximum[np.unique(bucket[at_maximum],
+                                         return_index=True)[1]]
+
+    kept = np.unique(np.concatenate([starts, ends, first_minimum,
+                                     first_maximum]))
+    return x[kept], y[kept]
+
+
+def lttb(x, y, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    This function keeps one point of each bucket with the Largest Triangle
+    Three Buckets algorithm: the point forming the largest triangle with the
+    point kept in the previous bucket and the mean of the next bucket
+    Args:
+        x: the x values, sorted, as numbers or datetimes.
+        y: the y values, without missing values.
+        buckets (int): number of buckets, the width of the plot in pixels.
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: the x and y values of the kept points,
+            the first and the last points included.
+    """
+    x, y = np.asarray(x), np.asarray(y)
+    if len(x) <= buckets + 2:
+        return x, y
+
+    x_values, y_values = numeric(x), numeric(y)
+
+    # the first and the last points are buckets of their own
+    edges = np.linspace(1, len(x) - 1, buckets + 1).astype('int64')
+    kept = np.empty(buckets + 2, dtype='int64')
+    kept[0], kept[-1] = 0, len(x) - 1
+
+    for number in range(buckets):
+        start, end = edges[number], edges[number + 1]
+        if number + 1 < buckets:
+            following = slice(edges[number + 1], edges[number + 2])
+            next_x = x_values[following].mean()
+            next_y = y_values[following].mean()
+        else:
+            next_x, next_y = x_values[-1], y_values[-1]
+
+        previous_x = x_values[kept[number]]
+        previous_y = y_values[kept[number]]
+        areas = np.abs((previous_x - next_x) * (y_values[start:end] - previous_y)
+                       - (previous_x - x_values[start:end]) *
+                       (next_y - previous_y))
+        kept[number + 1] = start + np.argmax(areas)
+
+    return x[kept], y[kept]
+
+
+# downsampling methods by the name used in the config
+DOWNSAMPLERS = {'minmax': minmax, 'lttb': lttb}
+
+
+def get_downsampler(method: str) -> Callable:
+    """
+    This function returns the downsampling function of a method
+    Args:
+        method (str): "minmax", "lttb" or None to keep all the points.
+    Returns:
+        Callable: the function, or None when method is None.
+    """
+    if method is None:
+        return None
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"The downsampling method {method} is not one of "
+                         f"{list(DOWNSAMPLERS)}")
+    return DOWNSAMPLERS[method]
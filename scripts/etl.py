@@ -2,11 +2,82 @@
 to make all transformations in the dataframe and create and export
 the plots
 """
-from typing import List
+from typing import Dict, Iterator, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+import tempfile
 import logging
 import pandas as pd
-from .utils import set_logger, parse_config
+from .context import PROCESSED, SERIES, PipelineContext
+from .utils import resolve_csv_engine
+from .profiling import StepProfiler
+from .aggregates import (aggregate_tables, aggregate_settings,
+                         materialized_since, write_manifest)
+from .validation import SourceValidator
+from .paths import series_index_path
+from .series import SeriesStore
+from .sources import (SourceAdapter, create_sources, parse_precedence,
+                      in_ranges, merge_sources, streaming_sources, read_source)
+from .store import (write_processed, read_processed, merge_processed,
+                    processed_exists, config_database, empty_processed,
+                    ProcessedWriter)
+
+
+def iter_newest_first(chunks: Iterator[pd.DataFrame],
+                      spill_dir: Path) -> Iterator[pd.DataFrame]:
+    """
+    This function is responsible to yield the chunks of a source sorted by
+    date from the newest to the oldest date. The chunks of a source sorted
+    from the newest date are yielded as they are read; the chunks of a
+    source sorted from the oldest date are spilled to disk and read back in
+    reverse, so only one of them is in memory at a time.
+    Args:
+        chunks (Iterator[pd.DataFrame]): chunks with a 'Date' column, sorted
+            from the oldest or from the newest date.
+        spill_dir (Path): directory receiving the spilled chunks.
+    Returns:
+        Iterator[pd.DataFrame]: the chunks from the newest date.
+    """
+    parts = []
+    descending = None
+    previous = None
+    for number, chunk in enumerate(chunks):
+        if chunk.empty:
+            continue
+        dates = chunk['Date']
+        if not (dates.is_monotonic_increasing or
+                dates.is_monotonic_decreasing):
+            raise ValueError("The streaming mode needs sources sorted by date")
+        first, last = dates.iloc[0], dates.iloc[-1]
+
+        # finding the order by the first dates that differ
+        if descending is None:
+            if first != last:
+                descending = first > last
+            elif previous is not None and first != previous:
+                descending = first < previous
+
+        if descending:
+            if previous is not None and first > previous:
+                raise ValueError("The streaming mode needs sources sorted "
+                                 "by date")
+            # the chunks spilled before the order was found come first
+            for part in parts:
+                yield pd.read_pickle(part)
+                part.unlink()
+            parts = []
+            yield chunk
+        else:
+            spill_dir.mkdir(parents=True, exist_ok=True)
+            part = spill_dir / f"part{number}.pkl"
+            chunk.to_pickle(part)
+            parts.append(part)
+        previous = last
+
+    for part in reversed(parts):
+        chunk = pd.read_pickle(part)
+        part.unlink()
+        yield chunk.iloc[::-1]
 
 
 class ExchangeETL():
@@ -18,38 +89,48 @@ class ExchangeETL():
     data_path: str
     dataframes: List[pd.DataFrame]
     logger: logging
+    profiler: StepProfiler
+    context: PipelineContext
     config: dict
 
-    def __init__(self, config_path: str = "./config.yml") -> None:
+    def __init__(self, config_path: str = "./config.yml",
+                 context: PipelineContext = None) -> None:
         """
         This is the constructor of the class ExchangeETL
         and is responsible for initializing the attributes of the object.
         Args:
             config_file (str): path to the config yaml file
+            context (PipelineContext): the context of the run, with the
+                config already parsed, receiving the processed dataframe
         Returns:
             None
         """
 
+        # sharing the config and the loggers of the run
+        self.context = context or PipelineContext(config_path)
+
         # initializing the config_path attribute
-        self.config_path = config_path
+        self.config_path = self.context.config_path
 
         # loading config file in the config attribute
-        self.config = parse_config(self.config_path)
+        self.config = self.context.config
 
         # configuring logger attribute
-        self.logger = set_logger(
-            "ExchangeETL",
-            self.config['log']['log_etl_path'])
+        self.logger = self.context.logger("ExchangeETL", 'log_etl_path')
         self.logger.info("Load config from %s", self.config_path)
         self.logger.info("ETL config: %s", self.config['etl'])
 
+        # measuring the steps of the processing in the logs
+        self.profiler = StepProfiler(self.logger)
+
         # initializing the data_path atribute as None
         self.data_path = None
 
         # creating the dataframes list as None
         self.dataframes = [pd.DataFrame() for i in range(3)]
 
-    def load_dataframe(self, index: int, data_path: str) -> bool:
+    def load_dataframe(self, index: int, data_path: str,
+                       schema: dict = None, since: pd.Timestamp = None) -> bool:
         """
         This function is responsible to validate the inputs, for
         load the dataframe in a attribute and returns True if
@@ -57,12 +138,20 @@ class ExchangeETL():
         Args:
             index (int): index for indentifie the dataframe in the dataframe list.
             data_path (str): indicates the path for the dataframe.
+            schema (dict): optional schema of the columns to parse,
+                see read_csv_schema. All the columns are loaded without it.
+            since (pd.Timestamp): optional date, when given with the schema
+                only the rows dated after it are loaded.
         Returns:
             bool: indicates if the function worked well or not.
         """
         try:
             assert isinstance(data_path, str)
-            self.dataframes[index] = pd.read_csv(data_path)
+            if schema is None:
+                self.dataframes[index] = pd.read_csv(data_path)
+            else:
+                self.dataframes[index] = read_source(
+                    data_path, schema, *self.read_options(since))
             self.logger.info("The dataset was loaded.")
             return True
         except Exception as exception:
@@ -71,6 +160,134 @@ class ExchangeETL():
                 "The dataset in path %s was not loaded.", data_path)
             return False
 
+    def read_options(self, since: pd.Timestamp = None) -> tuple:
+        """
+        This function returns the options of read_source from the config
+        Args:
+            since (pd.Timestamp): optional date of the last processed row.
+        Returns:
+            tuple: the engine, since and chunksize arguments of read_source.
+        """
+        engine = resolve_csv_engine(self.config['etl'].get('csv_engine', 'auto'))
+        return engine, since, self.config['etl'].get('chunksize', 1000)
+
+    def configured_sources(self) -> Tuple[Dict[str, SourceAdapter], list]:
+        """
+        This function creates the adapters of the sources of the config and
+        parses the date ranges of their precedence
+        Returns:
+            Dict[str, SourceAdapter]: the adapters of the sources of the
+                date ranges, by name.
+            list: the date ranges, see parse_precedence.
+        """
+        sources = create_sources(self.config['etl']['sources'])
+        ranges = parse_precedence(self.config['etl']['precedence'],
+                                  list(sources))
+        used = {name for _, _, names in ranges for name in names}
+        return {name: source for name, source in sources.items()
+                if name in used}, ranges
+
+    def source_validator(self, source: SourceAdapter,
+                         schema: dict) -> SourceValidator:
+        """
+        This function creates the validator of a source with the validation
+        section of the config
+        Args:
+            source (SourceAdapter): the adapter of the source.
+            schema (dict): the schema of the loaded columns.
+        Returns:
+            SourceValidator: the validator, None when the validation is not
+                enabled.
+        """
+        settings = self.config.get('validation') or {}
+        if not settings.get('enabled', False):
+            return None
+        return SourceValidator(source.path, schema, settings,
+                               (settings.get('order') or {}).get(source.name,
+                                                                 'any'))
+
+    def validate_dataframe(self, validator: SourceValidator,
+                           frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        This function executes the checks of a loaded source, or of the next
+        chunk of it, logging the failed checks before raising a
+        ValidationError
+        Args:
+            validator (SourceValidator): the validator of the source.
+            frame (pd.DataFrame): the source or the chunk.
+        Returns:
+            pd.DataFrame: the same frame.
+        """
+        failures = validator.failures(frame)
+        for failure in failures:
+            self.logger.error("The source %s failed a check: %s.",
+                              validator.source, failure)
+        validator.check_failures(failures)
+        return frame
+
+    def load_sources(self, sources: Dict[str, SourceAdapter],
+                     schemas: Dict[str, dict], since: pd.Timestamp = None,
+                     jobs: int = 1) -> Dict[str, pd.DataFrame]:
+        """
+        This function is responsible to load the sources with their schemas,
+        concurrently in a process pool when jobs is greater than one, and
+        raises a ValueError when any of them was not loaded;
+        Args:
+            sources (Dict[str, SourceAdapter]): the adapters by name.
+            schemas (Dict[str, dict]): the schema of each source, see
+                SourceAdapter.select.
+            since (pd.Timestamp): optional date, only the rows dated after
+                it are loaded.
+            jobs (int): maximum number of processes.
+        Returns:
+            Dict[str, pd.DataFrame]: the rows of each source.
+        """
+        options = self.read_options(since)
+        pool = None
+        if jobs > 1 and len(sources) > 1:
+            pool = ProcessPoolExecutor(max_workers=min(jobs, len(sources)))
+        frames = {}
+        try:
+            futures = {name: pool.submit(source.read, schemas[name], *options)
+                       for name, source in sources.items()} if pool else {}
+            for name, source in sources.items():
+                try:
+                    frames[name] = futures[name].result() if pool else \
+                        source.read(schemas[name], *options)
+                    self.logger.info("The source %s was loaded.", name)
+                except Exception as exception:
+                    self.logger.error("%s", exception)
+                    self.logger.warning("The source %s in path %s was not "
+                                        "loaded.", name, source.path)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        if len(frames) < len(sources):
+            raise ValueError("The sources were not loaded, the ETL was "
+                             "aborted before the transformations.")
+        return frames
+
+    def select_currencies(self) -> List[str]:
+        """
+        This function returns the currencies selected in the config, all the
+        currencies shared by the sources when it is "all"
+        Returns:
+            List[str]: the codes of the currencies.
+        """
+        currencies = self.config['etl'].get('currencies', ['BRL'])
+        codes = [source.currencies
+                 for source in self.configured_sources()[0].values()]
+        if currencies == 'all':
+            return [code for code in codes[0]
+                    if all(code in other for other in codes[1:])]
+
+        unknown = [code for code in currencies
+                   if not any(code in other for other in codes)]
+        if unknown:
+            raise ValueError(f"The currencies {unknown} are not in the sources")
+        return list(currencies)
+
     def rename_columns(self, index: int, columns: dict) -> bool:
         """
         This function is responsible to validate the inputs, for
@@ -117,109 +334,315 @@ class ExchangeETL():
                 "The change in the column type was not performed")
             return False
 
-    def processing(self) -> None:
+    def processing(self, incremental: bool = False, jobs: int = 1,
+                   export: bool = True) -> None:
         """
         This method implements the processing pipeline for the ETL operations
         and export the processed dataframe
+        Args:
+            incremental (bool): when True and the processed store exists, only
+                the rows dated after its last date are read from the sources
+                and merged into it.
+            jobs (int): number of processes loading the sources.
+            export (bool): when False, the processed dataframe is only
+                published in the context, in memory, and the processed
+                store and the other outputs are left untouched.
         """
 
-        # beginning the data transformation
-        self.logger.info(
-            "------------Start data transformation on dataframe 0-----------")
-
-        # loading the data path with dataframe1 path
-        self.data_path = self.config['etl']['dataframe1_path']
-
-        # loadind the dataframe0
-        self.load_dataframe(0, self.data_path)
-        self.logger.info("The dataframe0 was successfully loaded.")
-
-        # droping the first row of dataframe0
-        self.dataframes[0].drop(axis=0, index=0, inplace=True)
-        self.logger.info("The first index of the dataframe0 was removed.")
-
-        # copying just the columns 'Date' and 'BRL' to the dataframe0
-        self.dataframes[0] = self.dataframes[0][['Date', 'BRL']]
-        self.logger.info(
-            "The columns 'Date' and 'BRL' from dataframe0 was selected.")
-
-        # converting the column 'Date' of dataframe0 to datetime
-        self.change_column_type(0, 'Date', 'datetime')
-        self.logger.info(
-            "The type of the column 'Date' of dataframe0 was changed to datetime type.")
-
-        # converting the column 'BRL' of dataframe0 to float
-        self.dataframes[0]['BRL'] = self.dataframes[0]['BRL'].astype(float)
+        # releasing the artifacts of a previous processing
+        self.context.discard(PROCESSED)
+        self.context.discard(SERIES)
+
+        # processing the sources chunk by chunk in streaming mode
+        if self.config['etl'].get('streaming', False) and not incremental \
+                and export:
+            self.processing_streaming()
+            return
+
+        # selecting the currencies of the processed dataframe
+        currencies = self.select_currencies()
+        self.logger.info("The currencies %s were selected.",
+                         ", ".join(currencies))
+
+        # finding the last date already processed in incremental mode
+        processed = None
+        since = None
+        if incremental and export and processed_exists(self.config):
+            with self.profiler.step("read processed") as step:
+                processed = read_processed(self.config)
+                step['rows_out'] = len(processed)
+            if list(processed.columns) != ['Date'] + currencies:
+                self.logger.info("The processed dataset has other currencies, "
+                                 "so all the dates will be processed.")
+                processed = None
+            else:
+                since = processed['Date'].max()
+                self.logger.info("Incremental mode: only the dates after %s "
+                                 "will be processed.", since.date())
+
+        # loading the date and currency columns of the sources, already
+        # typed, concurrently when jobs is greater than one
+        sources, ranges = self.configured_sources()
+        selected = {name: source.select(currencies)
+                    for name, source in sources.items()}
+        with self.profiler.step("load") as step:
+            frames = self.load_sources(
+                sources, {name: schema for name, (schema, _) in selected.items()},
+                since, jobs)
+            step['rows_out'] = sum(len(frame) for frame in frames.values())
         self.logger.info(
-            "The type of the column 'BRL' of dataframe0 was changed to float type.")
+            "The date and currency columns of the sources %s were loaded as "
+            "datetime and float.", ", ".join(sources))
+
+        # validating the sources before the transformations
+        for name, source in sources.items():
+            validator = self.source_validator(source, selected[name][0])
+            if validator is not None:
+                with self.profiler.step(f"validate {name}", len(frames[name])):
+                    self.validate_dataframe(validator, frames[name])
+                self.logger.info("The source %s passed the checks of the "
+                                 "validation.", name)
 
+        # beginning the data transformation
         self.logger.info(
-            "------------Start data transformation on dataframe 1-----------")
-
-        # loading the data path with dataframe2 path
-        self.data_path = self.config['etl']['dataframe2_path']
-
-        # loadind the dataframe1
-        self.load_dataframe(1, self.data_path)
-        self.logger.info("The dataframe1 was successfully loaded.")
-
-        # renaming the columns of dataframe1
-        columns = {'BRAZIL - REAL/US$': 'BRL',
-                   'Time Serie': 'Date'}
-        self.rename_columns(1, columns)
-        self.logger.info("The columns of dataframe1 was successfully changed.")
-
-        # converting the column 'Date' of dataframe1 to datetime
-        self.change_column_type(1, 'Date', 'datetime')
+            "------------Start data transformation-----------")
+
+        # renaming the columns of each source to 'Date' and the currency
+        # codes and cleaning its rows
+        for name, source in sources.items():
+            with self.profiler.step(f"clean {name}", len(frames[name])) \
+                    as step:
+                frames[name] = source.clean(frames[name], selected[name][1],
+                                            currencies)
+                step['rows_out'] = len(frames[name])
+            self.logger.info("The columns of the source %s were renamed and "
+                             "its rows were cleaned.", name)
+
+        # merging the sources, taking each date from the source with the
+        # highest precedence in its date range
+        with self.profiler.step("merge sources", sum(
+                len(frame) for frame in frames.values())) as step:
+            self.dataframes = list(frames.values()) + [
+                merge_sources(frames, ranges, currencies)]
+            step['rows_out'] = len(self.dataframes[-1])
+        self.logger.info("The sources were merged by the precedence of %d "
+                         "date ranges.", len(ranges))
+
+        # keeping the processed dataframe only in memory
+        if not export:
+            self.context.publish(PROCESSED, self.dataframes[-1])
+            self.logger.info("The transformed dataset was kept in memory "
+                             "without exporting it.")
+            return
+
+        # merging the new dates into the processed dataframe, only they are
+        # upserted in the database
+        new_rows = None
+        if processed is not None:
+            if self.dataframes[-1].empty:
+                self.logger.info("There are no new dates, the processed "
+                                 "dataset is already up to date.")
+                self.context.publish(PROCESSED, processed)
+                self.export_database(processed)
+                self.materialize(processed, incremental=True)
+                self.export_series(processed, missing_only=True)
+                return
+
+            self.logger.info("%d new dates were found.",
+                             len(self.dataframes[-1]))
+            new_rows = self.dataframes[-1]
+            with self.profiler.step("merge", len(self.dataframes[-1])) as step:
+                self.dataframes[-1] = merge_processed(processed,
+                                                      self.dataframes[-1])
+                step['rows_out'] = len(self.dataframes[-1])
+            self.logger.info(
+                "The new dates were merged in the processed dataframe.")
+
+        # exporting the transformed dataset to the processed store
+        with self.profiler.step("export", len(self.dataframes[-1])):
+            paths = write_processed(self.dataframes[-1], self.config,
+                                    new_rows)
         self.logger.info(
-            "The type of the column 'Date' of dataframe1 was changed to datetime type.")
+            "The transformed dataset was exported successfully to %s.",
+            ", ".join(str(path) for path in paths))
 
-        # sorting the values of column 'Date' of dataframe1
-        self.dataframes[1].sort_values('Date', inplace=True, ascending=False)
-        self.logger.info(
-            "The values of dataframe1 was successfully sorted by values in column 'Date'.")
+        # keeping the processed dataframe for the next stages of the run
+        self.context.publish(PROCESSED, self.dataframes[-1])
 
-        # reseting the index of dataframe1
-        self.dataframes[1].reset_index(drop=True, inplace=True)
-        self.logger.info("The index of dataframe1 was reseting successfully.")
+        # materializing the aggregates and the series store of the
+        # processed dataframe
+        self.materialize(self.dataframes[-1], incremental=processed is not None)
+        self.export_series(self.dataframes[-1])
 
-        # copying just the columns 'Date' and 'BRL' to the dataframe1
-        self.dataframes[1] = self.dataframes[1][['Date', 'BRL']]
-        self.logger.info(
-            "The columns 'Date' and 'BRL' from dataframe1 was selected.")
+    def transform_chunk(self, source: SourceAdapter, chunk: pd.DataFrame,
+                        renaming: Dict[str, str], currencies: List[str],
+                        ranges: list) -> pd.DataFrame:
+        """
+        This method applies to a chunk of a source the transformations that
+        processing applies to the whole source
+        Args:
+            source (SourceAdapter): the adapter of the source.
+            chunk (pd.DataFrame): the chunk loaded with the source schema.
+            renaming (Dict[str, str]): renaming of the columns to 'Date' and
+                the currency codes.
+            currencies (List[str]): codes of the selected currencies.
+            ranges (list): the date ranges of the source.
+        Returns:
+            pd.DataFrame: the transformed chunk with 'Date' and the currencies.
+        """
+        chunk = source.clean(chunk, renaming, currencies)
+        chunk = chunk[in_ranges(chunk['Date'], ranges)]
+        return chunk.reindex(columns=['Date'] + currencies)
 
-        # applying date filter in dataframe1
-        filter1 = self.dataframes[1]['Date'].dt.year > 1994
-        filter2 = self.dataframes[1]['Date'].dt.year < 2009
-        self.dataframes[1] = self.dataframes[1][filter1 & filter2]
-        self.logger.info(
-            "The interval between 1994-2009 was filtered in dataframe1.")
-
-        # applying date filter in dataframe0
-        filter3 = self.dataframes[0]['Date'].dt.year > 2008
-        self.dataframes[0] = self.dataframes[0][filter3]
-        self.logger.info("The dates above 2008 was filtered in dataframe0.")
-
-        # removing lines with ND value in dataframe1
-        filter4 = self.dataframes[1]['BRL'] == 'ND'
-        self.dataframes[1].drop(
-            self.dataframes[1][filter4].index,
-            inplace=True)
+    def processing_streaming(self) -> None:
+        """
+        This method implements the processing pipeline reading the sources
+        in chunks of the config chunksize, and exporting each transformed
+        chunk, so the memory is bounded by the chunk size and not by the
+        size of the sources
+        """
         self.logger.info(
-            "The rows with Non Data was removed from dataframe1 successfully.")
+            "------------Start streaming data transformation-----------")
+
+        # selecting the currencies of the processed dataframe
+        currencies = self.select_currencies()
+        self.logger.info("The currencies %s were selected.",
+                         ", ".join(currencies))
+
+        # exporting the sources from the newest date range, each one after
+        # the other
+        sources, ranges = self.configured_sources()
+        chunksize = self.config['etl'].get('chunksize', 1000)
+        writer = ProcessedWriter(self.config)
+        rows = 0
+        try:
+            with tempfile.TemporaryDirectory() as spill_dir:
+                for name, source_ranges in streaming_sources(ranges):
+                    source = sources[name]
+                    schema, renaming = source.select(currencies)
+                    chunks = source.iter_chunks(schema, chunksize)
+
+                    # validating each chunk before its transformations
+                    validator = self.source_validator(source, schema)
+                    if validator is not None:
+                        chunks = (self.validate_dataframe(validator, chunk)
+                                  for chunk in chunks)
+                    chunks = (self.transform_chunk(source, chunk, renaming,
+                                                   currencies, source_ranges)
+                              for chunk in chunks)
+
+                    # exporting the chunks from the newest date
+                    with self.profiler.step(f"stream {name}") as step:
+                        step['rows_out'] = 0
+                        for chunk in iter_newest_first(
+                                chunks, Path(spill_dir) / name):
+                            writer.write(chunk)
+                            step['rows_out'] += len(chunk)
+                    source_rows = step['rows_out']
+                    rows += source_rows
+                    self.logger.info(
+                        "%d rows of the source %s were transformed and "
+                        "exported in chunks of %d rows.", source_rows, name,
+                        chunksize)
+
+            if rows == 0:
+                writer.write(empty_processed(currencies))
+            with self.profiler.step("close", rows):
+                paths = writer.close()
+        except Exception:
+            writer.abort()
+            raise
 
-        # concatenating dataframe0 and dataframe1
-        self.dataframes[2] = pd.concat(
-            [self.dataframes[0], self.dataframes[1]])
         self.logger.info(
-            "The dataframe0 and dataframe1 was concatenated in dataframe2.")
+            "The transformed dataset was exported successfully to %s.",
+            ", ".join(str(path) for path in paths))
+
+        # materializing the aggregates and the series store from the
+        # exported store, the chunks were already released
+        if aggregate_tables(self.config) or series_index_path(self.config):
+            processed = read_processed(self.config)
+            self.context.publish(PROCESSED, processed)
+            self.materialize(processed)
+            self.export_series(processed)
+
+    def export_database(self, processed: pd.DataFrame) -> None:
+        """
+        This method writes the processed dataframe to the database, when it
+        is enabled in the config and was not written yet
+        Args:
+            processed (pd.DataFrame): the processed dataframe.
+        """
+        database = config_database(self.config)
+        if database is None or database.path.is_file():
+            return
 
-        # filtering dates above 2000 in dataframe2
-        filter5 = self.dataframes[2]['Date'].dt.year >= 2000
-        self.dataframes[2] = self.dataframes[2][filter5]
-        self.logger.info("The dates above 2000 was filtered in dataframe2.")
+        with self.profiler.step("export database", len(processed)) as step:
+            step['rows_out'] = database.write(processed)
+        self.logger.info("The processed dataset was exported to the database "
+                         "%s.", database.path)
 
-        # exporting the transformed dataset
-        processed_path = Path(self.config['etl']['processed_path'])
-        self.dataframes[2].to_csv(processed_path, index=False)
-        self.logger.info("The transformed dataset was exported successfully.")
+    def export_series(self, processed: pd.DataFrame,
+                      missing_only: bool = False) -> None:
+        """
+        This method exports the compact series store of the processed
+        dataframe, when it is enabled in the series section of the config
+        Args:
+            processed (pd.DataFrame): the processed dataframe.
+            missing_only (bool): export the store only when it was not
+                exported yet.
+        """
+        index_path = series_index_path(self.config)
+        if index_path is None or (missing_only and index_path.is_file()):
+            return
+
+        with self.profiler.step("export series", len(processed)):
+            store = SeriesStore.from_processed(
+                processed, self.config['series'].get('dtype', 'float64'))
+            store.write(index_path.parent)
+        self.context.publish(SERIES, store)
+        self.logger.info("The series store of %d currencies (%.1f KiB) was "
+                         "exported to %s.", len(store.currencies),
+                         store.nbytes / 1024, index_path.parent)
+
+    def materialize(self, processed: pd.DataFrame,
+                    incremental: bool = False) -> None:
+        """
+        This method exports the aggregate tables selected in the aggregates
+        section of the config. In incremental mode, only the rows changed by
+        the dates after the last date of the exported tables are computed
+        and merged into them.
+        Args:
+            processed (pd.DataFrame): the processed dataframe.
+            incremental (bool): update the tables already exported, when
+                they were computed with the same settings.
+        """
+        tables = aggregate_tables(self.config)
+        if not tables:
+            return
+
+        # indexing the rates by the sorted dates
+        rates = processed.set_index('Date').sort_index()
+        settings = aggregate_settings(self.config, list(rates.columns))
+        last_date = rates.index[-1] if len(rates) else None
+
+        # finding the last date of the exported tables in incremental mode
+        since = materialized_since(self.config, settings) if incremental \
+            else None
+        if since is not None and (last_date is None or last_date <= since):
+            self.logger.info("The aggregates are already up to date.")
+            return
+        if since is None:
+            self.logger.info("The aggregates will be computed from all the "
+                             "dates.")
+        else:
+            self.logger.info("The aggregates will be updated with the dates "
+                             "after %s.", since.date())
+
+        # exporting each table and, at last, its settings and last date
+        for table in tables:
+            with self.profiler.step(f"materialize {table.name}",
+                                    len(rates)) as step:
+                step['rows_out'] = table.materialize(rates, self.config, since)
+            self.logger.info("The aggregate table %s was exported to %s.",
+                             table.name, table.path(self.config))
+        write_manifest(self.config, settings, last_date)
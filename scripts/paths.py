@@ -0,0 +1,173 @@
+"""
+This module implements the functions responsible to find the files of
+the processed store and of the aggregate tables. It does not import pandas,
+so the stages of the pipeline can be verified without loading it.
+"""
+from typing import List, Optional
+from pathlib import Path
+import importlib.util
+
+# suffix of the columnar artifact written next to the processed csv
+STORE_SUFFIXES = {'parquet': '.parquet', 'feather': '.feather'}
+
+
+def resolve_store_format(store_format: str = "csv") -> str:
+    """
+    This function resolves the format of the processed store, falling
+    back to csv when pyarrow is not installed
+    Args:
+        store_format (str): "csv", "parquet" or "feather".
+    Returns:
+        str: the format that will be used.
+    """
+    if store_format not in STORE_SUFFIXES:
+        return "csv"
+
+    if importlib.util.find_spec("pyarrow") is None:
+        return "csv"
+
+    return store_format
+
+
+def columnar_path(config: dict) -> Optional[Path]:
+    """
+    This function returns the path of the columnar artifact of the
+    processed store, or None when the store is csv only
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        Path: the path of the columnar artifact, None when the store is
+            csv only.
+    """
+    store_format = resolve_store_format(
+        config['etl'].get('processed_format', 'csv'))
+    if store_format == 'csv':
+        return None
+
+    processed_path = Path(config['etl']['processed_path'])
+    return processed_path.with_suffix(STORE_SUFFIXES[store_format])
+
+
+def database_path(config: dict) -> Optional[Path]:
+    """
+    This function returns the path of the database of the processed rates
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        Path: the path of the database, None when it is not enabled.
+    """
+    settings = config['etl'].get('database') or {}
+    if not settings.get('enabled', False):
+        return None
+    return Path(settings['path'])
+
+
+def store_path(config: dict) -> Path:
+    """
+    This function returns the path of the file loaded by read_processed
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        Path: the database when it is enabled and exists, else the columnar
+            artifact when it exists, the csv file otherwise.
+    """
+    path = database_path(config)
+    if path is not None and path.is_file():
+        return path
+
+    path = columnar_path(config)
+    if path is None or not path.is_file():
+        path = Path(config['etl']['processed_path'])
+    return path
+
+
+def table_path(directory: str, name: str,
+               store_format: str = "csv") -> Path:
+    """
+    This function returns the path of a table saved in the format of the
+    processed store, falling back to csv like resolve_store_format
+    Args:
+        directory (str): directory of the table.
+        name (str): name of the table, without suffix.
+        store_format (str): "csv", "parquet" or "feather".
+    Returns:
+        Path: the path of the table.
+    """
+    store_format = resolve_store_format(store_format)
+    return Path(directory) / (name + STORE_SUFFIXES.get(store_format, '.csv'))
+
+
+# name of the file keeping the settings and the last date of the aggregates
+AGGREGATES_MANIFEST = "aggregates.json"
+
+
+def aggregate_names(config: dict) -> List[str]:
+    """
+    This function returns the names of the aggregate tables selected in the
+    aggregates section of the config
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        List[str]: 'rolling', 'ohlc_<name>' of each frequency and 'periods',
+            empty when the aggregates are not enabled.
+    """
+    settings = config.get('aggregates') or {}
+    if not settings.get('enabled', False):
+        return []
+
+    names = ['rolling'] if settings.get('rolling_windows') else []
+    names += [f"ohlc_{name}" for name in settings.get('ohlc') or {}]
+    if settings.get('periods'):
+        names.append('periods')
+    return names
+
+
+def aggregate_path(config: dict, name: str) -> Path:
+    """
+    This function returns the path of an aggregate table
+    """
+    return table_path(config['aggregates']['path'], name,
+                      config['etl'].get('processed_format', 'csv'))
+
+
+def aggregates_manifest_path(config: dict) -> Path:
+    """
+    This function returns the path of the manifest of the aggregate tables
+    """
+    return Path(config['aggregates']['path']) / AGGREGATES_MANIFEST
+
+
+def aggregate_paths(config: dict) -> List[Path]:
+    """
+    This function returns the paths of the files written by the
+    materialization of the aggregates
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        List[Path]: the tables and the manifest, empty when the aggregates
+            are not enabled.
+    """
+    names = aggregate_names(config)
+    if not names:
+        return []
+    return [aggregate_path(config, name) for name in names] + \
+        [aggregates_manifest_path(config)]
+
+
+# name of the file keeping the currencies and the dates of the series store
+SERIES_INDEX = "index.json"
+
+
+def series_index_path(config: dict) -> Optional[Path]:
+    """
+    This function returns the path of the index of the compact series
+    store, written after all its arrays
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        Path: the path of the index, None when the store is not enabled.
+    """
+    settings = config.get('series') or {}
+    if not settings.get('enabled', False):
+        return None
+    return Path(settings['path']) / SERIES_INDEX
@@ -1,12 +1,82 @@
 """
 This module implements the class GeneratePlots
-that is responsible to create the plots and export them.
+that is responsible to create the plots and export them,
+and the batch rendering of a list of RenderJob.
 """
+from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import logging
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib import style
-from .utils import set_logger, parse_config
+from matplotlib import rcParams
+from matplotlib.colors import to_rgba
+from matplotlib.dates import AutoDateLocator, ConciseDateFormatter, date2num
+from matplotlib.figure import Figure
+from matplotlib.ticker import FormatStrFormatter, MaxNLocator
+from .context import PROCESSED, SERIES, PipelineContext
+from .utils import run_buffered, replay_records
+from .profiling import StepProfiler, profiled
+from .rendering import FigureTemplate
+from .downsampling import get_downsampler
+from .paths import series_index_path
+from .series import CompactSeries, SeriesStore
+from .store import read_processed
+
+
+# charts that a RenderJob can render
+CHARTS = ("graph1", "graph2")
+
+# colors of the line and of the name of each government of the first graph
+GOVERNMENT_COLORS = {'fhc': ('#BF5FFF', '#BF5FFF'),
+                     'lula': ('#ffa500', '#ffa500'),
+                     'dilma': ('#646464', '#646464'),
+                     'temer': ('#86BE3C', '#86BE3C'),
+                     'bolsonaro': ('#C33734', '#00B2EE')}
+
+# fractions of the range of the rates added below and above it in the
+# subplots of the first graph, leaving room for the names of the governments
+RATE_MARGINS = (0.25, 0.4)
+
+# days highlighted around the peak of the covid-19 period of the second graph
+PEAK_DAYS = 150
+
+# GeneratePlots of a worker of render_jobs, sharing the series store
+_WORKER_PLOTS = None
+
+
+class RenderJob():
+    """
+    This class describes a chart to render: its type, its currency, the
+    dates it shows and the path of its image
+    """
+
+    chart: str
+    currency: str
+    start: str
+    end: str
+    output: str
+
+    def __init__(self, chart: str, currency: str, output: str,
+                 start: str = None, end: str = None) -> None:
+        """
+        Constructor to the class RenderJob
+        Args:
+            chart (str): "graph1", the rates of each government, or "graph2",
+                the rates of a period with the covid-19 highlighted.
+            currency (str): code of the currency in the processed dataframe.
+            output (str): path of the image, or a binary file object
+                receiving the image as png.
+            start (str): first date of the chart, None for the first date.
+            end (str): date after the last one, None for the last date.
+        """
+        if chart not in CHARTS:
+            raise ValueError(f"The chart {chart} is not one of {CHARTS}")
+        self.chart = chart
+        self.currency = currency
+        self.output = output
+        self.start = start
+        self.end = end
 
 
 class GeneratePlots():
@@ -17,293 +87,618 @@ class GeneratePlots():
 
     config_path: str
     data_path: str
-    dataframe: pd.DataFrame
+    store: SeriesStore
+    currency: str
+    dataframe: CompactSeries
+    smoothed: Dict[str, CompactSeries]
     logger: logging
+    profiler: StepProfiler
+    templates: Dict[str, FigureTemplate]
+    artists: Dict[str, dict]
+    context: PipelineContext
     config: dict
-    fhc: pd.DataFrame
-    lula: pd.DataFrame
-    dilma: pd.DataFrame
-    temer: pd.DataFrame
-    bolsonaro: pd.DataFrame
-    selected: pd.DataFrame
-    covid: pd.DataFrame
-
-    def __init__(self, config_path: str = "./config.yml") -> None:
+    fhc: CompactSeries
+    lula: CompactSeries
+    dilma: CompactSeries
+    temer: CompactSeries
+    bolsonaro: CompactSeries
+    selected: CompactSeries
+    covid: CompactSeries
+
+    def __init__(self, config_path: str = "./config.yml",
+                 processed: pd.DataFrame = None,
+                 store: SeriesStore = None,
+                 context: PipelineContext = None,
+                 currencies: List[str] = None) -> None:
         """
         Constructor to the class GeneratePlots
+        Args:
+            config_path (str): path to the config yaml file.
+            processed (pd.DataFrame): the processed dataframe already loaded.
+            store (SeriesStore): the series store already loaded. When both
+                are not given, the ones published in the context by the ETL
+                are used, else the series store exported by the ETL is
+                memory-mapped, or the processed store is read.
+            context (PipelineContext): the context of the run, with the
+                config already parsed.
+            currencies (List[str]): codes of the currencies read from the
+                processed store, all of them when it is None. The first one
+                in the store is selected, else the first currency of the
+                store.
         """
+        # sharing the config, the loggers and the artifacts of the run
+        self.context = context or PipelineContext(config_path)
+
         # initializing the config_path attribute
-        self.config_path = config_path
+        self.config_path = self.context.config_path
 
         # loading config file in the config attribute
-        self.config = parse_config(self.config_path)
+        self.config = self.context.config
 
         # configuring logger attribute
-        self.logger = set_logger("plots", self.config['log']['log_plot_path'])
+        self.logger = self.context.logger("plots", 'log_plot_path')
         self.logger.info("Plots config: %s", self.config['plots'])
 
+        # measuring the steps of the plots in the logs
+        self.profiler = StepProfiler(self.logger)
+
         # initializing the data path attribute
         self.data_path = self.config['etl']['processed_path']
 
-        # loading the processed dataframe
-        self.dataframe = pd.read_csv(self.data_path)
-        self.logger.info("The processed dataframe was loaded succesfully.")
+        # taking the processed data of the ETL of this run from memory
+        if store is None and processed is None:
+            store = self.context.artifact(SERIES)
+            processed = self.context.artifact(PROCESSED)
+            if store is not None or processed is not None:
+                self.logger.info("The processed data of the ETL was taken "
+                                 "from the context of the run.")
+
+        # mapping the series store exported by the ETL in memory
+        index_path = series_index_path(self.config)
+        if store is None and processed is None and index_path is not None \
+                and index_path.is_file():
+            with self.profiler.step("open series") as step:
+                store = SeriesStore.open(index_path.parent)
+                step['rows_out'] = sum(len(series)
+                                       for series in store.series.values())
+            self.logger.info("The series store was memory-mapped from %s.",
+                             index_path.parent)
+
+        # loading the processed dataframe, with the column 'Date' as datetime
+        if store is None and processed is None:
+            with self.profiler.step("load") as step:
+                processed = read_processed(self.config,
+                                           currencies=currencies)
+                step['rows_out'] = len(processed)
+            self.logger.info("The processed dataframe was loaded succesfully.")
+
+        # keeping the dates with a rate of each currency sorted in compact
+        # arrays, so the periods are found by binary search and selected as
+        # slices sharing the arrays
+        if store is None:
+            with self.profiler.step("compact", len(processed)):
+                store = SeriesStore.from_processed(
+                    processed,
+                    (self.config.get('series') or {}).get('dtype', 'float64'))
+            self.logger.info("The processed dataframe was converted to "
+                             "compact series.")
+        self.store = store
+
+        # selecting the dates with a rate of the first requested currency,
+        # else of the first currency of the store
+        self.smoothed = {}
+        codes = [code for code in currencies or [] if code in self.store] or \
+            self.store.currencies
+        self.currency = None
+        if codes:
+            self.select_currency(codes[0])
+
+        # creating the templates of the graphs, each one is built in its
+        # first render and reused by the next ones, downsampling the lines
+        # to the width of their subplots when it is set in the config
+        downsample = get_downsampler(self.config['plots'].get('downsample'))
+        self.artists = {}
+        self.templates = {
+            'plot1': FigureTemplate(self.build_graph1, downsample=downsample,
+                                    layout=self.layout_graph1),
+            'plot2': FigureTemplate(self.build_graph2, downsample=downsample,
+                                    layout=self.layout_graph2)}
+
+    def select_currency(self, currency: str) -> None:
+        """
+         This function is responsible to select the series of the dates with
+         a rate of a currency as the Dataframe of the plots
+         Args:
+            currency (str): code of the currency in the processed dataframe.
+        """
+        if currency not in self.store:
+            raise ValueError(f"The currency {currency} is not in the "
+                             "processed dataframe")
 
-        # converting the column 'Date' to datetime type
-        self.dataframe['Date'] = pd.to_datetime(self.dataframe['Date'])
-        self.logger.info(
-            "The type of the column 'Date' was changed to datetime type.")
+        self.currency = currency
+        self.dataframe = self.store[currency]
+        self.logger.info("The dates with a %s rate were selected.", currency)
 
-    def plot_graph1_preprocessing(self) -> None:
+    def period_rows(self, periods: Dict[str, list]) -> Dict[str, slice]:
+        """
+         This function is responsible to find, with one binary search over the
+         sorted dates, the rows of each period of the Dataframe
+         Args:
+            periods (Dict[str, list]): first date and date after the last one
+                of each period, None for an open period.
+         Returns:
+            Dict[str, slice]: the rows of each period.
+        """
+        bounds = [bound for period in periods.values() for bound in period]
+        found = iter(self.dataframe.search(
+            [bound for bound in bounds if bound is not None]))
+
+        # an open period starts at the first row or ends after the last one
+        positions = [next(found) if bound is not None
+                     else (0 if number % 2 == 0 else len(self.dataframe))
+                     for number, bound in enumerate(bounds)]
+        return {name: slice(positions[2 * number], positions[2 * number + 1])
+                for number, name in enumerate(periods)}
+
+    def plot_graph1_preprocessing(self, rows: slice = None) -> None:
         """
          This function is responsible to preprocess the Dataframe
          for using it in the plot of BRL Exchange rate for president
+         Args:
+            rows (slice): rows of the Dataframe in the plot, all of them
+                when it is not given.
         """
-
-        # obtaining the period of FHC government
-        filter1 = self.dataframe['Date'].dt.year >= 2000
-        filter2 = self.dataframe['Date'].dt.year < 2003
-        self.fhc = self.dataframe.copy()[filter1 & filter2]
-        self.logger.info("The period of FHC government was selected.")
-
-        # obtaining the period of LULA government
-        filter3 = self.dataframe['Date'].dt.year >= 2003
-        filter4 = self.dataframe['Date'].dt.year < 2011
-        self.lula = self.dataframe.copy()[filter3 & filter4]
-        self.logger.info("The period of LULA government was selected.")
-
-        # obtaining the period of DILMA government
-        filter5 = self.dataframe['Date'].dt.year >= 2010
-        filter6 = self.dataframe['Date'].dt.year < 2017
-        self.dilma = self.dataframe.copy()[filter5 & filter6]
-        self.logger.info("The period of DILMA government was selected.")
-
-        # obtaining the period of TEMER government
-        filter7 = self.dataframe['Date'].dt.year >= 2017
-        filter8 = self.dataframe['Date'].dt.year < 2018
-        self.temer = self.dataframe.copy()[filter7 & filter8]
-        self.logger.info("The period of TEMER government was selected.")
-
-        # obtaining the period of BOLSONARO government
-        filter9 = self.dataframe['Date'].dt.year >= 2018
-        self.bolsonaro = self.dataframe.copy()[filter9]
-        self.logger.info("The period of BOLSONARO government was selected.")
-
-        # applying the rolling mean to the FHC dataframe
-        self.fhc['BRL'] = self.fhc['BRL'].rolling(2).mean()
-        self.logger.info("The rolling mean was applied to FHC dataframe.")
-
-        # applying the rolling mean to the LULA dataframe
-        self.lula['BRL'] = self.lula['BRL'].rolling(2).mean()
-        self.logger.info("The rolling mean was applied to LULA dataframe.")
-
-        # applying the rolling mean to the DILMA dataframe
-        self.dilma['BRL'] = self.dilma['BRL'].rolling(2).mean()
-        self.logger.info("The rolling mean was applied to DILMA dataframe.")
-
-        # applying the rolling mean to the TEMER dataframe
-        self.temer['BRL'] = self.temer['BRL'].rolling(2).mean()
-        self.logger.info("The rolling mean was applied to TEMER dataframe.")
-
-        # applying the rolling mean to the BOLSONARO dataframe
-        self.bolsonaro['BRL'] = self.bolsonaro['BRL'].rolling(2).mean()
-        self.logger.info(
-            "The rolling mean was applied to BOLSONARO dataframe.")
-
-    def plot_graph1(self) -> None:
+        if self.currency is None:
+            raise ValueError("The processed dataframe has no currency to "
+                             "plot")
+
+        # applying the rolling mean once to the whole series of the
+        # currency, averaging each date with the next one
+        if self.currency not in self.smoothed:
+            with self.profiler.step("rolling mean", len(self.dataframe)):
+                self.smoothed[self.currency] = self.dataframe.rolling_pairs()
+            self.logger.info("The rolling mean was applied to the dataframe.")
+        smoothed = self.smoothed[self.currency]
+
+        # obtaining the period of each government as a slice of the smoothed
+        # dataframe, without its last date that has no next date in the period
+        rows = rows or slice(0, len(smoothed))
+        with self.profiler.step("select terms", len(smoothed)) as step:
+            terms = self.period_rows(self.config['plots']['terms'])
+            periods = {name: smoothed[clip_rows(
+                slice(term.start, term.stop - 1), rows)]
+                for name, term in terms.items()}
+            step['rows_out'] = sum(len(period) for period in periods.values())
+        self.fhc = periods['fhc']
+        self.lula = periods['lula']
+        self.dilma = periods['dilma']
+        self.temer = periods['temer']
+        self.bolsonaro = periods['bolsonaro']
+        self.logger.info("The periods of the governments %s were selected.",
+                         ", ".join(name.upper() for name in terms))
+
+    def build_graph1(self, figure: Figure,
+                     series: Dict[str, tuple]) -> Dict[str, list]:
         """
-         This function is responsible to apply the preprocessing steps in
-         the Dataframe and for create and export the plot of BRL Exchange rate for president
+         This function is responsible to draw the plot of the exchange rate
+         for president in an empty figure, once for all the renders of its
+         template. The scale of the rates, the years and the titles depend on
+         the rates of each render and are set by layout_graph1.
+         Args:
+            figure (Figure): the empty figure, in the FiveThirtyEight style.
+            series (Dict[str, tuple]): dates and rates of each government.
+         Returns:
+            Dict[str, list]: the lines of each government.
         """
 
-        # preprocessing data
-        self.plot_graph1_preprocessing()
-
-        # adding the FiveThirtyEight style
-        style.use('fivethirtyeight')
-        self.logger.info("The plot style was changed to 'fivethirtyeight'.")
-
-        # adding the subplots
-        plt.figure(figsize=(12, 6))
-        ax1 = plt.subplot(2, 5, 1)
-        ax2 = plt.subplot(2, 5, 2)
-        ax3 = plt.subplot(2, 5, 3)
-        ax4 = plt.subplot(2, 5, 4)
-        ax5 = plt.subplot(2, 5, 5)
-        ax6 = plt.subplot(2, 1, 2)
+        # adding the subplots, one by government and one of all of them
+        axes = [figure.add_subplot(2, 5, number) for number in range(1, 6)]
+        ax6 = figure.add_subplot(2, 1, 2)
         self.logger.info("The subplots were created.")
 
-        axes = [ax1, ax2, ax3, ax4, ax5, ax6]
-
-        # applying changed to all subplots
-        for axe in axes:
-            axe.set_ylim(0.5, 2.0)
-            axe.set_yticks([1.0, 2.0, 3.5, 5.0, 7.0])
-            axe.set_yticklabels(['1.0', '2.0', '3.5', '5.0', '7.0'],
-                                alpha=0.3)
-            axe.set_xticklabels([])
+        # applying changes to all subplots, the dates of the ticks are
+        # located and formatted for the dates of each render
+        faded = to_rgba(rcParams['text.color'], 0.3)
+        for axe in axes + [ax6]:
+            axe.tick_params(labelcolor=faded)
             axe.grid(alpha=0.5)
-
+        for axe in axes:
+            locator = AutoDateLocator(minticks=2, maxticks=4)
+            axe.xaxis.set_major_locator(locator)
+            axe.xaxis.set_major_formatter(
+                ConciseDateFormatter(locator, show_offset=False))
+        ax6.set_xticks([])
         self.logger.info("The changes were applied to all subplots.")
 
-        # ax1: FHC
-        ax1.plot(self.fhc['Date'], self.fhc['BRL'],
-                 color='#BF5FFF')
-        ax1.set_xticklabels(
-            ['', '2000', '', '', '', '2001', '', '', '', '2002'], alpha=0.3)
-        ax1.text(11300.0, 6.4, 'FHC', fontsize=18, weight='bold',
-                color='#BF5FFF')
-        ax1.text(11050.0, 5.8, '(2000-2002)', weight='bold',
-                alpha=0.3)
-        self.logger.info("The FHC plot was created.")
-
-        # ax2: LULA
-        ax2.plot(self.lula['Date'], self.lula['BRL'],
-                 color='#ffa500')
-        ax2.set_xticklabels(['', '2002', '', '', '', '2006', '',
-                     '', '', '2010'], alpha=0.3)
-        ax2.text(13000.0, 6.4, 'LULA', fontsize=18, weight='bold',
-                 color='#ffa500')
-        ax2.text(12400.0, 5.8, '(2003-2008)', weight='bold',
-                alpha=0.3)
-        self.logger.info("The LULA plot was created.")
-
-        # ax3: DILMA
-        ax3.plot(self.dilma['Date'], self.dilma['BRL'],
-                 color='#646464')
-        ax3.set_xticklabels(['', '2010', '', '', '2013', '',
-                            '', '', '2016'], alpha=0.3)
-        ax3.text(15100.0, 6.4, 'DILMA', fontsize=18, weight='bold',
-                 color='#646464')
-        ax3.text(14800.0, 5.8, '(2011-2016)', weight='bold',
-                alpha=0.3)
-        self.logger.info("The DILMA plot was created.")
-
-        # ax4: TEMER
-        ax4.plot(self.temer['Date'], self.temer['BRL'],
-                 color='#86BE3C')
-        ax4.set_xticklabels(['', '2017', '', '',
-                            '', '2018', ''], alpha=0.3)
-        ax4.text(17240.0, 6.4, 'TEMER', fontsize=18, weight='bold',
-                color='#86BE3C')
-        ax4.text(17200.0, 5.8, '(2017-2018)', weight='bold',
-                alpha=0.3)
-        self.logger.info("The TEMER plot was created.")
-
-        # ax5: BOLSONARO
-        ax5.plot(self.bolsonaro['Date'], self.bolsonaro['BRL'],
-                 color='#C33734')
-        ax5.set_xticklabels(['', '2019', '', '', '2020', '', '', '2021', ''],
-                            alpha=0.3)
-        ax5.text(17500.0, 6.4, 'BOLSONARO', fontsize=18, weight='bold',
-                color='#00B2EE')
-        ax5.text(17700.0, 5.8, '(2019-2021)', weight='bold',
-                 alpha=0.3)
-        self.logger.info("The BOLSONARO plot was created.")
-
-        # ax6: TODOS OS PRESIDENTES
-        ax6.plot(self.fhc['Date'], self.fhc['BRL'],
-                 color='#BF5FFF')
-        ax6.plot(self.lula['Date'], self.lula['BRL'],
-                 color='#ffa500')
-        ax6.plot(self.dilma['Date'], self.dilma['BRL'],
-                 color='#646464')
-        ax6.plot(self.temer['Date'], self.temer['BRL'],
-                 color='#86BE3C')
-        ax6.plot(self.bolsonaro['Date'], self.bolsonaro['BRL'],
-                 color='#C33734')
-        ax6.grid(alpha=0.5)
-        ax6.set_xticks([])
-        self.logger.info("The plot with all presidents was created.")
+        # drawing each government in its subplot and in the subplot of all
+        # of them, with its name and the years of its rates
+        lines, years = {}, {}
+        for axe, (name, (line_color, name_color)) in zip(
+                axes, GOVERNMENT_COLORS.items()):
+            line, = axe.plot(*series[name], color=line_color)
+            line_all, = ax6.plot(*series[name], color=line_color)
+            axe.text(0.5, 0.908, name.upper(), transform=axe.transAxes,
+                     ha='center', fontsize=18, weight='bold', color=name_color)
+            years[name] = axe.text(0.5, 0.815, '', transform=axe.transAxes,
+                                   ha='center', weight='bold', alpha=0.3)
+            lines[name] = [line, line_all]
+            self.logger.info("The %s plot was created.", name.upper())
 
         # addind the title and subtitle
-        ax1.text(10500.0, 8.3, 'COTAÇÃO USD-REAL ENTRE 2000-2021',
-                fontsize=14, weight='bold')
-        ax1.text(10500.0, 7.3, '''USD-REAL taxas de câmbio para o governo FHC (2000 - 2002), LULA (2002-2010),
-                Dilma (2010-2016), Temer(2017-2018), Bolsonaro(2018-2021)''',
-                fontsize=10)
+        title = figure.text(0.03, 0.954, '', fontsize=14, weight='bold')
+        subtitle = figure.text(0.03, 0.94, '', va='top', fontsize=10)
         self.logger.info("The title and subtitle were added to the plot.")
 
         # adding a signature
-        ax6.text(10500.0, 0.05, 'DCA0305' + ' ' * 110 + 'Arthur França/Thiago Maia',
-                color='#f0f0f0', backgroundcolor='#4d4d4d',
-                size=14)
+        ax6.text(-0.007, -0.069,
+                 'DCA0305' + ' ' * 110 + 'Arthur França/Thiago Maia',
+                 transform=ax6.transAxes, color='#f0f0f0',
+                 backgroundcolor='#4d4d4d', size=14)
         self.logger.info("The signature was added to the plot.")
 
-        # exporting the first graph
-        plt.savefig(self.config['plots']['plot1_path'])
+        self.artists['plot1'] = {'years': years, 'title': title,
+                                 'subtitle': subtitle, 'axes': figure.axes}
+        return lines
+
+    def layout_graph1(self, series: Dict[str, tuple]) -> None:
+        """
+         This function is responsible to set the scale of the rates, the
+         years of each government and the titles of the first graph from the
+         currency and the rates of a render
+         Args:
+            series (Dict[str, tuple]): dates and rates of each government.
+        """
+        artists = self.artists['plot1']
+
+        # scaling all the subplots to the rates of all the governments,
+        # leaving room above them for the names
+        limits = rate_limits(series.values())
+        if limits is not None:
+            for axe in artists['axes']:
+                axe.set_ylim(*limits)
+
+        # showing the years of the governments with rates
+        terms = []
+        for name, (dates, _) in series.items():
+            years = years_text(dates)
+            artists['years'][name].set_text(f"({years})" if years else '')
+            artists['years'][name].axes.tick_params(
+                axis='x', labelbottom=bool(years))
+            if years:
+                terms.append(f"{name.upper()} ({years})")
+
+        # titling the graph with the currency and the years of the render
+        dates = [dates for dates, _ in series.values() if len(dates)]
+        years = years_text(np.concatenate(dates)) if dates else ''
+        artists['title'].set_text(
+            f"COTAÇÃO USD-{self.currency} ENTRE {years}".strip())
+        artists['subtitle'].set_text(
+            f"USD-{self.currency} taxas de câmbio para o governo " +
+            ", ".join(terms[:2]) +
+            (",\n" + ", ".join(terms[2:]) if terms[2:] else ""))
+
+    @profiled("plot_graph1")
+    def plot_graph1(self, output: str = None, rows: slice = None) -> None:
+        """
+         This function is responsible to apply the preprocessing steps in
+         the Dataframe and for create and export the plot of BRL Exchange rate for president
+         Args:
+            output (str): path of the image, the plot1_path of the config
+                when it is not given.
+            rows (slice): rows of the Dataframe in the plot.
+        """
+
+        # preprocessing data
+        self.plot_graph1_preprocessing(rows)
+
+        # drawing the governments in the template of the first graph and
+        # exporting it
+        periods = {'fhc': self.fhc, 'lula': self.lula, 'dilma': self.dilma,
+                   'temer': self.temer, 'bolsonaro': self.bolsonaro}
+        series = {name: (period.dates, period.rates)
+                  for name, period in periods.items()}
+        with self.profiler.step("render"):
+            self.templates['plot1'].render(
+                series, output or self.config['plots']['plot1_path'])
         self.logger.info("The first graph was saved successfully.")
 
-    def plot_graph2_preprocessing(self) -> None:
+    def plot_graph2_preprocessing(self, rows: slice = None) -> None:
         """
          This function is responsible to preprocess the Dataframe
          for using it in the plot of BRL Exchange rate in covid 19 period
+         Args:
+            rows (slice): rows of the Dataframe in the plot, the selected
+                window of the config when it is not given.
         """
-
-        # obtaining the period of the plot
-        filter1 = self.dataframe['Date'].dt.year >= 2016
-        filter2 = self.dataframe['Date'].dt.year < 2021
-        self.selected = self.dataframe.copy()[filter1 & filter2]
+        if self.currency is None:
+            raise ValueError("The processed dataframe has no currency to "
+                             "plot")
+
+        # obtaining the period of the plot and the period of the covid-19
+        # as slices of the dataframe
+        with self.profiler.step("select windows", len(self.dataframe)) \
+                as step:
+            windows = self.period_rows(self.config['plots']['windows'])
+            rows = rows or windows['selected']
+            step['rows_out'] = rows.stop - rows.start
+        self.selected = self.dataframe[rows]
         self.logger.info("The period of plot was selected.")
 
-        # obtaining the period of the covid-19
-        filter3 = self.dataframe['Date'].dt.year >= 2019
-        self.covid = self.dataframe.copy()[filter3 & filter2]
+        self.covid = self.dataframe[clip_rows(windows['covid'], rows)]
         self.logger.info("The period of covid-19 was selected.")
 
-    def plot_graph2(self) -> None:
+    def build_graph2(self, figure: Figure,
+                     series: Dict[str, tuple]) -> Dict[str, list]:
         """
-         This function is responsible to apply the preprocessing steps in
-         the Dataframe and for create and export the plot of BRL Exchange rate for covid-19
+         This function is responsible to draw the plot of the exchange rate
+         for covid-19 in an empty figure, once for all the renders of its
+         template. The highlighted peak and the titles depend on the rates of
+         each render and are set by layout_graph2.
+         Args:
+            figure (Figure): the empty figure, in the FiveThirtyEight style.
+            series (Dict[str, tuple]): dates and rates of the selected period
+                and of the covid-19 period.
+         Returns:
+            Dict[str, list]: the line of each period.
         """
 
-        # preprocessing data
-        self.plot_graph2_preprocessing()
-
-        # adding the FiveThirtyEight style
-        style.use('fivethirtyeight')
-        self.logger.info("The plot style was changed to 'fivethirtyeight'.")
-
         # adding the selected period to plot
-        _, axe = plt.subplots(figsize=(12, 6))
-        axe.plot(self.selected['Date'], self.selected['BRL'],
-                 linewidth=1, color='#A6D785')
+        axe = figure.add_subplot()
+        selected_line, = axe.plot(*series['selected'],
+                                  linewidth=1, color='#A6D785')
         self.logger.info("The selected period was plotted.")
 
         # adding the covid-19 period to plot
-        axe.plot(self.covid['Date'], self.covid['BRL'],
-                 linewidth=3, color='#e23d28')
+        covid_line, = axe.plot(*series['covid'],
+                               linewidth=3, color='#e23d28')
         self.logger.info("The covid-19 period was plotted.")
 
-        # highlihting the peak of the crisis
-        axe.axvspan(xmin=18300.0, xmax=18450.0, ymin=0.03,
-                    alpha=0.3, color='grey')
+        # highlihting the peak of the crisis, placed in each render
+        peak = axe.axvspan(xmin=0.0, xmax=1.0, ymin=0.03,
+                           alpha=0.3, color='grey')
         self.logger.info("The highlihting to the peak crisis was added.")
 
-        # adding separete tick labels
-        axe.set_xticklabels([])
-        axe.set_yticklabels([])
-        self.logger.info("The separate tick labels was added.")
-
-        x_coord = 16750.0
-        for year in ['2016', '2017', '2018', '2019', '2020', '2021']:
-            axe.text(x_coord, 2.75, year, alpha=0.5, fontsize=16)
-            x_coord += 365
-        self.logger.info("The x ticks was added.")
-
-        y_coord = 3.05
-        for rate in ['3.0', '4.0', '5.0', '6.0']:
-            axe.text(16700, y_coord, rate, alpha=0.5, fontsize=16)
-            y_coord += 1.0
-        self.logger.info("The y ticks was added.")
+        # adding the tick labels, located and formatted for the dates and
+        # the rates of each render
+        axe.tick_params(labelsize=16,
+                        labelcolor=to_rgba(rcParams['text.color'], 0.5))
+        locator = AutoDateLocator(minticks=3, maxticks=7)
+        axe.xaxis.set_major_locator(locator)
+        axe.xaxis.set_major_formatter(
+            ConciseDateFormatter(locator, show_offset=False))
+        axe.yaxis.set_major_locator(MaxNLocator(4, steps=[1, 2, 5, 10]))
+        axe.yaxis.set_major_formatter(FormatStrFormatter('%.1f'))
+        self.logger.info("The tick labels were added.")
 
         # adding a title and a subtitle
-        axe.text(17000.0, 6.25, "Real-USD rate peaked at 5.88 during 2020's Covid crises",
-                weight='bold', fontsize=18)
-        axe.text(17200, 6.10, 'Real-USD exchange rates between 2016 and 2021',
-                size=16)
+        title = figure.text(0.515, 0.927, '', ha='center', weight='bold',
+                            fontsize=18)
+        subtitle = figure.text(0.515, 0.888, '', ha='center', size=16)
         self.logger.info("The title and subtitle were added.")
 
-        # exporting the second graph
-        plt.savefig(self.config['plots']['plot2_path'])
+        self.artists['plot2'] = {'peak': peak, 'title': title,
+                                 'subtitle': subtitle}
+        return {'selected': [selected_line], 'covid': [covid_line]}
+
+    def layout_graph2(self, series: Dict[str, tuple]) -> None:
+        """
+         This function is responsible to place the peak of the covid-19
+         period and to set the titles of the second graph from the currency
+         and the rates of a render
+         Args:
+            series (Dict[str, tuple]): dates and rates of the selected period
+                and of the covid-19 period.
+        """
+        artists = self.artists['plot2']
+        dates, rates = series['selected']
+        covid_dates, covid_rates = series['covid']
+
+        # highlighting the days around the peak of the covid-19 period
+        artists['peak'].set_visible(len(covid_rates) > 0)
+        if len(covid_rates):
+            peak = date2num(covid_dates[np.argmax(covid_rates)])
+            first = max(peak - PEAK_DAYS / 2, date2num(covid_dates[0]))
+            last = min(peak + PEAK_DAYS / 2, date2num(covid_dates[-1]))
+            artists['peak'].set_x(first)
+            artists['peak'].set_width(last - first)
+
+        # titling the graph with the currency, its peak and the years of the
+        # render
+        pair = f"{self.currency}-USD"
+        if len(covid_rates):
+            title = (f"{pair} rate peaked at {np.max(covid_rates):.2f} "
+                     "during 2020's Covid crises")
+        elif len(rates):
+            title = (f"{pair} rate peaked at {np.max(rates):.2f} in "
+                     f"{years_text(dates[[np.argmax(rates)]])}")
+        else:
+            title = f"There are no {pair} rates in the period"
+        artists['title'].set_text(title)
+        years = years_text(dates)
+        if '-' in years:
+            subtitle = f"{pair} exchange rates between " + \
+                " and ".join(years.split('-'))
+        else:
+            subtitle = f"{pair} exchange rates in {years}" if years else ''
+        artists['subtitle'].set_text(subtitle)
+
+    @profiled("plot_graph2")
+    def plot_graph2(self, output: str = None, rows: slice = None) -> None:
+        """
+         This function is responsible to apply the preprocessing steps in
+         the Dataframe and for create and export the plot of BRL Exchange rate for covid-19
+         Args:
+            output (str): path of the image, the plot2_path of the config
+                when it is not given.
+            rows (slice): rows of the Dataframe in the plot.
+        """
+
+        # preprocessing data
+        self.plot_graph2_preprocessing(rows)
+
+        # drawing the periods in the template of the second graph and
+        # exporting it
+        series = {'selected': (self.selected.dates, self.selected.rates),
+                  'covid': (self.covid.dates, self.covid.rates)}
+        with self.profiler.step("render"):
+            self.templates['plot2'].render(
+                series, output or self.config['plots']['plot2_path'])
         self.logger.info("The second graph was saved successfully.")
+
+    def render_job(self, job: RenderJob) -> str:
+        """
+         This function is responsible to render the chart of a job, reusing
+         the rates, the rolling mean and the template of the previous jobs
+         Args:
+            job (RenderJob): the chart to render.
+         Returns:
+            str: the path of the image.
+        """
+        self.select_currency(job.currency)
+        rows = self.period_rows({'job': [job.start, job.end]})['job']
+        if job.chart == 'graph1':
+            self.plot_graph1(job.output, rows)
+        else:
+            self.plot_graph2(job.output, rows)
+        return job.output
+
+    def close(self) -> None:
+        """
+         This function is responsible to release the figures of the templates
+        """
+        for template in self.templates.values():
+            template.close()
+
+
+def years_text(dates: np.ndarray) -> str:
+    """
+    This function returns the first and the last year of some dates, e.g.
+    "2019-2021", or their year when it is the same
+    Args:
+        dates (np.ndarray): the dates, datetime64.
+    Returns:
+        str: the years, empty when there are no dates.
+    """
+    if len(dates) == 0:
+        return ''
+    first, last = (pd.Timestamp(date).year
+                   for date in (np.min(dates), np.max(dates)))
+    return str(first) if first == last else f"{first}-{last}"
+
+
+def rate_limits(series, margins: tuple = RATE_MARGINS) -> tuple:
+    """
+    This function returns the limits of an axis of rates showing the rates
+    of some series, with a margin below and above them
+    Args:
+        series: the dates and the rates of each series.
+        margins (tuple): fractions of the range of the rates below and
+            above them.
+    Returns:
+        tuple: the lowest and the highest limits, None without rates.
+    """
+    rates = [values for _, values in series if len(values)]
+    if not rates:
+        return None
+    low = min(float(np.min(values)) for values in rates)
+    high = max(float(np.max(values)) for values in rates)
+    span = (high - low) or abs(high) or 1.0
+    return low - margins[0] * span, high + margins[1] * span
+
+
+def clip_rows(rows: slice, bounds: slice) -> slice:
+    """
+    This function returns the rows of a slice that are inside the bounds
+    Args:
+        rows (slice): the rows, with start and stop.
+        bounds (slice): the bounds, with start and stop.
+    Returns:
+        slice: the intersection, empty when they do not overlap.
+    """
+    start = max(rows.start, bounds.start)
+    return slice(start, max(min(rows.stop, bounds.stop), start))
+
+
+def init_render_worker(context: PipelineContext, store: SeriesStore) -> None:
+    """
+    This function creates the GeneratePlots of a worker of render_jobs from
+    the config and the series store loaded by the main process, a store
+    mapped from its files is mapped again by the worker instead of copied.
+    Its logs repeat the ones of the main process, so they are discarded.
+    Args:
+        context (PipelineContext): the context with the parsed config.
+        store (SeriesStore): the series store.
+    """
+    _, error = run_buffered(partial(_create_worker_plots, context, store))
+    if error is not None:
+        raise error
+
+
+def _create_worker_plots(context: PipelineContext,
+                         store: SeriesStore) -> None:
+    """
+    This function creates the GeneratePlots of the worker
+    """
+    global _WORKER_PLOTS  # pylint: disable=global-statement
+    _WORKER_PLOTS = GeneratePlots(context.config_path, store=store,
+                                  context=context)
+
+
+def _render_worker_job(job: RenderJob) -> None:
+    """
+    This function renders a job with the GeneratePlots of the worker, its
+    logger is configured again to keep the records of this job
+    """
+    _WORKER_PLOTS.context.logger("plots", 'log_plot_path')
+    _WORKER_PLOTS.render_job(job)
+
+
+def render_worker_job(job: RenderJob) -> tuple:
+    """
+    This function renders a job in a worker of render_jobs
+    Args:
+        job (RenderJob): the chart to render.
+    Returns:
+        tuple: the log records of the job and its error or None.
+    """
+    return run_buffered(partial(_render_worker_job, job))
+
+
+def render_jobs(jobs: List[RenderJob], config_path: str = "./config.yml",
+                processes: int = 1,
+                context: PipelineContext = None) -> List[str]:
+    """
+    This function renders a list of charts loading the processed dataframe
+    once, in a process pool when processes is greater than one. The logs of
+    the workers are emitted in the order of the jobs.
+    Args:
+        jobs (List[RenderJob]): the charts to render.
+        config_path (str): path to the config yaml file.
+        processes (int): maximum number of processes.
+        context (PipelineContext): the context of the run, see
+            GeneratePlots.
+    Returns:
+        List[str]: the paths of the images.
+    """
+    plots = GeneratePlots(config_path, context=context,
+                          currencies=sorted({job.currency for job in jobs})
+                          or None)
+    if processes <= 1 or len(jobs) <= 1:
+        try:
+            return [plots.render_job(job) for job in jobs]
+        finally:
+            plots.close()
+
+    plots.logger.info("Rendering %d charts in %d processes.", len(jobs),
+                      min(processes, len(jobs)))
+    loggers = {'plots': plots.logger}
+    with ProcessPoolExecutor(max_workers=min(processes, len(jobs)),
+                             initializer=init_render_worker,
+                             initargs=(PipelineContext(plots.config_path,
+                                                       plots.config),
+                                       plots.store)) as pool:
+        for records, error in pool.map(render_worker_job, jobs):
+            replay_records(records, loggers)
+            if error is not None:
+                raise error
+    return [job.output for job in jobs]
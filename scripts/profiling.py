@@ -0,0 +1,194 @@
+"""
+This module implements the class StepProfiler responsible to measure
+the wall time, the rows and the memory of each step of the pipeline, and
+the handler that collects these measures from the log records.
+"""
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Iterator, List
+import json
+import logging
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+# bytes of a memory page, the unit of the resident size in /proc
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """
+    This function returns the resident memory of the process, or its peak
+    where the current value is not available
+    Returns:
+        int: the resident memory in bytes.
+    """
+    statm = Path("/proc/self/statm")
+    if statm.is_file():
+        return int(statm.read_text().split()[1]) * PAGE_SIZE
+    return peak_rss()
+
+
+def peak_rss() -> int:
+    """
+    This function returns the peak resident memory of the process. On
+    linux it reads VmHWM, since ru_maxrss keeps the peak of the parent
+    process across the exec of a spawned worker.
+    Returns:
+        int: the peak resident memory in bytes.
+    """
+    status = Path("/proc/self/status")
+    if status.is_file():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+
+    # ru_maxrss is in kilobytes on linux and in bytes on macos
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+class StepProfiler():
+    """
+    This class measures the steps of a stage and logs each measure. The
+    measure is attached to the log record as its 'profile' attribute, so
+    it reaches the ProfileCollector of the main process even when the
+    stage runs in a worker.
+    """
+
+    logger: logging
+    peaks: List[int]
+
+    def __init__(self, logger: logging) -> None:
+        """
+        Constructor to the class StepProfiler
+        Args:
+            logger (logging): logger of the stage.
+        """
+        self.logger = logger
+        self.peaks = []
+
+    @contextmanager
+    def step(self, name: str, rows_in: int = None) -> Iterator[dict]:
+        """
+        This function measures the block of a step. The block may set the
+        'rows_out' key of the yielded record. The python allocations are
+        measured only while tracemalloc is tracing. Steps can be nested,
+        their depth is kept in the record.
+        Args:
+            name (str): name of the step.
+            rows_in (int): rows received by the step.
+        Returns:
+            Iterator[dict]: the record of the step.
+        """
+        record = {'stage': self.logger.name, 'step': name,
+                  'depth': len(self.peaks), 'rows_in': rows_in,
+                  'rows_out': None}
+        tracing = tracemalloc.is_tracing()
+        traced_before = 0
+        if tracing:
+            # the peak of the enclosing step is kept before the reset
+            traced_before, traced_peak = tracemalloc.get_traced_memory()
+            if self.peaks:
+                self.peaks[-1] = max(self.peaks[-1], traced_peak)
+            tracemalloc.reset_peak()
+        self.peaks.append(traced_before)
+        rss_before = current_rss()
+        start = time.perf_counter()
+
+        try:
+            yield record
+        finally:
+            traced_peak = self.peaks.pop()
+
+        record['seconds'] = time.perf_counter() - start
+        for key in ['rows_in', 'rows_out']:
+            if record[key] is not None:
+                record[key] = int(record[key])
+        record['rss_delta'] = current_rss() - rss_before
+        record['peak_rss'] = peak_rss()
+        if tracing:
+            traced_after, current_peak = tracemalloc.get_traced_memory()
+            traced_peak = max(traced_peak, current_peak)
+            record['traced_delta'] = traced_after - traced_before
+            record['traced_peak'] = traced_peak - traced_before
+            if self.peaks:
+                self.peaks[-1] = max(self.peaks[-1], traced_peak)
+
+        self.logger.info("Step %s: %.3f s, rows %s -> %s, rss %+.1f MiB.",
+                         name, record['seconds'], record['rows_in'],
+                         record['rows_out'], record['rss_delta'] / 2 ** 20,
+                         extra={'profile': record})
+
+
+def profiled(name: str) -> Callable:
+    """
+    This function returns a decorator that measures a method as a step
+    with the StepProfiler in the 'profiler' attribute of its object
+    Args:
+        name (str): name of the step.
+    Returns:
+        Callable: the decorator.
+    """
+    def decorator(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.step(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ProfileCollector(logging.Handler):
+    """
+    This class keeps the measures of the steps logged in the process,
+    including the ones replayed from the workers
+    """
+
+    records: List[dict]
+
+    def __init__(self) -> None:
+        """
+        Constructor to the class ProfileCollector
+        """
+        super().__init__()
+        self.records = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        This function stores the measure of a record logged by a step
+        """
+        if hasattr(record, 'profile'):
+            self.records.append(record.profile)
+
+    def summary(self) -> dict:
+        """
+        This function summarizes the collected measures
+        Returns:
+            dict: the steps in the order they finished, the total time of
+                the outermost steps of each stage and the slowest steps.
+        """
+        stages = {}
+        for record in self.records:
+            if record['depth'] == 0:
+                stages[record['stage']] = \
+                    stages.get(record['stage'], 0.0) + record['seconds']
+        slowest = sorted(self.records, key=lambda record: record['seconds'],
+                         reverse=True)[:5]
+        return {'steps': self.records,
+                'stage_seconds': stages,
+                'slowest': [f"{record['stage']}.{record['step']}"
+                            for record in slowest]}
+
+    def write(self, path: str) -> None:
+        """
+        This function writes the summary in a json file
+        Args:
+            path (str): path of the json file.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.summary(), file, indent=2)
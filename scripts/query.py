@@ -0,0 +1,153 @@
+"""
+This module implements the class RateStore responsible to answer range,
+as-of and resample queries over the processed dataframe by binary search
+on its sorted dates, instead of scanning the whole dataframe.
+"""
+from typing import Dict, List, Tuple
+import pandas as pd
+from .paths import store_path
+from .store import read_processed
+from .utils import parse_config
+
+# stores loaded by from_config, by the path and the modification time of
+# the file they were read from
+_STORES: Dict[Tuple[str, int], "RateStore"] = {}
+
+
+class RateStore():
+    """
+    This class keeps the processed dataframe indexed by its dates in
+    ascending order. A range is selected as a slice found by binary search,
+    e.g. store['BRL', '2020-03-01':'2020-06-30'], and a single date gives the
+    last rate up to it, e.g. store['BRL', '2020-03-15'].
+    """
+
+    rates: pd.DataFrame
+    series: Dict[str, pd.Series]
+
+    def __init__(self, processed: pd.DataFrame) -> None:
+        """
+        Constructor to the class RateStore
+        Args:
+            processed (pd.DataFrame): the processed dataframe, with the
+                column 'Date' and one column of rates by currency.
+        """
+        self.rates = processed.set_index('Date').sort_index()
+        self.series = {}
+
+    @classmethod
+    def from_config(cls, config_path: str = "./config.yml") -> "RateStore":
+        """
+        This function loads the store of the processed dataframe, reusing
+        the store already loaded while its file is not modified
+        Args:
+            config_path (str): path to the config yaml file.
+        Returns:
+            RateStore: the store.
+        """
+        config = parse_config(config_path)
+        path = store_path(config)
+        key = (str(path.resolve()), path.stat().st_mtime_ns)
+        if key not in _STORES:
+            # the store of an older version of the file is released
+            for stale in [stale for stale in _STORES if stale[0] == key[0]]:
+                del _STORES[stale]
+            _STORES[key] = cls(read_processed(config))
+        return _STORES[key]
+
+    @property
+    def currencies(self) -> List[str]:
+        """
+        This function returns the currencies of the store
+        """
+        return list(self.rates.columns)
+
+    def currency_series(self, currency: str) -> pd.Series:
+        """
+        This function returns the dates with a rate of a currency, keeping
+        the series for the next queries
+        Args:
+            currency (str): code of the currency.
+        Returns:
+            pd.Series: the rates indexed by the sorted dates.
+        """
+        if currency not in self.series:
+            if currency not in self.rates.columns:
+                raise ValueError(f"The currency {currency} is not in the "
+                                 "processed dataframe")
+            self.series[currency] = self.rates[currency].dropna()
+        return self.series[currency]
+
+    def rate(self, currency: str, start=None, end=None) -> pd.Series:
+        """
+        This function returns the rates of a currency between two dates,
+        both included. A date without time includes the whole day.
+        Args:
+            currency (str): code of the currency.
+            start: first date, None for the first date of the store.
+            end: last date, None for the last date of the store.
+        Returns:
+            pd.Series: the rates indexed by the dates.
+        """
+        series = self.currency_series(currency)
+        return series.iloc[series.index.slice_indexer(start, end)]
+
+    def between(self, start=None, end=None,
+                currencies: List[str] = None) -> pd.DataFrame:
+        """
+        This function returns the rates of several currencies between two
+        dates, both included, with the dates where any of them is missing
+        Args:
+            start: first date, None for the first date of the store.
+            end: last date, None for the last date of the store.
+            currencies (List[str]): codes of the currencies, all of them
+                when it is None.
+        Returns:
+            pd.DataFrame: the rates indexed by the dates.
+        """
+        rates = self.rates.iloc[self.rates.index.slice_indexer(start, end)]
+        return rates if currencies is None else rates[currencies]
+
+    def asof(self, currency: str, date) -> float:
+        """
+        This function returns the last rate of a currency up to a date
+        Args:
+            currency (str): code of the currency.
+            date: the date.
+        Returns:
+            float: the rate, NaN when the date is before the first rate.
+        """
+        series = self.currency_series(currency)
+        position = series.index.searchsorted(pd.Timestamp(date),
+                                             side='right') - 1
+        return float(series.iloc[position]) if position >= 0 else float('nan')
+
+    def resample(self, currency: str, rule: str = 'MS', start=None,
+                 end=None, how: str = 'ohlc') -> pd.DataFrame:
+        """
+        This function aggregates the rates of a currency between two dates
+        by period, e.g. the monthly open, high, low and close
+        Args:
+            currency (str): code of the currency.
+            rule (str): pandas offset of the periods, e.g. 'W', 'MS' or 'YS'.
+            start: first date, None for the first date of the store.
+            end: last date, None for the last date of the store.
+            how (str): 'ohlc' or a pandas aggregation, e.g. 'mean' or 'last'.
+        Returns:
+            pd.DataFrame: the aggregates indexed by the start of each period.
+        """
+        periods = self.rate(currency, start, end).resample(rule)
+        if how == 'ohlc':
+            return periods.ohlc().dropna()
+        return periods.agg(how).dropna().to_frame(currency)
+
+    def __getitem__(self, key):
+        """
+        This function answers store[currency], store[currency, start:end]
+        with the rates of the range and store[currency, date] with the
+        last rate up to the date
+        """
+        currency, when = key if isinstance(key, tuple) else (key, slice(None))
+        if isinstance(when, slice):
+            return self.rate(currency, when.start, when.stop)
+        return self.asof(currency, when)
@@ -0,0 +1,150 @@
+"""
+This module implements the class FigureTemplate responsible to render
+a chart many times in a long-lived process, building its static parts
+once and only replacing the data of its lines in each render.
+"""
+from typing import Callable, Dict, List, Tuple
+from pathlib import Path
+import os
+from matplotlib import style
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+
+# x and y values of a line
+Series = Tuple[object, object]
+
+# buckets of points kept by the downsampling in each column of pixels, the
+# half-pixel columns keep the joints of the thick lines in their places
+BUCKETS_PER_PIXEL = 2
+
+
+class FigureTemplate():
+    """
+    This class keeps the figure of a chart between renders. The figure is
+    drawn by the Agg canvas, whatever the pyplot backend is, and it is not
+    registered in pyplot, so it is released when the template is closed
+    instead of piling up in the pyplot state.
+    """
+
+    build: Callable[[Figure, Dict[str, Series]], Dict[str, List[Line2D]]]
+    layout: Callable[[Dict[str, Series]], None]
+    downsample: Callable
+    style_name: str
+    figsize: Tuple[float, float]
+    figure: Figure
+    lines: Dict[str, List[Line2D]]
+    renders: int
+
+    def __init__(self, build: Callable, style_name: str = 'fivethirtyeight',
+                 figsize: Tuple[float, float] = (12, 6),
+                 downsample: Callable = None,
+                 layout: Callable = None) -> None:
+        """
+        Constructor to the class FigureTemplate
+        Args:
+            build (Callable): function receiving the empty figure and the
+                series of the first render, that draws the chart and returns
+                the lines drawing each series, by the name of the series.
+            style_name (str): matplotlib style of the chart.
+            figsize (Tuple[float, float]): size of the figure in inches.
+            downsample (Callable): function reducing the x and y values of a
+                line to a number of buckets, see scripts.downsampling. The
+                lines keep all their points when it is None.
+            layout (Callable): function receiving the series of each
+                render, before the axes are rescaled, that sets the limits,
+                the ticks and the texts depending on the series.
+        """
+        self.build = build
+        self.layout = layout
+        self.downsample = downsample
+        self.style_name = style_name
+        self.figsize = figsize
+        self.figure = None
+        self.lines = {}
+        self.renders = 0
+
+    def thin(self, line: Line2D, series: Series) -> Series:
+        """
+        This function downsamples the series of a line to BUCKETS_PER_PIXEL
+        buckets of points per column of pixels of its subplot
+        Args:
+            line (Line2D): the line drawing the series.
+            series (Series): the x and y values of the series.
+        Returns:
+            Series: the values drawn by the line.
+        """
+        if self.downsample is None:
+            return series
+        width = max(int(line.axes.bbox.width), 1)
+        return self.downsample(*series, width * BUCKETS_PER_PIXEL)
+
+    def update(self, series: Dict[str, Series]) -> None:
+        """
+        This function replaces the data of the lines, sets the layout of the
+        series and rescales the axes of each subplot, except the ones whose
+        limits were set by the template or by its layout. The hidden
+        artists do not change the limits.
+        Args:
+            series (Dict[str, Series]): the x and y values of each series.
+        """
+        for name, lines in self.lines.items():
+            for line in lines:
+                line.set_data(*self.thin(line, series[name]))
+        if self.layout is not None:
+            self.layout(series)
+
+        for axe in self.figure.axes:
+            # the limits of the previous render are forgotten, so an axis
+            # without data gets the limits it would get in a new figure
+            if axe.get_autoscalex_on():
+                axe.viewLim.intervalx = (0.0, 1.0)
+            if axe.get_autoscaley_on():
+                axe.viewLim.intervaly = (0.0, 1.0)
+            axe.relim(visible_only=True)
+            axe.autoscale_view()
+
+    def render(self, series: Dict[str, Series], path: str) -> None:
+        """
+        This function draws the series in the chart and exports it, building
+        the figure in the first render. The image is written with a temporary
+        name and moved to its path, so a reader never sees a partial image.
+        Args:
+            series (Dict[str, Series]): the x and y values of each series.
+            path (str): path of the image, or a binary file object receiving
+                the image as png.
+        """
+        # the style is applied while the figure is built and drawn, without
+        # changing the global settings of matplotlib
+        with style.context(self.style_name):
+            if self.figure is None:
+                self.figure = Figure(figsize=self.figsize)
+                FigureCanvasAgg(self.figure)
+                self.lines = self.build(self.figure, series)
+                if self.downsample is not None or self.layout is not None:
+                    self.update(series)
+            else:
+                self.update(series)
+
+            if hasattr(path, 'write'):
+                self.figure.savefig(path, format='png')
+            else:
+                path = Path(path)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                try:
+                    self.figure.savefig(temporary,
+                                        format=path.suffix[1:] or None)
+                    os.replace(temporary, path)
+                finally:
+                    temporary.unlink(missing_ok=True)
+        self.renders += 1
+
+    def close(self) -> None:
+        """
+        This function releases the figure, the next render builds it again
+        """
+        if self.figure is not None:
+            self.figure.clear()
+        self.figure = None
+        self.lines = {}
@@ -0,0 +1,360 @@
+"""
+This module implements the compact representation of the processed rates:
+each currency keeps only its dates with a rate, as int32 days since the
+epoch when the dates are daily or as int64 microseconds otherwise, and its
+rates, as float32 or float64, in two contiguous arrays. The arrays are saved
+as .npy files that are memory-mapped when they are opened, and the periods
+are selected as slices, which are views of the arrays.
+"""
+from typing import Dict, List
+from pathlib import Path
+import json
+import os
+import numpy as np
+import pandas as pd
+from .paths import SERIES_INDEX
+
+# the day 0 of the offsets
+EPOCH = np.datetime64('1970-01-01', 'D')
+
+# unit of the offsets of the dates with a time of day
+INTRADAY_UNIT = 'us'
+
+
+def date_offsets(dates, unit: str = 'D') -> np.ndarray:
+    """
+    This function converts dates to offsets since the epoch, a date with
+    time is truncated to the unit
+    Args:
+        dates: date, string or array-like of dates.
+        unit (str): 'D' for days, INTRADAY_UNIT for microseconds.
+    Returns:
+        np.ndarray: the int64 offsets.
+    """
+    values = pd.to_datetime(dates).to_numpy().astype(f'datetime64[{unit}]')
+    return (values - EPOCH).astype('int64')
+
+
+def dates_unit(dates: pd.Series) -> str:
+    """
+    This function returns the unit of the offsets keeping the dates: days
+    when they are all at midnight, microseconds otherwise
+    Args:
+        dates (pd.Series): the datetime dates.
+    Returns:
+        str: 'D' or INTRADAY_UNIT.
+    """
+    return 'D' if (dates == dates.dt.normalize()).all() else INTRADAY_UNIT
+
+
+def save_array(path: Path, values: np.ndarray) -> None:
+    """
+    This function saves an array as a .npy file with a temporary name and
+    replaces the file, so a reader mapping the file is not modified
+    Args:
+        path (Path): path of the file.
+        values (np.ndarray): the array.
+    """
+    temporary = path.with_name(path.name + ".tmp")
+    with open(temporary, 'wb') as file:
+        np.save(file, np.ascontiguousarray(values))
+    os.replace(temporary, path)
+
+
+class CompactSeries():
+    """
+    This class keeps the rates of a currency by their dates in ascending
+    order. Slicing it, e.g. series[10:20] or series.between('2020-03-01',
+    '2020-06-30'), returns a CompactSeries sharing its arrays.
+    """
+
+    currency: str
+    days: np.ndarray
+    rates: np.ndarray
+    unit: str
+
+    def __init__(self, currency: str, days: np.ndarray,
+                 rates: np.ndarray, unit: str = 'D') -> None:
+        """
+        Constructor to the class CompactSeries
+        Args:
+            currency (str): code of the currency.
+            days (np.ndarray): the offsets of the dates since the epoch in
+                the unit, ascending.
+            rates (np.ndarray): the rate of each date.
+            unit (str): 'D' for int32 days, INTRADAY_UNIT for int64
+                microseconds.
+        """
+        if len(days) != len(rates):
+            raise ValueError(f"The series of {currency} has {len(days)} dates "
+                             f"and {len(rates)} rates")
+        self.currency = currency
+        self.days = days
+        self.rates = rates
+        self.unit = unit
+
+    @classmethod
+    def from_frame(cls, processed: pd.DataFrame, currency: str,
+                   dtype: str = 'float64', unit: str = None) -> "CompactSeries":
+        """
+        This function creates the series of the dates with a rate of a
+        currency of the processed dataframe
+        Args:
+            processed (pd.DataFrame): the processed dataframe, with the
+                column 'Date' and one column of rates by currency.
+            currency (str): code of the currency.
+            dtype (str): 'float32' or 'float64'.
+            unit (str): unit of the offsets, found from the dates when None.
+        Returns:
+            CompactSeries: the series.
+        """
+        unit = unit or dates_unit(processed['Date'])
+        rates = processed[['Date', currency]].dropna().sort_values(
+            'Date', kind='stable')
+        offsets = date_offsets(rates['Date'], unit)
+        if unit == 'D':
+            offsets = offsets.astype('int32')
+        return cls(currency, offsets, rates[currency].to_numpy(dtype=dtype),
+                   unit)
+
+    def __len__(self) -> int:
+        """
+        This function returns the number of dates of the series
+        """
+        return len(self.days)
+
+    def __getitem__(self, rows: slice) -> "CompactSeries":
+        """
+        This function returns the rows of a slice, sharing the arrays
+        """
+        if not isinstance(rows, slice):
+            raise ValueError("A CompactSeries is selected with a slice of rows")
+        return CompactSeries(self.currency, self.days[rows], self.rates[rows],
+                             self.unit)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """
+        This function returns the dates of the series as datetime64 in the
+        unit of the series
+        """
+        return self.days.astype(f'timedelta64[{self.unit}]') + EPOCH
+
+    @property
+    def nbytes(self) -> int:
+        """
+        This function returns the bytes of the arrays of the series
+        """
+        return self.days.nbytes + self.rates.nbytes
+
+    def search(self, dates, side: str = 'left') -> np.ndarray:
+        """
+        This function finds by binary search the rows where the dates would
+        be inserted keeping the order
+        Args:
+            dates: array-like of dates.
+            side (str): 'left' for the first row of a date, 'right' for the
+                row after its last one.
+        Returns:
+            np.ndarray: the rows.
+        """
+        return np.searchsorted(self.days, date_offsets(dates, self.unit),
+                               side=side)
+
+    def between(self, start=None, end=None) -> "CompactSeries":
+        """
+        This function returns the rates between two dates, both included
+        Args:
+            start: first date, None for the first date of the series.
+            end: last date, None for the last date of the series.
+        Returns:
+            CompactSeries: the rates of the dates, sharing the arrays.
+        """
+        first = 0 if start is None else int(self.search([start])[0])
+        last = len(self) if end is None else \
+            int(self.search([end], side='right')[0])
+        return self[first:max(first, last)]
+
+    def asof(self, date) -> float:
+        """
+        This function returns the last rate up to a date
+        Args:
+            date: the date.
+        Returns:
+            float: the rate, NaN when the date is before the first rate.
+        """
+        position = int(self.search([date], side='right')[0]) - 1
+        return float(self.rates[position]) if position >= 0 else float('nan')
+
+    def rolling_pairs(self) -> "CompactSeries":
+        """
+        This function averages each rate with the next one, the last rate
+        has no next rate and is NaN
+        Returns:
+            CompactSeries: the averages, in new arrays.
+        """
+        rates = np.full(len(self), np.nan, dtype=self.rates.dtype)
+        rates[:-1] = (self.rates[:-1] + self.rates[1:]) / 2
+        return CompactSeries(self.currency, self.days, rates, self.unit)
+
+    def to_series(self) -> pd.Series:
+        """
+        This function returns the rates as a pandas series indexed by the
+        dates
+        """
+        return pd.Series(self.rates, index=pd.DatetimeIndex(self.dates,
+                                                            name='Date'),
+                         name=self.currency)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        This function returns the rates as a dataframe with the columns
+        'Date' and the currency
+        """
+        return pd.DataFrame({'Date': pd.to_datetime(self.dates),
+                             self.currency: self.rates})
+
+
+class SeriesStore():
+    """
+    This class keeps the CompactSeries of each currency. It is created from
+    the processed dataframe or opened from a directory written by write,
+    mapping the arrays of the files in memory instead of reading them. The
+    currencies with the same dates share one array of days.
+    """
+
+    series: Dict[str, CompactSeries]
+    directory: Path
+
+    def __init__(self, series: Dict[str, CompactSeries],
+                 directory: Path = None) -> None:
+        """
+        Constructor to the class SeriesStore
+        Args:
+            series (Dict[str, CompactSeries]): the series by currency.
+            directory (Path): the directory the series were opened from,
+                None when they are in memory.
+        """
+        self.series = series
+        self.directory = directory
+
+    @classmethod
+    def from_processed(cls, processed: pd.DataFrame,
+                       dtype: str = 'float64') -> "SeriesStore":
+        """
+        This function creates the series of all the currencies of the
+        processed dataframe
+        Args:
+            processed (pd.DataFrame): the processed dataframe.
+            dtype (str): 'float32' or 'float64'.
+        Returns:
+            SeriesStore: the store.
+        """
+        # the currencies share the unit of the dates of the dataframe
+        series, days = {}, {}
+        unit = dates_unit(processed['Date'])
+        for currency in processed.columns[processed.columns != 'Date']:
+            compact = CompactSeries.from_frame(processed, currency, dtype,
+                                               unit)
+            compact.days = days.setdefault(compact.days.tobytes(),
+                                           compact.days)
+            series[currency] = compact
+        return cls(series)
+
+    @classmethod
+    def open(cls, directory: str, mmap: bool = True) -> "SeriesStore":
+        """
+        This function opens the series written in a directory, verifying
+        that the arrays have the rows and the types of the index
+        Args:
+            directory (str): the directory.
+            mmap (bool): map the arrays in memory, read them otherwise.
+        Returns:
+            SeriesStore: the store.
+        """
+        directory = Path(directory)
+        index = json.loads((directory / SERIES_INDEX).read_text())
+        mode = 'r' if mmap else None
+        series, days = {}, {}
+        for currency, entry in index['currencies'].items():
+            if entry['days'] not in days:
+                days[entry['days']] = np.load(
+                    directory / f"{entry['days']}.days.npy", mmap_mode=mode)
+            rates = np.load(directory / f"{currency}.rates.npy",
+                            mmap_mode=mode)
+            if len(rates) != entry['rows'] or \
+                    len(days[entry['days']]) != entry['rows'] or \
+                    str(rates.dtype) != entry['dtype']:
+                raise ValueError(f"The arrays of {currency} do not match the "
+                                 f"index of the series store in {directory}")
+            series[currency] = CompactSeries(
+                currency, days[entry['days']], rates, entry.get('unit', 'D'))
+        return cls(series, directory)
+
+    def write(self, directory: str) -> None:
+        """
+        This function saves the arrays of each series and, at last, the
+        index of the store. Each file is written with a temporary name and
+        replaced, so the files being mapped by a reader are not modified.
+        Args:
+            directory (str): the directory.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        index, days = {'currencies': {}}, {}
+        for currency, series in self.series.items():
+            # the days are saved once, by the first currency with them
+            owner = days.setdefault(series.days.tobytes(), currency)
+            if owner == currency:
+                save_array(directory / f"{currency}.days.npy", series.days)
+            save_array(directory / f"{currency}.rates.npy", series.rates)
+            index['currencies'][currency] = {
+                'rows': len(series), 'days': owner,
+                'dtype': str(series.rates.dtype), 'unit': series.unit,
+                'first': str(series.dates[0]) if len(series) else None,
+                'last': str(series.dates[-1]) if len(series) else None}
+        temporary = directory / (SERIES_INDEX + ".tmp")
+        temporary.write_text(json.dumps(index, indent=2))
+        os.replace(temporary, directory / SERIES_INDEX)
+
+    @property
+    def currencies(self) -> List[str]:
+        """
+        This function returns the currencies of the store
+        """
+        return list(self.series)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        This function returns the bytes of the arrays of all the series
+        """
+        days = {id(series.days): series.days.nbytes
+                for series in self.series.values()}
+        return sum(days.values()) + sum(series.rates.nbytes
+                                        for series in self.series.values())
+
+    def __contains__(self, currency: str) -> bool:
+        """
+        This function verifies if the store has a currency
+        """
+        return currency in self.series
+
+    def __getitem__(self, currency: str) -> CompactSeries:
+        """
+        This function returns the series of a currency
+        """
+        if currency not in self.series:
+            raise ValueError(f"The currency {currency} is not in the series "
+                             "store")
+        return self.series[currency]
+
+    def __reduce__(self) -> tuple:
+        """
+        This function pickles a store opened from a directory as its
+        directory, so a worker process maps the same files instead of
+        receiving a copy of the arrays
+        """
+        if self.directory is None:
+            return (SeriesStore, (self.series,))
+        return (SeriesStore.open, (str(self.directory),))
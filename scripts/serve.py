@@ -0,0 +1,487 @@
+"""
+This module implements the class RateServer, a long-running asyncio HTTP
+server answering rate queries and chart renders from the processed data
+kept in memory, so the clients calling the pipeline many times a day do not
+pay for the imports and the loading of the data in each call.
+
+    python -m scripts.serve [CONFIG_FILE] [--host HOST] [--port PORT]
+                            [--socket PATH]
+"""
+from typing import Awaitable, Callable, Dict, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import asyncio
+import io
+import json
+import logging
+import math
+import time
+import pandas as pd
+from .paths import store_path
+from .plots import GeneratePlots, RenderJob
+from .query import RateStore
+from .store import read_processed
+from .utils import parse_config, set_logger
+
+# status line of each status code sent by the server
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 500: "Internal Server Error"}
+
+# status code, content type and body of a response
+Response = Tuple[int, str, bytes]
+
+
+class ChartCache():
+    """
+    This class keeps the last rendered images up to a number of images,
+    discarding the least recently used image when it is full
+    """
+
+    size: int
+    images: OrderedDict
+    hits: int
+    misses: int
+
+    def __init__(self, size: int = 256) -> None:
+        """
+        Constructor to the class ChartCache
+        Args:
+            size (int): maximum number of images.
+        """
+        self.size = size
+        self.images = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> bytes:
+        """
+        This function returns the image of a key, None when it is not kept
+        """
+        if key not in self.images:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.images.move_to_end(key)
+        return self.images[key]
+
+    def put(self, key: tuple, image: bytes) -> None:
+        """
+        This function keeps the image of a key, discarding the least
+        recently used images beyond the size of the cache
+        """
+        self.images[key] = image
+        self.images.move_to_end(key)
+        while len(self.images) > self.size:
+            self.images.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        This function discards all the images
+        """
+        self.images.clear()
+
+    def stats(self) -> dict:
+        """
+        This function returns the number of images, hits and misses
+        """
+        return {'images': len(self.images), 'size': self.size,
+                'hits': self.hits, 'misses': self.misses}
+
+
+def required(query: Dict[str, str], name: str) -> str:
+    """
+    This function returns a parameter of the query string
+    Args:
+        query (Dict[str, str]): the parameters of the query string.
+        name (str): name of the parameter.
+    Returns:
+        str: the value of the parameter.
+    """
+    if not query.get(name):
+        raise ValueError(f"The parameter {name} is missing")
+    return query[name]
+
+
+def date_parameter(query: Dict[str, str], name: str) -> str:
+    """
+    This function returns a date of the query string in the ISO format,
+    so the same date written in other formats shares the cached images
+    Args:
+        query (Dict[str, str]): the parameters of the query string.
+        name (str): name of the parameter.
+    Returns:
+        str: the date, None when the parameter is not given.
+    """
+    if not query.get(name):
+        return None
+    return pd.Timestamp(query[name]).isoformat()
+
+
+def json_response(content: dict, status: int = 200) -> Response:
+    """
+    This function returns a json response
+    """
+    return status, "application/json", json.dumps(content).encode()
+
+
+def dates_list(index: pd.DatetimeIndex) -> list:
+    """
+    This function returns the dates of an index as ISO strings
+    """
+    return list(index.strftime('%Y-%m-%d'))
+
+
+class RateServer():
+    """
+    This class answers HTTP requests with the processed rates and charts
+    kept in memory. The rate queries are answered in the event loop by the
+    binary searches of a RateStore, the charts are rendered by one thread
+    reusing the figure templates, and the rendered images are kept in a
+    ChartCache. The processed store is loaded again when its file changes.
+    """
+
+    config_path: str
+    config: dict
+    logger: logging
+    store: RateStore
+    plots: GeneratePlots
+    cache: ChartCache
+    pending: Dict[tuple, asyncio.Future]
+    executor: ThreadPoolExecutor
+    routes: Dict[str, Callable[[Dict[str, str]], Awaitable[Response]]]
+    version: int
+    generation: int
+    watcher: asyncio.Task
+
+    def __init__(self, config_path: str = "./config.yml") -> None:
+        """
+        Constructor to the class RateServer
+        Args:
+            config_path (str): path to the config yaml file.
+        """
+        # loading config file in the config attribute
+        self.config_path = config_path
+        self.config = parse_config(self.config_path)
+
+        # configuring logger attribute
+        self.logger = set_logger("serve", self.config['log']['log_serve_path'],
+                                 self.config.get('logging'))
+        self.logger.info("Serve config: %s", self.config['serve'])
+
+        # the figure templates are used by one thread at a time
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.cache = ChartCache(self.config['serve'].get('cache_size', 256))
+        self.pending = {}
+        self.plots = None
+        self.generation = 0
+        self.watcher = None
+        self.routes = {'/health': self.health, '/rates': self.rates,
+                       '/asof': self.asof, '/resample': self.resample,
+                       '/chart': self.chart}
+
+        # loading the processed store and the plots
+        self.load()
+
+    def load(self) -> None:
+        """
+        This function loads the processed store, the RateStore and the
+        plots of the server, replacing the previous ones
+        """
+        # the version is read first, so a store written during the load is
+        # loaded again by the next check
+        version = store_path(self.config).stat().st_mtime_ns
+        processed = read_processed(self.config)
+        store = RateStore(processed)
+        plots = GeneratePlots(self.config_path, processed)
+
+        previous = self.plots
+        self.store, self.plots, self.version = store, plots, version
+        if previous is not None:
+            previous.close()
+        self.logger.info("The processed store was loaded with %d dates.",
+                         len(processed))
+
+    async def reload(self) -> bool:
+        """
+        This function loads the processed store again when its file was
+        changed, discarding the cached images
+        Returns:
+            bool: True when the store was loaded again.
+        """
+        try:
+            if store_path(self.config).stat().st_mtime_ns == self.version:
+                return False
+            await asyncio.get_running_loop().run_in_executor(self.executor,
+                                                             self.load)
+        except Exception as exception:
+            # a store being written is loaded by a next check
+            self.logger.warning("The processed store was not loaded: %s",
+                                exception)
+            return False
+
+        self.generation += 1
+        self.cache.clear()
+        self.logger.info("The cached charts were discarded.")
+        return True
+
+    async def watch(self) -> None:
+        """
+        This function checks the processed store in the reload interval of
+        the config
+        """
+        while True:
+            await asyncio.sleep(self.config['serve'].get('reload_interval', 2))
+            await self.reload()
+
+    async def health(self, _query: Dict[str, str]) -> Response:
+        """
+        This function answers /health with the dates, the currencies and the
+        statistics of the cache
+        """
+        dates = self.store.rates.index
+        return json_response({
+            'status': 'ok', 'currencies': self.store.currencies,
+            'first_date': dates_list(dates[:1])[0] if len(dates) else None,
+            'last_date': dates_list(dates[-1:])[0] if len(dates) else None,
+            'cache': self.cache.stats()})
+
+    async def rates(self, query: Dict[str, str]) -> Response:
+        """
+        This function answers /rates?currency=BRL&start=...&end=... with the
+        rates between two dates, both included
+        """
+        currency = required(query, 'currency')
+        series = self.store.rate(currency, date_parameter(query, 'start'),
+                                 date_parameter(query, 'end'))
+        return json_response({'currency': currency,
+                              'dates': dates_list(series.index),
+                              'rates': series.tolist()})
+
+    async def asof(self, query: Dict[str, str]) -> Response:
+        """
+        This function answers /asof?currency=BRL&date=... with the last rate
+        up to the date
+        """
+        currency = required(query, 'currency')
+        date = required(query, 'date')
+        rate = self.store.asof(currency, pd.Timestamp(date))
+        return json_response({'currency': currency, 'date': date,
+                              'rate': None if math.isnan(rate) else rate})
+
+    async def resample(self, query: Dict[str, str]) -> Response:
+        """
+        This function answers /resample?currency=BRL&rule=MS&how=ohlc with
+        the aggregates of each period
+        """
+        currency = required(query, 'currency')
+        periods = self.store.resample(currency, query.get('rule', 'MS'),
+                                      date_parameter(query, 'start'),
+                                      date_parameter(query, 'end'),
+                                      query.get('how', 'ohlc'))
+        content = {'currency': currency, 'dates': dates_list(periods.index)}
+        content.update(periods.to_dict(orient='list'))
+        return json_response(content)
+
+    async def chart(self, query: Dict[str, str]) -> Response:
+        """
+        This function answers /chart?chart=graph1&currency=BRL&start=...&end=...
+        with the png image of the chart, rendered once for the requests of
+        the same chart at the same time and kept in the cache
+        """
+        job = RenderJob(query.get('chart', 'graph1'),
+                        query.get('currency', 'BRL'), None,
+                        date_parameter(query, 'start'),
+                        date_parameter(query, 'end'))
+        key = (job.chart, job.currency, job.start, job.end)
+
+        image = self.cache.get(key)
+        if image is None:
+            if key not in self.pending:
+                self.pending[key] = asyncio.ensure_future(
+                    self.render(job, key))
+            image = await asyncio.shield(self.pending[key])
+        return 200, "image/png", image
+
+    async def render(self, job: RenderJob, key: tuple) -> bytes:
+        """
+        This function renders a chart in the thread of the plots and keeps
+        the image in the cache, unless the store was loaded again meanwhile
+        Args:
+            job (RenderJob): the chart, its output is replaced by a buffer.
+            key (tuple): the key of the image in the cache.
+        Returns:
+            bytes: the png image.
+        """
+        generation = self.generation
+        try:
+            image = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.render_image, job)
+        finally:
+            del self.pending[key]
+        if generation == self.generation:
+            self.cache.put(key, image)
+        return image
+
+    def render_image(self, job: RenderJob) -> bytes:
+        """
+        This function renders a chart into a png image in memory
+        """
+        job.output = io.BytesIO()
+        self.plots.render_job(job)
+        return job.output.getvalue()
+
+    async def respond(self, method: str, target: str) -> Response:
+        """
+        This function answers a request
+        Args:
+            method (str): method of the request, only GET is answered.
+            target (str): path and query string of the request.
+        Returns:
+            Response: the status code, the content type and the body.
+        """
+        if method != "GET":
+            return json_response({'error': f"The method {method} is not "
+                                           "allowed"}, 405)
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return json_response({'error': f"The path {url.path} was not "
+                                           "found"}, 404)
+
+        query = {name: values[-1]
+                 for name, values in parse_qs(url.query).items()}
+        try:
+            return await route(query)
+        except ValueError as exception:
+            return json_response({'error': str(exception)}, 400)
+        except Exception as exception:
+            self.logger.exception("The request %s failed", target)
+            return json_response({'error': str(exception)}, 500)
+
+    async def handle(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """
+        This function answers the requests of a connection, keeping it open
+        between the requests of HTTP/1.1 clients
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+
+                # reading the headers, the requests have no body
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                started = time.perf_counter()
+                try:
+                    method, target, version = \
+                        request_line.decode('latin-1').split()
+                except ValueError:
+                    method, target, version = "", "", "HTTP/1.0"
+                    status, content_type, body = json_response(
+                        {'error': "The request line is malformed"}, 400)
+                else:
+                    status, content_type, body = await self.respond(method,
+                                                                    target)
+                keep_alive = version == "HTTP/1.1" and \
+                    headers.get('connection', '').lower() != 'close'
+
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}"
+                    "\r\n\r\n".encode('latin-1') + body)
+                await writer.drain()
+                self.logger.info("%s %s %d in %.1f ms", method, target, status,
+                                 1000 * (time.perf_counter() - started))
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = None, port: int = None,
+                    socket_path: str = None) -> asyncio.AbstractServer:
+        """
+        This function starts listening and checking the processed store
+        Args:
+            host (str): address of the server, the host of the config when
+                it is None.
+            port (int): port of the server, the port of the config when it
+                is None, 0 for any free port.
+            socket_path (str): path of a unix socket, used instead of the
+                host and the port, the socket_path of the config when it is
+                None.
+        Returns:
+            asyncio.AbstractServer: the listening server.
+        """
+        settings = self.config['serve']
+        socket_path = socket_path or settings.get('socket_path')
+        if socket_path:
+            server = await asyncio.start_unix_server(self.handle, socket_path)
+        else:
+            server = await asyncio.start_server(
+                self.handle, host or settings['host'],
+                settings['port'] if port is None else port)
+        self.watcher = asyncio.ensure_future(self.watch())
+
+        self.logger.info("The server is listening on %s.", ", ".join(
+            str(sock.getsockname()) for sock in server.sockets))
+        return server
+
+    async def serve_forever(self, host: str = None, port: int = None,
+                            socket_path: str = None) -> None:
+        """
+        This function answers the requests until the server is stopped
+        """
+        server = await self.start(host, port, socket_path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """
+        This function stops checking the processed store and releases the
+        thread and the figures of the plots
+        """
+        if self.watcher is not None:
+            self.watcher.cancel()
+        self.executor.shutdown(wait=True)
+        self.plots.close()
+
+
+def run_server(config_path: str = "./config.yml", host: str = None,
+               port: int = None, socket_path: str = None) -> None:
+    """
+    This function answers the requests of a RateServer until it is
+    interrupted
+    Args:
+        config_path (str): path to the config yaml file.
+        host (str): address of the server, the host of the config when None.
+        port (int): port of the server, the port of the config when None.
+        socket_path (str): path of a unix socket, used instead of the host
+            and the port.
+    """
+    try:
+        asyncio.run(RateServer(config_path).serve_forever(host, port,
+                                                          socket_path))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    # the command serve is shared with the cli of the pipeline
+    from .commands import serve
+    serve()
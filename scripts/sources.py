@@ -0,0 +1,458 @@
+"""
+This module implements the adapters of the sources of rates. Each adapter
+declares how its source is parsed, how its columns map to the currency
+codes and how its rows are cleaned, and the sources are merged by date with
+the precedence of the sources in each range of dates of the config.
+"""
+from typing import Dict, Iterator, List, Tuple
+from abc import ABC, abstractmethod
+import inspect
+import pandas as pd
+
+# pandas dtypes of the type names used in the source schemas
+SCHEMA_DTYPES = {'float': 'float64', 'int': 'int64', 'str': 'str'}
+
+
+def read_csv_schema(data_path: str, schema: dict,
+                    engine: str = "c") -> pd.DataFrame:
+    """
+    This function is responsible to load a csv file parsing only the
+    columns declared in the schema, with the dates and numbers already typed.
+    Args:
+        data_path (str): indicates the path for the dataframe.
+        schema (dict): 'columns' maps each needed column to 'datetime', 'float',
+            'int' or 'str'; 'skiprows' lists the rows after the header to skip
+            (e.g. the HXL row); 'na_values' lists the markers of missing data.
+        engine (str): csv engine used by pandas, 'c' or 'pyarrow'.
+    Returns:
+        pd.DataFrame: the dataframe with the columns in the schema order.
+    """
+    columns = schema['columns']
+    dates = [name for name, dtype in columns.items() if dtype == 'datetime']
+    dtypes = {name: SCHEMA_DTYPES[dtype] for name, dtype in columns.items()
+              if dtype != 'datetime'}
+    skiprows = schema.get('skiprows') or []
+    options = {'dtype': dtypes, 'parse_dates': dates,
+               'na_values': schema.get('na_values')}
+
+    if engine == 'pyarrow' and skiprows:
+        # pyarrow only skips leading lines, so the header is read apart and
+        # the columns are selected by position
+        if sorted(skiprows) != list(range(1, len(skiprows) + 1)):
+            engine = 'c'
+        else:
+            header = list(pd.read_csv(data_path, nrows=0).columns)
+            positions = sorted(header.index(name) for name in columns)
+            options.update(header=None, skiprows=len(skiprows) + 1,
+                           usecols=positions,
+                           names=[header[i] for i in positions])
+
+    if 'usecols' not in options:
+        options['usecols'] = list(columns)
+        if skiprows:
+            options['skiprows'] = skiprows
+
+    if engine == 'c':
+        # keeps the floats identical to the python float() conversion
+        options['float_precision'] = 'round_trip'
+
+    dataframe = pd.read_csv(data_path, engine=engine, **options)
+    return dataframe[list(columns)]
+
+
+def iter_csv_schema(data_path: str, schema: dict,
+                    chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    This function is responsible to load a csv file in chunks of rows,
+    parsing the columns declared in the schema like read_csv_schema.
+    Args:
+        data_path (str): indicates the path for the dataframe.
+        schema (dict): the schema of the columns, see read_csv_schema.
+        chunksize (int): number of rows of each chunk.
+    Returns:
+        Iterator[pd.DataFrame]: the chunks with the columns in the schema order.
+    """
+    columns = schema['columns']
+    dates = [name for name, dtype in columns.items() if dtype == 'datetime']
+    dtypes = {name: SCHEMA_DTYPES[dtype] for name, dtype in columns.items()
+              if dtype != 'datetime'}
+
+    # the pyarrow engine does not read in chunks, so the c engine is used
+    with pd.read_csv(data_path, usecols=list(columns), dtype=dtypes,
+                     parse_dates=dates, na_values=schema.get('na_values'),
+                     skiprows=schema.get('skiprows') or None,
+                     float_precision='round_trip',
+                     chunksize=chunksize) as reader:
+        for chunk in reader:
+            yield chunk[list(columns)]
+
+
+def read_csv_since(data_path: str, schema: dict, since: pd.Timestamp,
+                   chunksize: int) -> pd.DataFrame:
+    """
+    This function is responsible to load only the rows of a csv file dated
+    after a given date. Files sorted from the newest to the oldest date are
+    read just until the first chunk reaching that date.
+    Args:
+        data_path (str): indicates the path for the dataframe.
+        schema (dict): the schema of the columns, see read_csv_schema.
+            The first datetime column is the date of each row.
+        since (pd.Timestamp): rows dated up to this date are discarded.
+        chunksize (int): number of rows of each chunk.
+    Returns:
+        pd.DataFrame: the rows dated after since.
+    """
+    date_column = next(name for name, dtype in schema['columns'].items()
+                       if dtype == 'datetime')
+
+    chunks = []
+    descending = None
+    first = None
+    for chunk in iter_csv_schema(data_path, schema, chunksize):
+        dates = chunk[date_column]
+        chunks.append(chunk[dates > since])
+        dates = dates.dropna()
+        if dates.empty:
+            continue
+
+        # finding the order by the first dates that differ
+        if first is None:
+            first = dates.iloc[0]
+        if descending is None:
+            following = dates[dates != first]
+            if not following.empty:
+                descending = following.iloc[0] < first
+        if descending and dates.iloc[-1] <= since:
+            break
+
+    return pd.concat(chunks, ignore_index=True)
+
+
+def currency_columns(schema: dict) -> Dict[str, str]:
+    """
+    This function returns the column of each currency of a source schema
+    Args:
+        schema (dict): the schema of the source, whose 'currency_columns'
+            maps each currency code to its column, or lists the codes of the
+            currencies whose column is named by the code.
+    Returns:
+        Dict[str, str]: the column of each currency code.
+    """
+    columns = schema.get('currency_columns', {})
+    if isinstance(columns, list):
+        return {code: code for code in columns}
+    return dict(columns)
+
+
+def select_schema(schema: dict,
+                  currencies: List[str]) -> Tuple[dict, Dict[str, str]]:
+    """
+    This function builds the schema reading only the date column and the
+    columns of the selected currencies of a source
+    Args:
+        schema (dict): the schema of the source.
+        currencies (List[str]): codes of the selected currencies.
+    Returns:
+        dict: the schema of the columns to read, see read_csv_schema.
+        Dict[str, str]: the renaming of the columns to 'Date' and the codes.
+    """
+    date_column = next(name for name, dtype in schema['columns'].items()
+                       if dtype == 'datetime')
+    columns = currency_columns(schema)
+
+    selected = dict(schema)
+    selected['columns'] = {date_column: 'datetime'}
+    selected['columns'].update({columns[code]: 'float' for code in currencies
+                                if code in columns})
+
+    renaming = {date_column: 'Date'}
+    renaming.update({columns[code]: code for code in currencies
+                     if code in columns})
+    return selected, renaming
+
+
+def read_source(data_path: str, schema: dict, engine: str = "c",
+                since: pd.Timestamp = None,
+                chunksize: int = 1000) -> pd.DataFrame:
+    """
+    This function is responsible to load a source with its schema, only
+    the rows dated after since when it is given. It is a module function
+    so it can be executed in a process pool.
+    Args:
+        data_path (str): indicates the path for the dataframe.
+        schema (dict): the schema of the columns, see read_csv_schema.
+        engine (str): csv engine used by pandas, 'c' or 'pyarrow'.
+        since (pd.Timestamp): optional date of the last processed row.
+        chunksize (int): number of rows of each chunk when since is given.
+    Returns:
+        pd.DataFrame: the loaded dataframe.
+    """
+    if since is not None:
+        return read_csv_since(data_path, schema, since, chunksize)
+
+    return read_csv_schema(data_path, schema, engine)
+
+
+class SourceAdapter(ABC):
+    """
+    This class is the interface of the adapters of the sources. An adapter
+    implements read and iter_chunks, reading the columns of a schema whole
+    or in chunks, and cleans the rows read, renamed to 'Date' and the
+    currency codes. The settings of the source come from its entry in the
+    sources of the config.
+    """
+
+    name: str
+    path: str
+    schema: dict
+    drop_empty_rows: bool
+
+    def __init__(self, settings: dict) -> None:
+        """
+        Constructor to the class SourceAdapter
+        Args:
+            settings (dict): the entry of the source in the config, with its
+                'name', 'path' and 'schema', see read_csv_schema, and
+                optionally 'drop_empty_rows' to remove the rows without any
+                rate of the selected currencies.
+        """
+        self.name = settings['name']
+        self.path = settings['path']
+        self.schema = settings['schema']
+        self.drop_empty_rows = settings.get('drop_empty_rows', False)
+
+    @property
+    def currencies(self) -> List[str]:
+        """
+        This function returns the codes of the currencies of the source
+        """
+        return list(currency_columns(self.schema))
+
+    def select(self, currencies: List[str]) -> Tuple[dict, Dict[str, str]]:
+        """
+        This function returns the schema reading the date and the selected
+        currencies of the source and the renaming of its columns
+        Args:
+            currencies (List[str]): codes of the selected currencies.
+        Returns:
+            dict: the schema of the columns to read.
+            Dict[str, str]: the renaming of the columns to 'Date' and the codes.
+        """
+        return select_schema(self.schema, currencies)
+
+    @abstractmethod
+    def read(self, schema: dict, engine: str = "c",
+             since: pd.Timestamp = None,
+             chunksize: int = 1000) -> pd.DataFrame:
+        """
+        This function loads the columns of a schema of the source, only the
+        rows dated after since when it is given
+        Args:
+            schema (dict): the schema returned by select.
+            engine (str): csv engine used by pandas, 'c' or 'pyarrow'.
+            since (pd.Timestamp): optional date of the last processed row.
+            chunksize (int): number of rows of each chunk when since is given.
+        Returns:
+            pd.DataFrame: the loaded dataframe.
+        """
+
+    @abstractmethod
+    def iter_chunks(self, schema: dict,
+                    chunksize: int) -> Iterator[pd.DataFrame]:
+        """
+        This function loads the columns of a schema of the source in chunks
+        of rows
+        Args:
+            schema (dict): the schema returned by select.
+            chunksize (int): number of rows of each chunk.
+        Returns:
+            Iterator[pd.DataFrame]: the chunks.
+        """
+
+    def clean(self, frame: pd.DataFrame, renaming: Dict[str, str],
+              currencies: List[str]) -> pd.DataFrame:
+        """
+        This function renames the columns of the rows read and removes the
+        rows without any rate when drop_empty_rows is set
+        Args:
+            frame (pd.DataFrame): the rows read with the schema of select.
+            renaming (Dict[str, str]): the renaming returned by select.
+            currencies (List[str]): codes of the selected currencies.
+        Returns:
+            pd.DataFrame: the rows with 'Date' and the currency codes.
+        """
+        frame = frame.rename(columns=renaming)
+        if self.drop_empty_rows:
+            rates = frame[[code for code in currencies if code in frame]]
+            frame = frame[rates.notna().any(axis=1)]
+        return frame
+
+
+class CsvSource(SourceAdapter):
+    """
+    This class is the adapter of a csv file, with the HXL rows to skip and
+    the markers of missing data declared in its schema
+    """
+
+    def read(self, schema: dict, engine: str = "c",
+             since: pd.Timestamp = None,
+             chunksize: int = 1000) -> pd.DataFrame:
+        """
+        This function loads the columns of a schema of the csv file, see
+        SourceAdapter.read
+        """
+        return read_source(self.path, schema, engine, since, chunksize)
+
+    def iter_chunks(self, schema: dict,
+                    chunksize: int) -> Iterator[pd.DataFrame]:
+        """
+        This function loads the columns of a schema of the csv file in
+        chunks of rows, see SourceAdapter.iter_chunks
+        """
+        return iter_csv_schema(self.path, schema, chunksize)
+
+
+# adapters of the sources by the name used in the config
+SOURCE_ADAPTERS = {'csv': CsvSource}
+
+
+def register_adapter(name: str, adapter: type) -> None:
+    """
+    This function registers the adapter of a new kind of source, selected
+    by the 'adapter' of the sources in the config
+    Args:
+        name (str): name of the adapter in the config.
+        adapter (type): subclass of SourceAdapter implementing read and
+            iter_chunks.
+    """
+    if not issubclass(adapter, SourceAdapter):
+        raise ValueError(f"The adapter {name} is not a SourceAdapter")
+    if inspect.isabstract(adapter):
+        raise ValueError(f"The adapter {name} does not implement "
+                         f"{sorted(adapter.__abstractmethods__)}")
+    SOURCE_ADAPTERS[name] = adapter
+
+
+def create_sources(settings: List[dict]) -> Dict[str, SourceAdapter]:
+    """
+    This function creates the adapter of each source of the config
+    Args:
+        settings (List[dict]): the sources of the config, each one with its
+            'adapter', "csv" by default.
+    Returns:
+        Dict[str, SourceAdapter]: the adapters by the name of the source.
+    """
+    sources = {}
+    for entry in settings:
+        adapter = entry.get('adapter', 'csv')
+        if adapter not in SOURCE_ADAPTERS:
+            raise ValueError(f"The source adapter {adapter} is not one of "
+                             f"{list(SOURCE_ADAPTERS)}")
+        if entry['name'] in sources:
+            raise ValueError(f"The source {entry['name']} is repeated")
+        sources[entry['name']] = SOURCE_ADAPTERS[adapter](entry)
+    return sources
+
+
+def parse_precedence(precedence: List[dict],
+                     names: List[str]) -> List[Tuple[pd.Timestamp,
+                                                     pd.Timestamp, List[str]]]:
+    """
+    This function parses the ranges of dates of the config, each one with
+    its first date 'start', the date after its last one 'end' (None for an
+    open range) and the 'sources' of its dates from the highest precedence
+    Args:
+        precedence (List[dict]): the ranges of the config.
+        names (List[str]): names of the configured sources.
+    Returns:
+        List[Tuple[pd.Timestamp, pd.Timestamp, List[str]]]: the start, the
+            end and the sources of each range, sorted by date.
+    """
+    ranges = []
+    for entry in precedence:
+        unknown = [name for name in entry['sources'] if name not in names]
+        if unknown or not entry['sources']:
+            raise ValueError(f"The sources {unknown} of a date range are not "
+                             "configured")
+        start, end = (pd.Timestamp(entry[key]) if entry.get(key) else None
+                      for key in ('start', 'end'))
+        ranges.append((start, end, list(entry['sources'])))
+
+    ranges.sort(key=lambda item: item[0] or pd.Timestamp.min)
+    for (_, end, _), (start, _, _) in zip(ranges, ranges[1:]):
+        if end is None or start is None or start < end:
+            raise ValueError("The date ranges of the precedence overlap")
+    return ranges
+
+
+def in_ranges(dates: pd.Series, ranges: list) -> pd.Series:
+    """
+    This function returns which dates are inside any of the ranges
+    Args:
+        dates (pd.Series): the dates.
+        ranges (list): the ranges returned by parse_precedence.
+    Returns:
+        pd.Series: the boolean mask.
+    """
+    inside = pd.Series(False, index=dates.index)
+    for start, end, _ in ranges:
+        mask = pd.Series(True, index=dates.index)
+        if start is not None:
+            mask &= dates >= start
+        if end is not None:
+            mask &= dates < end
+        inside |= mask
+    return inside
+
+
+def merge_sources(frames: Dict[str, pd.DataFrame], ranges: list,
+                  currencies: List[str]) -> pd.DataFrame:
+    """
+    This function merges the cleaned sources, taking the rate of each
+    currency at each date of a range from the source with the highest
+    precedence that has a rate of the currency at the date
+    Args:
+        frames (Dict[str, pd.DataFrame]): the cleaned rows of each source.
+        ranges (list): the ranges returned by parse_precedence.
+        currencies (List[str]): codes of the selected currencies.
+    Returns:
+        pd.DataFrame: the merged rows sorted from the newest date.
+    """
+    parts = []
+    for start, end, names in ranges:
+        for precedence, name in enumerate(names):
+            frame = frames[name]
+            rows = frame[in_ranges(frame['Date'], [(start, end, names)])]
+            parts.append(rows.reindex(columns=['Date'] + currencies)
+                         .assign(precedence=precedence))
+
+    # the first rate of each currency that is not missing, by precedence
+    merged = pd.concat(parts, ignore_index=True)
+    merged = merged.sort_values(['Date', 'precedence'], kind='stable')
+    merged = merged.drop(columns='precedence').groupby('Date').first()
+    return merged.sort_index(ascending=False).reset_index()
+
+
+def streaming_sources(ranges: list) -> List[Tuple[str, list]]:
+    """
+    This function returns the sources in the order of their dates from the
+    newest, with their ranges, for the streaming mode that exports each
+    source after the other without merging them
+    Args:
+        ranges (list): the ranges returned by parse_precedence.
+    Returns:
+        List[Tuple[str, list]]: the name and the ranges of each source.
+    """
+    order = []
+    for start, end, names in reversed(ranges):
+        if len(names) > 1:
+            raise ValueError("The streaming mode needs one source by date "
+                             "range")
+        if order and order[-1][0] == names[0]:
+            order[-1][1].append((start, end, names))
+        elif names[0] in [name for name, _ in order]:
+            raise ValueError(f"The date ranges of the source {names[0]} are "
+                             "not contiguous, as the streaming mode needs")
+        else:
+            order.append((names[0], [(start, end, names)]))
+    return order
@@ -0,0 +1,318 @@
+"""
+This module implements the functions responsible to export and
+load the processed dataframe in the formats of the processed store.
+"""
+from typing import List
+from pathlib import Path
+import os
+import pandas as pd
+from .database import RateDatabase
+from .paths import STORE_SUFFIXES, columnar_path, database_path
+
+
+def temporary_path(path: Path) -> Path:
+    """
+    This function returns the temporary path of an output file, replacing
+    the file once it is written
+    """
+    return path.with_name(path.name + ".tmp")
+
+
+def write_table(dataframe: pd.DataFrame, path: Path) -> None:
+    """
+    This function exports a dataframe in the format given by the suffix
+    of its path, '.parquet', '.feather' or csv otherwise. The file is
+    written with a temporary name and replaced, so an interrupted export
+    leaves the previous file.
+    Args:
+        dataframe (pd.DataFrame): the dataframe, with a default index.
+        path (Path): path of the file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = temporary_path(path)
+    try:
+        if path.suffix == STORE_SUFFIXES['feather']:
+            # uncompressed so the file can be memory-mapped on load
+            dataframe.to_feather(temporary, compression='uncompressed')
+        elif path.suffix == STORE_SUFFIXES['parquet']:
+            dataframe.to_parquet(temporary, index=False)
+        else:
+            dataframe.to_csv(temporary, index=False)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+    os.replace(temporary, path)
+
+
+def read_table(path: Path, dates: list = None) -> pd.DataFrame:
+    """
+    This function loads a dataframe exported by write_table
+    Args:
+        path (Path): path of the file.
+        dates (list): columns parsed as datetime when the file is a csv,
+            the columnar formats keep the dtypes.
+    Returns:
+        pd.DataFrame: the dataframe.
+    """
+    if path.suffix == STORE_SUFFIXES['feather']:
+        from pyarrow import feather
+        return feather.read_table(path, memory_map=True).to_pandas()
+    if path.suffix == STORE_SUFFIXES['parquet']:
+        return pd.read_parquet(path, memory_map=True)
+    # keeps the floats identical to the ones that were exported
+    return pd.read_csv(path, parse_dates=dates, float_precision='round_trip')
+
+
+def config_database(config: dict) -> RateDatabase:
+    """
+    This function returns the database of the processed rates of the config
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        RateDatabase: the database, None when it is not enabled.
+    """
+    path = database_path(config)
+    if path is None:
+        return None
+    return RateDatabase(path, config['etl']['database'].get('batch_size',
+                                                            50000))
+
+
+def write_processed(dataframe: pd.DataFrame, config: dict,
+                    new_rows: pd.DataFrame = None) -> list:
+    """
+    This function exports the processed dataframe to the csv file, to
+    the columnar artifact and to the database selected in the config. Each
+    output is replaced at once: the files by write_table, the database in
+    one transaction.
+    Args:
+        dataframe (pd.DataFrame): the processed dataframe.
+        config (dict): the parsed config file.
+        new_rows (pd.DataFrame): the rows of the processed dataframe that
+            are new or changed, only they are upserted in an existing
+            database; the database is written again when it is None.
+    Returns:
+        list: the paths that were written.
+    """
+    paths = []
+    dataframe = dataframe.reset_index(drop=True)
+
+    database = config_database(config)
+    if database is not None:
+        if new_rows is not None and database.path.is_file():
+            database.write(new_rows, replace=False)
+        else:
+            database.write(dataframe)
+        paths.append(database.path)
+
+    artifact = columnar_path(config)
+    if artifact is not None:
+        write_table(dataframe, artifact)
+        paths.append(artifact)
+
+    if artifact is None or config['etl'].get('keep_csv', True):
+        processed_path = Path(config['etl']['processed_path'])
+        write_table(dataframe, processed_path)
+        paths.append(processed_path)
+
+    return paths
+
+
+class ProcessedWriter():
+    """
+    This class exports the processed dataframe chunk by chunk to the csv
+    file and to the columnar artifact selected in the config. The files are
+    written with a temporary name and replaced when the writer is closed.
+    """
+
+    paths: list
+    writers: dict
+    database: RateDatabase
+
+    def __init__(self, config: dict) -> None:
+        """
+        Constructor to the class ProcessedWriter
+        Args:
+            config (dict): the parsed config file.
+        """
+        self.paths = []
+        self.writers = {}
+
+        # the database replaces its rates in a transaction committed when
+        # the writer is closed
+        self.database = config_database(config)
+
+        artifact = columnar_path(config)
+        if artifact is not None:
+            self.paths.append(artifact)
+        if artifact is None or config['etl'].get('keep_csv', True):
+            self.paths.append(Path(config['etl']['processed_path']))
+
+        for path in self.paths:
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """
+        This function appends a chunk to the output files
+        Args:
+            chunk (pd.DataFrame): rows of the processed dataframe, the first
+                chunk defines the columns and the dtypes.
+        """
+        chunk = chunk.reset_index(drop=True)
+        if self.database is not None:
+            if self.database.connection is None:
+                self.database.start(
+                    list(chunk.columns[chunk.columns != 'Date']))
+            self.database.upsert(chunk)
+
+        for path in self.paths:
+            if path.suffix == STORE_SUFFIXES['parquet']:
+                self.write_parquet(path, chunk)
+            elif path.suffix == STORE_SUFFIXES['feather']:
+                self.write_feather(path, chunk)
+            else:
+                chunk.to_csv(temporary_path(path), index=False,
+                             mode='a' if path in self.writers else 'w',
+                             header=path not in self.writers)
+                self.writers[path] = None
+
+    def write_parquet(self, path: Path, chunk: pd.DataFrame) -> None:
+        """
+        This function appends a chunk as a row group of the parquet file
+        """
+        import pyarrow as pa
+        from pyarrow import parquet
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if path not in self.writers:
+            self.writers[path] = parquet.ParquetWriter(
+                temporary_path(path), table.schema)
+        self.writers[path].write_table(table)
+
+    def write_feather(self, path: Path, chunk: pd.DataFrame) -> None:
+        """
+        This function appends a chunk as record batches of the feather file
+        """
+        import pyarrow as pa
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if path not in self.writers:
+            # uncompressed so the file can be memory-mapped on load
+            self.writers[path] = pa.ipc.new_file(
+                temporary_path(path), table.schema,
+                options=pa.ipc.IpcWriteOptions(compression=None))
+        self.writers[path].write_table(table)
+
+    def close(self) -> list:
+        """
+        This function closes the output files and moves them to their paths
+        Returns:
+            list: the paths that were written.
+        """
+        for path, writer in self.writers.items():
+            if writer is not None:
+                writer.close()
+            os.replace(temporary_path(path), path)
+        paths = [path for path in self.paths if path in self.writers]
+
+        if self.database is not None and self.database.connection is not None:
+            self.database.commit()
+            paths.append(self.database.path)
+        return paths
+
+    def abort(self) -> None:
+        """
+        This function closes and removes the temporary files
+        """
+        for path, writer in self.writers.items():
+            if writer is not None:
+                writer.close()
+            temporary_path(path).unlink(missing_ok=True)
+        self.writers = {}
+        if self.database is not None:
+            self.database.abort()
+
+
+def empty_processed(currencies: List[str]) -> pd.DataFrame:
+    """
+    This function returns a processed dataframe without rows, with the
+    dtypes of the processed dataframe
+    Args:
+        currencies (List[str]): codes of the currencies.
+    Returns:
+        pd.DataFrame: the column 'Date' as datetime and the currencies as
+            float.
+    """
+    columns = {'Date': pd.Series(dtype='datetime64[ns]')}
+    columns.update({code: pd.Series(dtype='float64') for code in currencies})
+    return pd.DataFrame(columns)
+
+
+def processed_exists(config: dict) -> bool:
+    """
+    This function verifies if the processed store was already exported
+    Args:
+        config (dict): the parsed config file.
+    Returns:
+        bool: True when the columnar artifact or the csv file exists.
+    """
+    artifact = columnar_path(config)
+    if artifact is not None and artifact.is_file():
+        return True
+
+    return Path(config['etl']['processed_path']).is_file()
+
+
+def merge_processed(processed: pd.DataFrame,
+                    new: pd.DataFrame) -> pd.DataFrame:
+    """
+    This function merges new rows into the processed dataframe. The rows of
+    the new dataframe replace the processed rows of the same date, so
+    merging the same rows twice gives the same result.
+    Args:
+        processed (pd.DataFrame): the processed dataframe.
+        new (pd.DataFrame): the new rows.
+    Returns:
+        pd.DataFrame: the merged dataframe sorted from the newest date.
+    """
+    merged = pd.concat([new, processed], ignore_index=True)
+    merged = merged.drop_duplicates(subset='Date', keep='first')
+    return merged.sort_values('Date', ascending=False, ignore_index=True)
+
+
+def read_processed(config: dict, start=None, end=None,
+                   currencies: List[str] = None) -> pd.DataFrame:
+    """
+    This function loads the processed dataframe from the database when it
+    is enabled and exists, selecting the dates and the currencies in the
+    query, else from the columnar artifact when it exists, with the dtypes
+    stored in it, and from the csv file otherwise
+    Args:
+        config (dict): the parsed config file.
+        start: first date, None for the first processed date.
+        end: last date, None for the last processed date.
+        currencies (List[str]): codes of the currencies, all of them when
+            it is None. The currencies that are not processed are left out.
+    Returns:
+        pd.DataFrame: the processed dataframe with 'Date' as datetime.
+    """
+    database = config_database(config)
+    if database is not None and database.path.is_file():
+        return database.read(start, end, currencies)
+
+    artifact = columnar_path(config)
+    if artifact is not None and artifact.is_file():
+        processed = read_table(artifact)
+    else:
+        processed = read_table(Path(config['etl']['processed_path']), ['Date'])
+
+    if currencies is not None:
+        processed = processed[['Date'] + [code for code in currencies
+                                          if code in processed.columns]]
+    if start is not None or end is not None:
+        dates = processed['Date'].dt.normalize()
+        selected = pd.Series(True, index=processed.index)
+        if start is not None:
+            selected &= dates >= pd.Timestamp(start)
+        if end is not None:
+            selected &= dates <= pd.Timestamp(end)
+        processed = processed[selected].reset_index(drop=True)
+    return processed
@@ -1,9 +1,252 @@
 """This module implements utility functions for other modules."""
+import atexit
+import importlib.util
 import logging
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import os
 from pathlib import Path
+import queue
+from typing import Callable, Dict, List, Set, Tuple
 import sys
 import yaml
 
+# records of the loggers created inside a buffer_logging block
+_BUFFERED_RECORDS = None
+
+
+class BufferHandler(logging.Handler):
+    """
+    This class keeps the log records in a list, tagged with the path of
+    their log file, so they can be sent to another process
+    """
+
+    def __init__(self, records: list, log_path: str) -> None:
+        """
+        Constructor to the class BufferHandler
+        Args:
+            records (list): list receiving the records.
+            log_path (str): path of the log file of the logger.
+        """
+        super().__init__()
+        self.records = records
+        self.log_path = log_path
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        This function stores a record with its message already formatted
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        record.log_path = self.log_path
+        self.records.append(record)
+
+
+# settings of the logging when the config does not set them
+LOG_DEFAULTS = {'level': 'INFO', 'levels': {}, 'max_bytes': 1048576,
+                'backup_count': 3, 'console': True}
+
+# format of the records in the log files and stdout
+LOG_FORMAT = "%(asctime)s : %(levelname)s : %(name)s : %(message)s"
+
+
+class StdoutHandler(logging.StreamHandler):
+    """
+    This class writes the records to the current sys.stdout, which may be
+    replaced after the handler is created
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor to the class StdoutHandler
+        """
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        """
+        This function returns the current stdout
+        """
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, _) -> None:
+        """
+        This function ignores the stream given to the handler
+        """
+
+
+class LogRouter(logging.Handler):
+    """
+    This class is the handler of the listener thread, it writes each record
+    to the rotating log file of its path and to stdout
+    """
+
+    def __init__(self, pipeline: "LogPipeline") -> None:
+        """
+        Constructor to the class LogRouter
+        Args:
+            pipeline (LogPipeline): the logging of the process.
+        """
+        super().__init__()
+        self.pipeline = pipeline
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """
+        This function writes a record to its file and to stdout
+        """
+        self.pipeline.file(record.log_path).handle(record)
+        if self.pipeline.settings['console']:
+            self.pipeline.console.handle(record)
+
+
+class LogPipeline():
+    """
+    This class keeps the logging of a process: the loggers put their records
+    in a queue, without waiting for the disk, and a listener thread writes
+    them. Each log file is opened once by the process, in append mode, and
+    rotated by size. A process forked from another starts its own listener,
+    while the workers of the pipeline keep their records in memory (see
+    run_buffered) to be written by the main process.
+    """
+
+    settings: dict
+    pid: int
+    queue: queue.SimpleQueue
+    listener: QueueListener
+    files: Dict[str, RotatingFileHandler]
+    console: StdoutHandler
+    loggers: Set[str]
+
+    def __init__(self, settings: dict) -> None:
+        """
+        Constructor to the class LogPipeline
+        Args:
+            settings (dict): the settings, see configure_logging.
+        """
+        self.settings = settings
+        self.pid = None
+        self.queue = None
+        self.listener = None
+        self.files = {}
+        self.console = None
+        self.loggers = set()
+
+    def configure(self, settings: dict) -> None:
+        """
+        This function applies new settings to the loggers and the open files
+        Args:
+            settings (dict): the settings, see configure_logging.
+        """
+        self.settings = settings
+        for name in self.loggers:
+            logging.getLogger(name).setLevel(self.level(name))
+        for handler in self.files.values():
+            handler.maxBytes = settings['max_bytes']
+            handler.backupCount = settings['backup_count']
+
+    def level(self, name: str) -> int:
+        """
+        This function returns the level of a logger
+        """
+        level = self.settings['levels'].get(name, self.settings['level'])
+        return logging.getLevelName(level) if isinstance(level, str) else level
+
+    def start(self) -> None:
+        """
+        This function starts the listener of this process, once
+        """
+        if self.pid == os.getpid():
+            return
+
+        # the handlers of a parent process are left to it
+        self.pid = os.getpid()
+        self.queue = queue.SimpleQueue()
+        self.files = {}
+        self.console = StdoutHandler()
+        self.console.setFormatter(logging.Formatter(LOG_FORMAT))
+        self.listener = QueueListener(self.queue, LogRouter(self))
+        self.listener.start()
+
+    def put(self, record: logging.LogRecord) -> None:
+        """
+        This function puts a record in the queue of this process
+        """
+        self.start()
+        self.queue.put_nowait(record)
+
+    def file(self, log_path: str) -> RotatingFileHandler:
+        """
+        This function returns the handler of a log file, opening it once
+        Args:
+            log_path (str): path of the log file.
+        Returns:
+            RotatingFileHandler: the handler.
+        """
+        if log_path not in self.files:
+            Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                log_path, maxBytes=self.settings['max_bytes'],
+                backupCount=self.settings['backup_count'], encoding='utf-8')
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            self.files[log_path] = handler
+        return self.files[log_path]
+
+    def flush(self) -> None:
+        """
+        This function waits until the listener writes the queued records
+        """
+        if self.pid == os.getpid():
+            self.listener.stop()
+            self.listener.start()
+
+    def stop(self) -> None:
+        """
+        This function writes the queued records and closes the log files
+        """
+        if self.pid != os.getpid():
+            return
+        self.listener.stop()
+        for handler in self.files.values():
+            handler.close()
+        self.pid = None
+
+
+class LogQueueHandler(QueueHandler):
+    """
+    This class puts the records of a logger in the queue of the process,
+    tagged with the path of their log file
+    """
+
+    log_path: str
+
+    def __init__(self, log_path: str) -> None:
+        """
+        Constructor to the class LogQueueHandler
+        Args:
+            log_path (str): path of the log file of the logger.
+        """
+        super().__init__(None)
+        self.log_path = log_path
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        This function formats the message of a copy of the record
+        """
+        record = super().prepare(record)
+        record.log_path = self.log_path
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        This function puts the record in the queue of the process
+        """
+        _PIPELINE.put(record)
+
+
+# the logging of this process, its records are written at the exit
+_PIPELINE = LogPipeline(dict(LOG_DEFAULTS))
+atexit.register(_PIPELINE.stop)
 
 
 def parse_config(config_file: str) -> dict:
@@ -19,42 +262,113 @@ def parse_config(config_file: str) -> dict:
     return config
 
 
-def set_logger(name: str, log_path: str) -> logging:
+def configure_logging(settings: dict = None) -> None:
     """
-    This function configure a logger
+    This function configures the logging of this process, the settings
+    apply to the loggers already created and to the next ones
+    Args:
+        settings [dict]: the logging section of the config file, with the
+            'level' of the records, the 'levels' of some loggers, the
+            'max_bytes' of a log file before it is rotated (0 to never
+            rotate), the 'backup_count' of rotated files and 'console' to
+            also write the records to stdout
+    """
+    _PIPELINE.configure(dict(LOG_DEFAULTS, **(settings or {})))
+
+
+def set_logger(name: str, log_path: str, settings: dict = None) -> logging:
+    """
+    This function configure a logger. Calling it again for the same logger
+    does not add handlers, so each record is written once.
     Args:
         log_path [str]: eg: "../log/etl.log"
+        settings [dict]: the logging section of the config file, see
+            configure_logging, None to keep the current settings
     Returns:
         logger [logging object]
     """
-    log_path = Path(log_path)
-    log_path.parent.mkdir(parents=True, exist_ok=True)
+    if settings is not None:
+        configure_logging(settings)
+
     # create logger with __name__
     logger = logging.getLogger(name)
 
     # configuring the logger level
-    logger.setLevel(logging.INFO)
+    logger.setLevel(_PIPELINE.level(name))
+
+    # keeping the records in memory inside a buffer_logging block
+    if _BUFFERED_RECORDS is not None:
+        logger.handlers = [BufferHandler(_BUFFERED_RECORDS, str(log_path))]
+        logger.propagate = False
+        return logger
+
+    # putting the records in the queue written by the listener thread
+    handler = logger.handlers[0] if len(logger.handlers) == 1 else None
+    if not isinstance(handler, LogQueueHandler) or \
+            handler.log_path != str(log_path):
+        logger.handlers = [LogQueueHandler(str(log_path))]
+    logger.propagate = True
+    _PIPELINE.loggers.add(name)
 
-    # creating file handler to log INFO messages in a log file
-    file_handler = logging.FileHandler(log_path, mode='w')
+    return logger
 
-    # creating stream handler to log INFO messages in stdout
-    console_handler = logging.StreamHandler(sys.stdout)
 
-    # creating the formatter to log messages
-    formatter = logging.Formatter(
-        "%(asctime)s : %(levelname)s : %(name)s : %(message)s")
+def flush_logging() -> None:
+    """
+    This function waits until the records put in the queue are written
+    """
+    _PIPELINE.flush()
 
-    # setting the format to the file handler
-    file_handler.setFormatter(formatter)
 
-    # setting the format to the console handler
-    console_handler.setFormatter(formatter)
+def resolve_csv_engine(engine: str = "auto") -> str:
+    """
+    This function resolves the csv engine used by pandas to parse files
+    Args:
+        engine [str]: "auto", "pyarrow" or "c". "auto" selects pyarrow
+            when it is installed and falls back to the c engine otherwise.
+    Returns:
+        engine [str]
+    """
+    if engine != "auto":
+        return engine
 
-    # adding the file handler to the logger
-    logger.addHandler(file_handler)
+    if importlib.util.find_spec("pyarrow") is not None:
+        return "pyarrow"
 
-    # adding the console handler to the logger
-    logger.addHandler(console_handler)
+    return "c"
 
-    return logger
+
+def run_buffered(action: Callable[[], None]) -> Tuple[List, Exception]:
+    """
+    This function executes an action keeping the records of the loggers
+    it creates in memory, to be replayed by replay_records in the process
+    that submitted it
+    Args:
+        action [Callable]: function without arguments
+    Returns:
+        records [list], error [Exception or None]
+    """
+    global _BUFFERED_RECORDS  # pylint: disable=global-statement
+    records = []
+    _BUFFERED_RECORDS = records
+    try:
+        action()
+        return records, None
+    except Exception as exception:  # pylint: disable=broad-except
+        return records, exception
+    finally:
+        _BUFFERED_RECORDS = None
+
+
+def replay_records(records: List, loggers: dict) -> None:
+    """
+    This function emits the buffered records in the log files and stdout
+    Args:
+        records [list]: records returned by run_buffered
+        loggers [dict]: loggers already configured in this process, by
+            name, updated with the loggers created for the records
+    """
+    for record in records:
+        if record.name not in loggers:
+            loggers[record.name] = set_logger(record.name, record.log_path)
+        loggers[record.name].handle(record)
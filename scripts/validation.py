@@ -0,0 +1,233 @@
+"""
+This module implements the checks of the sources loaded by the ETL: the
+columns and dtypes of the schema, the order of the dates, the duplicate
+dates, the gaps between dates and the outlier rates. They are vectorized
+and executed right after the load, so a bad source aborts the ETL before
+the transformations.
+"""
+from typing import List
+import numpy as np
+import pandas as pd
+from pandas.api import types
+
+# dtype check of each type name used in the source schemas
+DTYPE_CHECKS = {'datetime': types.is_datetime64_any_dtype,
+                'float': types.is_numeric_dtype,
+                'int': types.is_integer_dtype,
+                'str': lambda dtype: types.is_string_dtype(dtype) or
+                types.is_object_dtype(dtype)}
+
+# orders of the dates of a source
+ORDERS = ('ascending', 'descending', 'any')
+
+
+class ValidationError(ValueError):
+    """
+    This class is the error raised when a source fails its checks, with
+    the description of each failed check
+    """
+
+    source: str
+    failures: List[str]
+
+    def __init__(self, source: str, failures: List[str]) -> None:
+        """
+        Constructor to the class ValidationError
+        Args:
+            source (str): path of the source.
+            failures (List[str]): description of each failed check.
+        """
+        self.source = source
+        self.failures = failures
+        super().__init__(f"The source {source} failed the checks: " +
+                         "; ".join(failures))
+
+    def __reduce__(self) -> tuple:
+        """
+        This function rebuilds the error from its source and its failures
+        when it is unpickled, e.g. raised in a process pool
+        """
+        return (self.__class__, (self.source, self.failures))
+
+
+def check_columns(frame: pd.DataFrame, schema: dict) -> List[str]:
+    """
+    This function checks that the columns of the schema were loaded with
+    the dtypes of the schema
+    Args:
+        frame (pd.DataFrame): the loaded source.
+        schema (dict): the schema of the source, see read_csv_schema.
+    Returns:
+        List[str]: the failures.
+    """
+    missing = [column for column in schema['columns']
+               if column not in frame.columns]
+    failures = [f"the columns {missing} are missing"] if missing else []
+
+    for column, dtype in schema['columns'].items():
+        if column in frame.columns and \
+                not DTYPE_CHECKS[dtype](frame[column].dtype):
+            failures.append(f"the column {column} has the dtype "
+                            f"{frame[column].dtype} instead of {dtype}")
+    return failures
+
+
+def stamp_text(stamp: np.datetime64) -> str:
+    """
+    This function formats a date of a failure, without its time at midnight
+    """
+    stamp = pd.Timestamp(stamp)
+    return str(stamp.date()) if stamp == stamp.normalize() else str(stamp)
+
+
+def check_dates(dates: pd.Series, order: str = 'any', max_gap_days: int = None,
+                previous: pd.Timestamp = None) -> List[str]:
+    """
+    This function checks the order of the dates, the duplicate dates and
+    the gaps of more than max_gap_days business days between two dates.
+    The order and the duplicates are checked on the whole timestamps, so
+    intraday dates are valid, and the gaps on their days.
+    Args:
+        dates (pd.Series): the dates of the source, in the order of the file.
+        order (str): "ascending", "descending" or "any".
+        max_gap_days (int): largest number of business days between two
+            consecutive dates, None to skip the check.
+        previous (pd.Timestamp): last date of the previous chunk of the
+            source, checked with the dates when it is given.
+    Returns:
+        List[str]: the failures.
+    """
+    if order not in ORDERS:
+        raise ValueError(f"The order {order} is not one of {ORDERS}")
+
+    failures = []
+    if dates.isna().any():
+        failures.append(f"{dates.isna().sum()} dates are missing")
+        dates = dates.dropna()
+
+    stamps = dates.to_numpy().astype('datetime64[ns]')
+    if previous is not None:
+        stamps = np.concatenate([[np.datetime64(previous, 'ns')], stamps])
+    steps = np.diff(stamps).astype('int64')
+
+    if order != 'any':
+        wrong = np.flatnonzero(steps < 0 if order == 'ascending' else steps > 0)
+        if len(wrong):
+            failures.append(f"the dates are not in {order} order from "
+                            f"{stamp_text(stamps[wrong[0] + 1])}")
+
+    duplicates = pd.Series(stamps).duplicated()
+    if duplicates.any():
+        failures.append(f"{duplicates.sum()} dates are repeated, e.g. "
+                        f"{stamp_text(stamps[duplicates.to_numpy()][0])}")
+
+    days = np.unique(stamps.astype('datetime64[D]'))
+    if max_gap_days is not None and len(days) > 1:
+        gaps = np.busday_count(days[:-1], days[1:])
+        wide = np.flatnonzero(gaps > max_gap_days)
+        if len(wide):
+            failures.append(f"{len(wide)} gaps are longer than {max_gap_days} "
+                            f"business days, e.g. {days[wide[0]]} to "
+                            f"{days[wide[0] + 1]}")
+    return failures
+
+
+def check_outliers(dates: pd.Series, rates: pd.DataFrame, window: int,
+                   threshold: float) -> List[str]:
+    """
+    This function checks that no rate is further from the median of the
+    window of rates around it than the threshold, relative to the median
+    Args:
+        dates (pd.Series): the dates of the rates.
+        rates (pd.DataFrame): the rates of each currency.
+        window (int): number of rates of the rolling median.
+        threshold (float): largest relative deviation, e.g. 0.5 for 50%.
+    Returns:
+        List[str]: the failures.
+    """
+    order = np.argsort(dates.to_numpy(), kind='stable')
+    rates = rates.iloc[order].reset_index(drop=True)
+    median = rates.rolling(window, center=True, min_periods=1).median()
+    outliers = ((rates / median - 1).abs() > threshold).to_numpy()
+
+    failures = []
+    for number in np.flatnonzero(outliers.any(axis=0)):
+        first = np.flatnonzero(outliers[:, number])[0]
+        failures.append(
+            f"{outliers[:, number].sum()} rates of {rates.columns[number]} "
+            f"are more than {threshold:.0%} from the rolling median, e.g. "
+            f"{rates.iloc[first, number]} on "
+            f"{dates.iloc[order[first]].date()}")
+    return failures
+
+
+class SourceValidator():
+    """
+    This class executes the checks of a source, loaded whole or chunk by
+    chunk. The last date of a chunk is kept, so the order and the gaps are
+    also checked between the chunks.
+    """
+
+    source: str
+    schema: dict
+    order: str
+    max_gap_days: int
+    outlier_window: int
+    outlier_threshold: float
+    last_date: pd.Timestamp
+
+    def __init__(self, source: str, schema: dict, settings: dict,
+                 order: str = 'any') -> None:
+        """
+        Constructor to the class SourceValidator
+        Args:
+            source (str): path of the source.
+            schema (dict): the schema of the loaded columns.
+            settings (dict): the validation section of the config.
+            order (str): order of the dates, "ascending", "descending" or
+                "any".
+        """
+        self.source = source
+        self.schema = schema
+        self.order = order
+        self.max_gap_days = settings.get('max_gap_days')
+        self.outlier_window = settings.get('outlier_window', 21)
+        self.outlier_threshold = settings.get('outlier_threshold')
+        self.last_date = None
+
+    def failures(self, frame: pd.DataFrame) -> List[str]:
+        """
+        This function executes the checks of the source
+        Args:
+            frame (pd.DataFrame): the source or the next chunk of it, with
+                the columns of the schema.
+        Returns:
+            List[str]: the failures.
+        """
+        failures = check_columns(frame, self.schema)
+        if failures or frame.empty:
+            return failures
+
+        date_column = next(name for name, dtype in self.schema['columns'].items()
+                           if dtype == 'datetime')
+        dates = frame[date_column]
+        failures += check_dates(dates, self.order, self.max_gap_days,
+                                self.last_date)
+        if self.outlier_threshold is not None:
+            rates = frame[[name for name, dtype in self.schema['columns'].items()
+                           if dtype in ('float', 'int')]]
+            failures += check_outliers(dates, rates, self.outlier_window,
+                                       self.outlier_threshold)
+
+        self.last_date = dates.dropna().iloc[-1] if dates.notna().any() \
+            else self.last_date
+        return failures
+
+    def check_failures(self, failures: List[str]) -> None:
+        """
+        This function raises a ValidationError when a check failed
+        Args:
+            failures (List[str]): the failures returned by failures.
+        """
+        if failures:
+            raise ValidationError(self.source, failures)
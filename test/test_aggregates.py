@@ -0,0 +1,90 @@
+"""
+This module implements the tests of the aggregates materialized by the ETL
+"""
+import pandas as pd
+import pytest
+import yaml
+from scripts.aggregates import (aggregate_tables, rolling_table, ohlc_table,
+                                period_table)
+from scripts.etl import ExchangeETL
+from scripts.query import RateStore
+from scripts.store import read_processed, read_table, write_processed
+from scripts.utils import parse_config
+
+
+@pytest.fixture(name="rates")
+def fixture_rates() -> pd.DataFrame:
+    """
+    This fixture loads the rates of the repository indexed by the dates
+    """
+    processed = read_processed(parse_config("./config.yml"))
+    return processed.set_index('Date').sort_index()
+
+
+@pytest.fixture(name="tmp_config")
+def fixture_tmp_config(tmp_path) -> str:
+    """
+    This fixture creates a config file exporting the processed store, the
+    aggregates and the logs to tmp_path
+    """
+    config = parse_config("./config.yml")
+    config['etl']['processed_path'] = str(tmp_path / 'processed_data.csv')
+    config['aggregates']['enabled'] = True
+    config['aggregates']['path'] = str(tmp_path / 'aggregates')
+    for key in config['log']:
+        config['log'][key] = str(tmp_path / f'{key}.log')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+    return str(config_path)
+
+
+def test_aggregate_functions(rates):
+    """
+    This function performs the test of the aggregates, that must equal the
+    ones computed over the whole series, and of their update after a date
+    """
+    series = rates['BRL'].dropna()
+    rolling = rolling_table(rates, [20]).set_index('Date')
+    pd.testing.assert_series_equal(rolling['BRL_mean_20'].dropna(),
+                                   series.rolling(20).mean().dropna(),
+                                   check_names=False)
+
+    monthly = ohlc_table(rates, 'M').set_index('Date')
+    expected = RateStore(rates.reset_index()).resample('BRL', 'MS')
+    pd.testing.assert_frame_equal(monthly[['open', 'high', 'low', 'close']],
+                                  expected, check_freq=False,
+                                  check_index_type=False)
+
+    periods = {'temer': ['2017-01-01', '2018-01-01'],
+               'bolsonaro': ['2018-01-01', None]}
+    table = period_table(rates, periods).set_index('period')
+    assert table.loc['temer', 'max'] == series.loc['2017'].max()
+    assert table.loc['bolsonaro', 'count'] == len(series.loc['2018':])
+
+    since = series.index[-30]
+    update = rolling_table(rates, [20], since).set_index('Date')
+    pd.testing.assert_frame_equal(update, rolling.loc[rolling.index > since])
+    assert list(period_table(rates, periods, since)['period']) == ['bolsonaro']
+
+
+def test_processing_aggregates_incremental(tmp_config):
+    """
+    This function performs the test of the incremental materialization,
+    whose tables must equal the tables computed from all the dates
+    """
+    etl = ExchangeETL(tmp_config)
+    etl.processing()
+    tables = aggregate_tables(etl.config)
+    full = {table.name: read_table(table.path(etl.config), table.dates)
+            for table in tables}
+    assert set(full) == {'rolling', 'ohlc_monthly', 'ohlc_yearly', 'periods'}
+
+    processed = read_processed(etl.config)
+    write_processed(processed.iloc[40:], etl.config)
+    etl.materialize(processed.iloc[40:])
+    etl.processing(incremental=True)
+    etl.processing(incremental=True)
+
+    for table in tables:
+        pd.testing.assert_frame_equal(
+            read_table(table.path(etl.config), table.dates), full[table.name])
@@ -0,0 +1,98 @@
+"""
+This module implements the tests of the API memoized on disk
+"""
+import os
+import shutil
+from pathlib import Path
+import pandas as pd
+import pytest
+import yaml
+from scripts.api import (DiskCache, load_processed, period_slices,
+                         period_stats, rolling_stats)
+from scripts.etl import ExchangeETL
+from scripts.store import read_processed
+from scripts.utils import parse_config
+
+
+@pytest.fixture(name="api_config")
+def fixture_api_config(tmp_path) -> str:
+    """
+    This fixture writes a config reading copies of the sources and
+    exporting the processed dataframe and the cache in a temporary directory
+    """
+    config = parse_config("./config.yml")
+    for source in config['etl']['sources']:
+        source['path'] = shutil.copy(source['path'], tmp_path)
+    config['etl']['processed_path'] = str(tmp_path / 'processed_data.csv')
+    config['cache'] = {'enabled': True, 'path': str(tmp_path / 'cache'),
+                       'max_bytes': 1 << 24}
+    for key in config['log']:
+        config['log'][key] = str(tmp_path / f'{key}.log')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+    return str(config_path)
+
+
+def test_load_processed_memoized(api_config, monkeypatch):
+    """
+    This function performs the test of the processed dataframe, that must
+    be read from the cache until a source or an argument changes, without
+    writing the outputs of the pipeline
+    """
+    config = parse_config(api_config)
+    processed = load_processed(config_path=api_config)
+    assert not Path(config['etl']['processed_path']).exists()
+
+    def processing(*_args, **_kwargs):
+        raise AssertionError("The ETL was executed")
+
+    # the processed store written after the sources is read
+    ExchangeETL(api_config).processing()
+    monkeypatch.setattr(ExchangeETL, 'processing', processing)
+    pd.testing.assert_frame_equal(
+        load_processed(config_path=api_config, refresh=True), processed,
+        check_dtype=False)
+    pd.testing.assert_frame_equal(processed, read_processed(config),
+                                  check_dtype=False)
+    slices = period_slices('BRL', config_path=api_config)
+    assert list(slices) == list(config['plots']['terms'])
+    assert slices['temer']['Date'].min() >= pd.Timestamp('2017-01-01')
+    assert slices['temer']['Date'].max() < pd.Timestamp('2018-01-01')
+    assert period_slices(config_path=api_config)['lula'].equals(
+        slices['lula'])
+
+    stats = rolling_stats('BRL', [20], config_path=api_config)
+    assert list(stats.columns) == ['Date', 'BRL_mean_20', 'BRL_vol_20']
+    assert len(period_stats(config_path=api_config)) == len(slices)
+    with pytest.raises(ValueError):
+        period_slices('XYZ', config_path=api_config)
+
+    # a new version of a source is processed again
+    source = config['etl']['sources'][0]['path']
+    os.utime(source)
+    with pytest.raises(AssertionError, match="ETL"):
+        load_processed(config_path=api_config)
+    monkeypatch.undo()
+    pd.testing.assert_frame_equal(
+        load_processed(config_path=api_config, refresh=True), processed,
+        check_dtype=False)
+
+
+def test_disk_cache_eviction(tmp_path):
+    """
+    This function performs the test of the cache, that must remove the
+    least recently used results over its size
+    """
+    cache = DiskCache(str(tmp_path), max_bytes=3500)
+    for number in range(3):
+        cache.put(f"key{number}", b"x" * 1000)
+        os.utime(cache.path(f"key{number}"), (number, number))
+    assert cache.get("key0") == (True, b"x" * 1000)
+    cache.put("key3", b"x" * 1000)
+    assert [cache.get(f"key{number}")[0] for number in range(4)] == \
+        [True, False, True, True]
+    assert cache.nbytes <= 3500
+
+    cache.path("key0").write_bytes(b"not a pickle")
+    assert cache.get("key0") == (False, None)
+    assert not cache.path("key0").exists()
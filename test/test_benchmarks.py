@@ -0,0 +1,32 @@
+"""
+This module implements the smoke test of the benchmark of the pipeline
+"""
+import json
+import yaml
+from click.testing import CliRunner
+from benchmarks.bench_pipeline import STAGES, benchmark
+from scripts.utils import parse_config
+
+
+def test_bench_pipeline(tmp_path):
+    """
+    This function performs the test of the benchmark on the smallest
+    scales, that must measure every stage and write its report
+    """
+    config = parse_config("./config.yml")
+    for key in config['log']:
+        config['log'][key] = str(tmp_path / f'{key}.log')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+    output = tmp_path / 'bench.json'
+
+    result = CliRunner().invoke(benchmark, [
+        str(config_path), '--scales', '1,2', '--workdir', str(tmp_path / 'work'),
+        '--output', str(output)])
+    assert result.exit_code == 0, result.output
+
+    results = json.loads(output.read_text())
+    assert [(row['scale'], row['stage']) for row in results] == \
+        [(scale, stage) for scale in [1, 2] for stage in STAGES]
+    assert all(row['seconds'] > 0 and row['traced_peak'] > 0
+               for row in results)
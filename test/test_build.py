@@ -0,0 +1,144 @@
+"""
+This module implements the tests of the build graph
+"""
+from functools import partial
+from pathlib import Path
+import logging
+import pytest
+from scripts.build import BuildGraph, Stage
+from scripts.utils import flush_logging, set_logger
+
+
+def make_graph(tmp_path, calls: list, config: dict = None) -> BuildGraph:
+    """
+    This function creates a graph raw -> processed -> plot in tmp_path
+    whose stages append their names to calls
+    """
+    raw = tmp_path / 'raw.csv'
+    processed = tmp_path / 'processed.csv'
+    plot = tmp_path / 'plot.png'
+
+    def etl():
+        calls.append('etl')
+        processed.write_text(raw.read_text().upper())
+
+    def plot_graph():
+        calls.append('plot')
+        plot.write_text(processed.read_text())
+
+    graph = BuildGraph(str(tmp_path / 'manifest.json'))
+    graph.add_stage(Stage('etl', etl, [str(raw)], [str(processed)]))
+    graph.add_stage(Stage('plot', plot_graph, [str(processed)], [str(plot)],
+                          config=config, depends=['etl']))
+    return graph
+
+
+def test_build_graph_minimal_rebuild(tmp_path):
+    """
+    This function performs the test of the stages executed by the graph
+    """
+    logger = logging.getLogger(__name__)
+    (tmp_path / 'raw.csv').write_text('a')
+    calls = []
+
+    assert make_graph(tmp_path, calls).run(logger) == ['etl', 'plot']
+    assert make_graph(tmp_path, calls).run(logger) == []
+
+    # same content with a new modification time
+    (tmp_path / 'raw.csv').write_text('a')
+    assert make_graph(tmp_path, calls).run(logger) == []
+
+    (tmp_path / 'raw.csv').write_text('b')
+    assert make_graph(tmp_path, calls).run(logger) == ['etl', 'plot']
+
+    (tmp_path / 'plot.png').unlink()
+    assert make_graph(tmp_path, calls).run(logger) == ['plot']
+
+    graph = make_graph(tmp_path, calls, config={'plot_path': 'other'})
+    assert graph.status() == {'etl': False, 'plot': True}
+    assert graph.run(logger) == ['plot']
+    assert calls == ['etl', 'plot', 'etl', 'plot', 'plot', 'plot']
+
+
+def write_upper(source: str, target: str) -> None:
+    """
+    This function is a picklable stage action, that logs and copies
+    a file in upper case
+    """
+    logger = set_logger("test_build_stage", str(Path(target).with_suffix('.log')))
+    logger.info("Writing %s", target)
+    Path(target).write_text(Path(source).read_text().upper())
+
+
+def test_build_graph_parallel(tmp_path):
+    """
+    This function performs the test of the independent stages executed
+    in a process pool
+    """
+    raw = str(tmp_path / 'raw.csv')
+    Path(raw).write_text('a')
+    graph = BuildGraph(str(tmp_path / 'manifest.json'))
+    graph.add_stage(Stage('etl', partial(write_upper, raw, raw + '.etl'),
+                          [raw], [raw + '.etl']))
+    for name in ['plot1', 'plot2']:
+        graph.add_stage(Stage(name, partial(write_upper, raw + '.etl',
+                                            raw + '.' + name),
+                              [raw + '.etl'], [raw + '.' + name],
+                              depends=['etl']))
+
+    executed = graph.run(logging.getLogger(__name__), jobs=2)
+    assert executed == ['etl', 'plot1', 'plot2']
+    assert Path(raw + '.plot2').read_text() == 'A'
+    assert graph.status() == {'etl': False, 'plot1': False, 'plot2': False}
+    flush_logging()
+    assert 'Writing' in Path(raw + '.plot1').with_suffix('.log').read_text()
+    assert graph.run(logging.getLogger(__name__), jobs=2) == []
+
+
+def test_build_graph_selected_stages(tmp_path):
+    """
+    This function performs the test of the execution of some stages, that
+    must not verify nor execute the other stages
+    """
+    logger = logging.getLogger(__name__)
+    (tmp_path / 'raw.csv').write_text('a')
+    calls = []
+
+    assert make_graph(tmp_path, calls).run(logger, stages=['etl']) == ['etl']
+    (tmp_path / 'raw.csv').write_text('b')
+    assert make_graph(tmp_path, calls).run(logger, stages=['plot']) == \
+        ['plot']
+    assert (tmp_path / 'plot.png').read_text() == 'A'
+    assert calls == ['etl', 'plot']
+    with pytest.raises(ValueError):
+        make_graph(tmp_path, calls).run(logger, stages=['charts'])
+
+
+def fail_stage(target: str) -> None:
+    """
+    This function is a picklable stage action that logs and fails
+    """
+    logger = set_logger("test_build_stage", str(Path(target).with_suffix('.log')))
+    logger.info("Failing %s", target)
+    raise RuntimeError(f"The stage writing {target} failed")
+
+
+def test_build_graph_parallel_error(tmp_path):
+    """
+    This function performs the test of a stage failing in the process pool,
+    that must not prevent the logs and the record of the other stages
+    """
+    raw = str(tmp_path / 'raw.csv')
+    Path(raw).write_text('a')
+    graph = BuildGraph(str(tmp_path / 'manifest.json'))
+    graph.add_stage(Stage('plot1', partial(fail_stage, raw + '.plot1'),
+                          [raw], [raw + '.plot1']))
+    graph.add_stage(Stage('plot2', partial(write_upper, raw, raw + '.plot2'),
+                          [raw], [raw + '.plot2']))
+
+    with pytest.raises(RuntimeError, match="plot1"):
+        graph.run(logging.getLogger(__name__), jobs=2)
+    assert graph.status() == {'plot1': True, 'plot2': False}
+    flush_logging()
+    assert 'Failing' in Path(raw + '.plot1').with_suffix('.log').read_text()
+    assert 'Writing' in Path(raw + '.plot2').with_suffix('.log').read_text()
@@ -0,0 +1,43 @@
+"""
+This module implements the tests of the context shared by the stages
+"""
+import filecmp
+import pickle
+import yaml
+from scripts import plots as plots_module
+from scripts.context import PROCESSED, PipelineContext
+from scripts.etl import ExchangeETL
+from scripts.plots import GeneratePlots
+from scripts.utils import parse_config
+
+
+def test_context_processed(tmp_path, monkeypatch):
+    """
+    This function performs the test of the plots of the processed dataframe
+    published by the ETL in the context, that must not read the processed
+    store and must equal the plots of the store
+    """
+    config = parse_config("./config.yml")
+    config['etl']['processed_path'] = str(tmp_path / 'processed_data.csv')
+    for key in config['log']:
+        config['log'][key] = str(tmp_path / f'{key}.log')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+
+    context = PipelineContext(str(config_path))
+    etl = ExchangeETL(context=context)
+    etl.processing()
+    assert etl.config is context.config
+    assert context.artifact(PROCESSED) is etl.dataframes[-1]
+    assert pickle.loads(pickle.dumps(context)).artifact(PROCESSED).equals(
+        etl.dataframes[-1])
+
+    GeneratePlots(str(config_path)).plot_graph2(str(tmp_path / 'read.png'))
+
+    def read_processed(_config):
+        raise AssertionError("The processed store was read")
+
+    monkeypatch.setattr(plots_module, 'read_processed', read_processed)
+    GeneratePlots(context=context).plot_graph2(str(tmp_path / 'shared.png'))
+    assert filecmp.cmp(tmp_path / 'read.png', tmp_path / 'shared.png',
+                       shallow=False)
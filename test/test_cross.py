@@ -0,0 +1,97 @@
+"""
+This module implements the tests of the cross rates of the currencies
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from scripts.cross import CrossRates
+from scripts.store import write_processed
+from scripts.utils import parse_config
+
+
+@pytest.fixture(name="processed")
+def fixture_processed() -> pd.DataFrame:
+    """
+    This fixture creates a processed dataframe of three currencies per
+    dollar, from the newest date, with a missing rate
+    """
+    dates = pd.bdate_range("2020-01-01", periods=40)[::-1]
+    steps = np.arange(40)
+    processed = pd.DataFrame({'Date': dates, 'BRL': 4.0 + 0.02 * steps,
+                              'EUR': 0.9 + 0.001 * steps,
+                              'CNY': 7.0 - 0.01 * steps})
+    processed.loc[5, 'EUR'] = np.nan
+    return processed
+
+
+def test_cross_pairs(processed):
+    """
+    This function performs the test of the pairs and of the cube, that
+    must equal the rates computed pair by pair
+    """
+    cross = CrossRates(processed)
+    assert cross.currencies == ['BRL', 'EUR', 'CNY', 'USD']
+
+    rates = processed.set_index('Date').sort_index().loc['2020-01-10':
+                                                         '2020-02-10']
+    pairs = cross.pairs(['BRL/EUR', 'BRL/CNY', 'USD/BRL', 'BRL/USD'],
+                        '2020-01-10', '2020-02-10')
+    pd.testing.assert_series_equal(pairs['BRL/EUR'], rates['BRL'] /
+                                   rates['EUR'], check_names=False)
+    pd.testing.assert_series_equal(pairs['USD/BRL'], 1 / rates['BRL'],
+                                   check_names=False)
+    pd.testing.assert_series_equal(pairs['BRL/USD'], rates['BRL'],
+                                   check_names=False)
+    assert cross.pairs(['BRL/EUR'])['BRL/EUR'].isna().sum() == 1
+
+    cube = cross.cube('2020-01-10', '2020-02-10')
+    assert cube.shape == (len(rates), 4, 4)
+    np.testing.assert_allclose(cube[:, 0, 2], pairs['BRL/CNY'])
+    np.testing.assert_allclose(cube[:, 2, 0] * cube[:, 0, 2], 1.0)
+    assert cross.cube(currencies=['CNY', 'BRL']).shape == (40, 2, 2)
+
+    filled = CrossRates(processed, fill_limit=1).pairs(['BRL/EUR'])
+    assert filled['BRL/EUR'].notna().all()
+
+    with pytest.raises(ValueError):
+        cross.pairs(['BRL/XYZ'])
+    with pytest.raises(ValueError):
+        cross.pairs(['BRLEUR'])
+    with pytest.raises(ValueError, match="etl.currencies"):
+        CrossRates(processed[['Date', 'BRL']])
+
+
+def test_cross_basket(processed):
+    """
+    This function performs the test of the rate against a basket, the
+    weighted geometric mean of the rates against its currencies
+    """
+    cross = CrossRates(processed.dropna())
+    basket = cross.basket('BRL', ['EUR', 'USD'], [3, 1])
+    pairs = cross.pairs(['BRL/EUR', 'BRL/USD'])
+    expected = pairs['BRL/EUR'] ** 0.75 * pairs['BRL/USD'] ** 0.25
+    pd.testing.assert_series_equal(basket, expected, check_names=False)
+    assert np.allclose(cross.basket('BRL', ['USD']), pairs['BRL/USD'])
+
+
+def test_cross_from_config(processed, tmp_path):
+    """
+    This function performs the test of the matrix loaded from the processed
+    store, that must be reused while the store is not modified
+    """
+    config = parse_config("./config.yml")
+    config['etl']['processed_path'] = str(tmp_path / 'processed_data.csv')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+    write_processed(processed, config)
+
+    cross = CrossRates.from_config(str(config_path))
+    assert CrossRates.from_config(str(config_path)) is cross
+    assert cross.matrix.shape == (40, 4)
+
+    write_processed(processed.assign(BRL=processed['BRL'] * 2), config)
+    reloaded = CrossRates.from_config(str(config_path))
+    assert reloaded is not cross
+    np.testing.assert_allclose(reloaded.pairs(['BRL/USD'])['BRL/USD'],
+                               cross.pairs(['BRL/USD'])['BRL/USD'] * 2)
@@ -0,0 +1,183 @@
+"""
+This module implements the tests of the database of the processed rates
+"""
+import pandas as pd
+import numpy as np
+import pytest
+import yaml
+from scripts.database import RateDatabase
+from scripts.etl import ExchangeETL
+from scripts.paths import store_path
+from scripts.store import ProcessedWriter, read_processed, write_processed
+from scripts.utils import parse_config
+
+
+def make_config(tmp_path) -> dict:
+    """
+    This function creates a config writing the processed store and the
+    database to tmp_path
+    """
+    return {'etl': {'processed_path': str(tmp_path / 'processed_data.csv'),
+                    'processed_format': 'csv',
+                    'keep_csv': True,
+                    'database': {'enabled': True,
+                                 'path': str(tmp_path / 'rates.sqlite'),
+                                 'batch_size': 3}}}
+
+
+def make_dataframe() -> pd.DataFrame:
+    """
+    This function creates a small processed dataframe with a missing rate
+    """
+    return pd.DataFrame({'Date': pd.to_datetime(['2021-11-18', '2021-11-17',
+                                                 '2021-11-16']),
+                         'EUR': [0.8836, np.nan, 0.8794],
+                         'BRL': [5.5389, 5.4814, 5.4705]})
+
+
+def test_database_round_trip(tmp_path):
+    """
+    This function performs the test of the processed dataframe written to
+    the database and read back with its order of dates and currencies
+    """
+    config = make_config(tmp_path)
+    paths = write_processed(make_dataframe(), config)
+    assert tmp_path / 'rates.sqlite' in paths
+    assert store_path(config) == tmp_path / 'rates.sqlite'
+
+    dataframe = read_processed(config)
+    assert list(dataframe.columns) == ['Date', 'EUR', 'BRL']
+    assert dataframe.dtypes['Date'].type == np.datetime64
+    assert dataframe.dtypes['BRL'] == np.float64
+    pd.testing.assert_frame_equal(dataframe, make_dataframe(),
+                                  check_dtype=False)
+
+
+def test_database_filters(tmp_path):
+    """
+    This function performs the test of the dates and the currencies
+    selected by the query, the unknown currencies being left out
+    """
+    config = make_config(tmp_path)
+    write_processed(make_dataframe(), config)
+
+    dataframe = read_processed(config, start='2021-11-17',
+                               currencies=['BRL', 'XYZ'])
+    assert list(dataframe.columns) == ['Date', 'BRL']
+    assert dataframe['BRL'].tolist() == [5.5389, 5.4814]
+
+    dataframe = read_processed(config, end=pd.Timestamp('2021-11-17'))
+    assert dataframe['Date'].tolist() == list(pd.to_datetime(
+        ['2021-11-17', '2021-11-16']))
+    assert np.isnan(dataframe['EUR'][0])
+
+
+def test_database_upsert(tmp_path):
+    """
+    This function performs the test of the new rows upserted in the
+    database, replacing the rates of the same dates
+    """
+    config = make_config(tmp_path)
+    processed = make_dataframe()
+    write_processed(processed.iloc[1:], config)
+
+    new_rows = processed.iloc[:2].copy()
+    new_rows.loc[1, 'EUR'] = 0.8812
+    write_processed(processed, config, new_rows)
+
+    expected = processed.copy()
+    expected.loc[1, 'EUR'] = 0.8812
+    pd.testing.assert_frame_equal(read_processed(config), expected,
+                                  check_dtype=False)
+
+
+def test_database_writer(tmp_path):
+    """
+    This function performs the test of the streaming writer, whose rates
+    are only read after it is closed, and of an aborted write
+    """
+    config = make_config(tmp_path)
+    write_processed(make_dataframe().iloc[2:], config)
+
+    writer = ProcessedWriter(config)
+    writer.write(make_dataframe().iloc[:2])
+    assert len(read_processed(config)) == 1
+    writer.write(make_dataframe().iloc[2:])
+    assert tmp_path / 'rates.sqlite' in writer.close()
+    pd.testing.assert_frame_equal(read_processed(config), make_dataframe(),
+                                  check_dtype=False)
+
+    writer = ProcessedWriter(config)
+    writer.write(make_dataframe().iloc[:1])
+    writer.abort()
+    assert len(RateDatabase(tmp_path / 'rates.sqlite').read()) == 3
+
+
+def test_database_intraday_dates(tmp_path):
+    """
+    This function performs the test of the dates with a time, which the
+    database must keep and select by their day
+    """
+    config = make_config(tmp_path)
+    dataframe = make_dataframe()
+    dataframe.loc[0, 'Date'] = pd.Timestamp('2021-11-18 12:00:00.5')
+    dataframe.loc[1, 'Date'] = pd.Timestamp('2021-11-18 09:30')
+    write_processed(dataframe, config)
+    pd.testing.assert_frame_equal(read_processed(config), dataframe,
+                                  check_dtype=False)
+
+    selected = read_processed(config, start='2021-11-18', end='2021-11-18')
+    assert selected['Date'].tolist() == dataframe['Date'].iloc[:2].tolist()
+    assert len(read_processed(config, end='2021-11-17')) == 1
+
+
+def test_write_processed_interrupted(tmp_path, monkeypatch):
+    """
+    This function performs the test of an export interrupted while the csv
+    file is written, that must leave the previous file
+    """
+    config = make_config(tmp_path)
+    config['etl']['database']['enabled'] = False
+    write_processed(make_dataframe(), config)
+    previous = (tmp_path / 'processed_data.csv').read_text()
+
+    def to_csv(*_args, **_kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(pd.DataFrame, 'to_csv', to_csv)
+    with pytest.raises(KeyboardInterrupt):
+        write_processed(make_dataframe().iloc[:1], config)
+    assert (tmp_path / 'processed_data.csv').read_text() == previous
+    assert not (tmp_path / 'processed_data.csv.tmp').exists()
+
+
+def test_processing_database(tmp_path):
+    """
+    This function performs the test of the ETL with the database enabled,
+    in full and incremental mode, that must equal the processed files
+    """
+    config = parse_config("./config.yml")
+    config['etl']['processed_path'] = str(tmp_path / 'processed_data.csv')
+    config['etl']['database'] = {'enabled': True,
+                                 'path': str(tmp_path / 'rates.sqlite')}
+    for key in config['log']:
+        config['log'][key] = str(tmp_path / f'{key}.log')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+
+    etl = ExchangeETL(str(config_path))
+    etl.processing()
+    full = etl.dataframes[-1].reset_index(drop=True)
+    pd.testing.assert_frame_equal(read_processed(etl.config), full,
+                                  check_dtype=False)
+
+    write_processed(full.iloc[10:], etl.config)
+    etl.processing(incremental=True)
+    pd.testing.assert_frame_equal(read_processed(etl.config), full,
+                                  check_dtype=False)
+
+    dataframe = read_processed(etl.config, start='2021-01-01',
+                               end='2021-01-31', currencies=['BRL'])
+    assert dataframe['Date'].between('2021-01-01', '2021-01-31').all()
+    assert len(dataframe) == (full['Date'].between('2021-01-01',
+                                                   '2021-01-31')).sum()
@@ -0,0 +1,62 @@
+"""
+This module implements the tests of the downsampling of the lines
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from scripts.downsampling import minmax, lttb, get_downsampler
+
+
+@pytest.fixture(name="walk")
+def fixture_walk() -> tuple:
+    """
+    This fixture creates an intraday random walk with a spike
+    """
+    dates = pd.date_range("2020-01-01", periods=100000, freq="min")
+    rates = 5.0 + np.cumsum(np.random.default_rng(0).normal(0, 0.001, 100000))
+    rates[54321] = 9.0
+    return dates.values, rates
+
+
+def test_minmax(walk):
+    """
+    This function performs the test of the minmax downsampling, that must
+    keep the extremes and the first and last points of each bucket
+    """
+    dates, rates = walk
+    rates = rates.copy()
+    rates[10] = np.nan
+    x_values, y_values = minmax(dates, rates, 500)
+
+    assert len(x_values) <= 4 * 500
+    assert x_values.dtype == dates.dtype and np.all(np.diff(x_values) > 0)
+    assert x_values[0] == dates[0] and x_values[-1] == dates[-1]
+    assert np.nanmax(y_values) == 9.0
+    assert np.nanmin(y_values) == np.nanmin(rates)
+
+    small = minmax(dates[:100], rates[:100], 500)
+    assert len(small[0]) == 100
+
+
+def test_lttb(walk):
+    """
+    This function performs the test of the lttb downsampling, that must
+    keep one point of each bucket, the first and the last points and the spike
+    """
+    dates, rates = walk
+    x_values, y_values = lttb(dates, rates, 500)
+
+    assert len(x_values) == 502
+    assert np.all(np.diff(x_values) > 0)
+    assert x_values[0] == dates[0] and x_values[-1] == dates[-1]
+    assert y_values.max() == 9.0
+
+
+def test_get_downsampler():
+    """
+    This function performs the test of the selection of the method
+    """
+    assert get_downsampler(None) is None
+    assert get_downsampler("lttb") is lttb
+    with pytest.raises(ValueError):
+        get_downsampler("mean")
@@ -3,8 +3,28 @@ This module implements all the tests
 """
 import pandas as pd
 import numpy as np
-from scripts.etl import ExchangeETL
-from scripts.utils import set_logger, parse_config
+import pytest
+import yaml
+from scripts.etl import ExchangeETL, iter_newest_first
+from scripts.sources import read_csv_schema, read_csv_since
+from scripts.store import empty_processed, read_processed, write_processed
+from scripts.utils import (configure_logging, flush_logging, parse_config,
+                           set_logger)
+
+
+@pytest.fixture(name="tmp_config")
+def fixture_tmp_config(tmp_path) -> str:
+    """
+    This fixture creates a config file exporting the processed store
+    and the logs to tmp_path
+    """
+    config = parse_config("./config.yml")
+    config['etl']['processed_path'] = str(tmp_path / 'processed_data.csv')
+    for key in config['log']:
+        config['log'][key] = str(tmp_path / f'{key}.log')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+    return str(config_path)
 
 
 def validate_columns(new_columns: dict,
@@ -48,6 +68,34 @@ def test_set_logger():
     assert logger is not None
 
 
+def test_set_logger_once(tmp_path):
+    """
+    This function performs the test of a logger configured several times,
+    whose records must be written once, and of the rotation of its file
+    """
+    log_path = tmp_path / 'test.log'
+    configure_logging({'max_bytes': 2000, 'backup_count': 1,
+                       'levels': {'test_set_logger_once': 'WARNING'}})
+    try:
+        for _ in range(3):
+            logger = set_logger("test_set_logger_once", str(log_path))
+        assert len(logger.handlers) == 1
+        logger.info("not written")
+        logger.warning("written once")
+        flush_logging()
+        assert log_path.read_text().count("written once") == 1
+        assert "not written" not in log_path.read_text()
+
+        for number in range(100):
+            logger.warning("record %d", number)
+        flush_logging()
+        assert log_path.with_name('test.log.1').exists()
+        assert not log_path.with_name('test.log.2').exists()
+        assert "record 99" in log_path.read_text()
+    finally:
+        configure_logging()
+
+
 def test_parse_config():
     """
     This function performs the test of the parse_config function
@@ -91,3 +139,177 @@ def test_change_column_type_datetime():
     dtype = np.datetime64
     valid = etl.change_column_type(0, column, mtype)
     assert validate_type(dtype, valid, etl.dataframes[0].dtypes[column].type)
+
+
+def test_load_dataframe_schema():
+    """
+    This function performs the test of the load_dataframe function
+    with a schema, for the c and pyarrow engines
+    """
+    data_path = './data/ECB_FX_USD-base.csv'
+    schema = {'columns': {'Date': 'datetime', 'BRL': 'float'},
+              'skiprows': [1]}
+    for engine in ['c', 'pyarrow']:
+        if engine == 'pyarrow':
+            pytest.importorskip('pyarrow')
+        dataframe = read_csv_schema(data_path, schema, engine)
+        assert list(dataframe.columns) == ['Date', 'BRL']
+        assert dataframe.dtypes['Date'].type == np.datetime64
+        assert dataframe.dtypes['BRL'] == np.float64
+        assert dataframe['Date'].iloc[0] == pd.Timestamp('2021-11-18')
+
+
+def test_load_dataframe_schema_na_values():
+    """
+    This function performs the test of the na_values of the schema
+    """
+    data_path = './data/Foreign_Exchange_Rates.csv'
+    schema = {'columns': {'Time Serie': 'datetime',
+                          'BRAZIL - REAL/US$': 'float'},
+              'na_values': ['ND']}
+    etl = ExchangeETL()
+    assert etl.load_dataframe(1, data_path, schema)
+    assert etl.dataframes[1]['BRAZIL - REAL/US$'].dtype == np.float64
+    assert etl.dataframes[1]['BRAZIL - REAL/US$'].isna().any()
+
+
+def test_read_csv_since():
+    """
+    This function performs the test of the read_csv_since function
+    """
+    data_path = './data/ECB_FX_USD-base.csv'
+    schema = {'columns': {'Date': 'datetime', 'BRL': 'float'},
+              'skiprows': [1]}
+    dataframe = read_csv_since(data_path, schema,
+                               pd.Timestamp('2021-11-10'), 4)
+    assert len(dataframe) == 6
+    assert (dataframe['Date'] > pd.Timestamp('2021-11-10')).all()
+
+
+def test_read_csv_since_order(tmp_path):
+    """
+    This function performs the test of the read_csv_since function on
+    chunks of one row and on chunks of a single date, whose order is only
+    known from the next dates
+    """
+    schema = {'columns': {'Date': 'datetime', 'BRL': 'float'}}
+    dates = ['2021-11-08', '2021-11-08', '2021-11-09', '2021-11-10',
+             '2021-11-11']
+    ascending = pd.DataFrame({'Date': dates, 'BRL': range(5)})
+    ascending.to_csv(tmp_path / 'ascending.csv', index=False)
+    ascending.iloc[::-1].to_csv(tmp_path / 'descending.csv', index=False)
+
+    for name in ['ascending', 'descending']:
+        for chunksize in [1, 2]:
+            dataframe = read_csv_since(str(tmp_path / f'{name}.csv'), schema,
+                                       pd.Timestamp('2021-11-08'), chunksize)
+            assert sorted(dataframe['BRL']) == [2.0, 3.0, 4.0]
+
+
+def test_processing_incremental(tmp_config):
+    """
+    This function performs the test of the incremental processing,
+    that must give the same dataframe of the full processing
+    """
+    etl = ExchangeETL(tmp_config)
+    etl.processing()
+    full = read_processed(etl.config)
+
+    write_processed(full.iloc[10:], etl.config)
+    etl.processing(incremental=True)
+    pd.testing.assert_frame_equal(read_processed(etl.config), full)
+
+    etl.processing(incremental=True)
+    pd.testing.assert_frame_equal(read_processed(etl.config), full)
+
+
+def test_processing_jobs(tmp_config):
+    """
+    This function performs the test of the sources loaded in a process pool
+    """
+    etl = ExchangeETL(tmp_config)
+    etl.processing()
+    sequential = read_processed(etl.config)
+    etl.processing(jobs=2)
+    pd.testing.assert_frame_equal(read_processed(etl.config), sequential)
+
+
+def test_processing_currencies(tmp_config):
+    """
+    This function performs the test of the processing of all the currencies
+    shared by the sources, with the real equal to the processing of one currency
+    """
+    etl = ExchangeETL(tmp_config)
+    etl.processing()
+    real = read_processed(etl.config)
+
+    etl.config['etl']['currencies'] = 'all'
+    etl.processing()
+    currencies = read_processed(etl.config)
+    assert {'BRL', 'EUR', 'CNY', 'INR', 'KRW', 'ZAR'} <= set(currencies.columns)
+    assert 'LKR' not in currencies.columns
+    assert (currencies.dtypes.drop('Date') == np.float64).all()
+
+    merged = currencies[['Date', 'BRL']].dropna().reset_index(drop=True)
+    pd.testing.assert_frame_equal(merged, real)
+
+
+def test_select_currencies_unknown(tmp_config):
+    """
+    This function performs the test of a currency missing in the sources
+    """
+    etl = ExchangeETL(tmp_config)
+    etl.config['etl']['currencies'] = ['BRL', 'XYZ']
+    with pytest.raises(ValueError):
+        etl.select_currencies()
+
+
+def test_processing_streaming(tmp_config):
+    """
+    This function performs the test of the streaming processing, that must
+    give the same dataframe of the processing in memory
+    """
+    etl = ExchangeETL(tmp_config)
+    etl.config['etl']['currencies'] = 'all'
+    etl.processing()
+    in_memory = read_processed(etl.config)
+
+    etl.config['etl']['streaming'] = True
+    etl.config['etl']['chunksize'] = 500
+    etl.processing()
+    pd.testing.assert_frame_equal(read_processed(etl.config), in_memory)
+
+
+def test_iter_newest_first(tmp_path):
+    """
+    This function performs the test of the chunks yielded from the newest
+    date, that must only be spilled to disk for a source in ascending order
+    """
+    dates = pd.date_range("2020-01-01", periods=10)
+    frame = pd.DataFrame({'Date': dates, 'BRL': range(10)})
+    chunks = [frame.iloc[0:4], frame.iloc[4:7], frame.iloc[7:10]]
+    newest = frame.iloc[::-1].reset_index(drop=True)
+
+    descending = [chunk.iloc[::-1] for chunk in reversed(chunks)]
+    merged = pd.concat(iter_newest_first(iter(descending), tmp_path / 'desc'))
+    pd.testing.assert_frame_equal(merged.reset_index(drop=True), newest)
+    assert not (tmp_path / 'desc').exists()
+
+    merged = pd.concat(iter_newest_first(iter(chunks), tmp_path / 'asc'))
+    pd.testing.assert_frame_equal(merged.reset_index(drop=True), newest)
+    assert not list((tmp_path / 'asc').iterdir())
+
+    with pytest.raises(ValueError):
+        list(iter_newest_first(iter([descending[1], descending[0]]),
+                               tmp_path / 'mixed'))
+
+
+def test_empty_processed():
+    """
+    This function performs the test of the processed dataframe without rows
+    """
+    dataframe = empty_processed(['BRL', 'EUR'])
+    assert list(dataframe.columns) == ['Date', 'BRL', 'EUR']
+    assert dataframe.empty
+    assert dataframe.dtypes['Date'].type == np.datetime64
+    assert (dataframe.dtypes.drop('Date') == np.float64).all()
@@ -0,0 +1,164 @@
+"""
+This module implements the tests of the plots preprocessing
+"""
+import filecmp
+import io
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from matplotlib.dates import num2date
+from scripts.etl import ExchangeETL
+from scripts.plots import GeneratePlots, RenderJob, render_jobs
+from scripts.utils import parse_config
+
+
+def test_period_rows():
+    """
+    This function performs the test of the period_rows function, that must
+    select the same rows of a boolean filter
+    """
+    plots = GeneratePlots()
+    periods = {'lula': ['2003-01-01', '2011-01-01'],
+               'dilma': ['2010-01-01', '2017-01-01'],
+               'bolsonaro': ['2018-01-01', None]}
+    rows = plots.period_rows(periods)
+    dataframe = plots.dataframe.to_frame()
+    years = dataframe['Date'].dt.year
+
+    for name, (start, end) in periods.items():
+        expected = years >= int(start[:4])
+        if end is not None:
+            expected &= years < int(end[:4])
+        selected = plots.dataframe[rows[name]].to_frame()
+        pd.testing.assert_frame_equal(
+            selected, dataframe[expected].reset_index(drop=True))
+
+
+def test_plot_graph1_preprocessing():
+    """
+    This function performs the test of the rolling mean of each period,
+    that must equal the rolling mean of the period in descending order
+    """
+    plots = GeneratePlots()
+    plots.plot_graph1_preprocessing()
+
+    dataframe = plots.dataframe.to_frame()
+    years = dataframe['Date'].dt.year
+    temer = dataframe[years == 2017].iloc[::-1]
+    temer = temer.assign(BRL=temer['BRL'].rolling(2).mean()).dropna()
+    pd.testing.assert_series_equal(plots.temer.to_frame()['BRL'].iloc[::-1],
+                                   temer['BRL'], check_index=False,
+                                   check_exact=False)
+
+
+@pytest.fixture(name="currencies_config")
+def fixture_currencies_config(tmp_path) -> str:
+    """
+    This fixture processes the real and the yen to tmp_path and returns the
+    path of its config
+    """
+    config = parse_config("./config.yml")
+    config['etl']['currencies'] = ['BRL', 'JPY']
+    config['etl']['processed_path'] = str(tmp_path / 'processed_data.csv')
+    for key in config['log']:
+        config['log'][key] = str(tmp_path / f'{key}.log')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+    ExchangeETL(str(config_path)).processing()
+    return str(config_path)
+
+
+def test_render_jobs(tmp_path, currencies_config):
+    """
+    This function performs the test of the batch rendering, whose images
+    must not depend on the order of the jobs nor on the number of processes
+    """
+    charts = [('graph1', 'BRL', None, None),
+              ('graph2', 'BRL', '2019-06-01', None),
+              ('graph1', 'BRL', '2010-01-01', '2015-01-01'),
+              ('graph2', 'BRL', '2000-01-01', '2001-01-01'),
+              ('graph1', 'JPY', None, None),
+              ('graph2', 'JPY', None, None)]
+
+    outputs = {}
+    for name, processes, order in [('sequential', 1, 1),
+                                   ('reversed', 1, -1),
+                                   ('parallel', 2, 1)]:
+        jobs = [RenderJob(chart, currency,
+                          str(tmp_path / name / f'{number}.png'), start, end)
+                for number, (chart, currency, start, end)
+                in enumerate(charts)]
+        outputs[name] = sorted(render_jobs(jobs[::order], currencies_config,
+                                           processes=processes))
+
+    for sequential, other in zip(outputs['sequential'] * 2,
+                                 outputs['reversed'] + outputs['parallel']):
+        assert filecmp.cmp(sequential, other, shallow=False)
+
+
+def test_render_jobs_error(currencies_config, monkeypatch):
+    """
+    This function performs the test of a job failing in the batch
+    rendering, that must still release the figures of the templates
+    """
+    closed = []
+    monkeypatch.setattr(GeneratePlots, 'close',
+                        lambda plots: closed.append(plots))
+    jobs = [RenderJob('graph1', 'BRL', io.BytesIO()),
+            RenderJob('graph1', 'XYZ', io.BytesIO())]
+    with pytest.raises(ValueError, match="XYZ"):
+        render_jobs(jobs, currencies_config)
+    assert len(closed) == 1
+
+
+def test_render_job_layout(currencies_config):
+    """
+    This function performs the test of the limits, the ticks and the titles
+    of the charts, that must follow the currency and the dates of each job
+    """
+    plots = GeneratePlots(currencies_config)
+
+    plots.render_job(RenderJob('graph1', 'JPY', io.BytesIO()))
+    artists = plots.artists['plot1']
+    low, high = plots.templates['plot1'].figure.axes[0].get_ylim()
+    assert low < np.min(plots.dataframe.rates) and \
+        high > np.max(plots.dataframe.rates)
+    assert artists['title'].get_text() == "COTAÇÃO USD-JPY ENTRE 2000-2021"
+    assert artists['years']['fhc'].get_text() == "(2000-2002)"
+
+    plots.render_job(RenderJob('graph1', 'BRL', io.BytesIO(), '2010-01-01',
+                               '2015-01-01'))
+    assert artists['title'].get_text() == "COTAÇÃO USD-BRL ENTRE 2010-2014"
+    assert artists['years']['fhc'].get_text() == ""
+    axe = artists['years']['dilma'].axes
+    low, high = axe.get_xlim()
+    ticks = [tick for tick in axe.get_xticks() if low <= tick <= high]
+    assert {date.year for date in num2date(ticks)} <= \
+        {2010, 2011, 2012, 2013, 2014, 2015}
+
+    plots.render_job(RenderJob('graph2', 'BRL', io.BytesIO(), '2000-01-01',
+                               '2001-01-01'))
+    artists = plots.artists['plot2']
+    axe = plots.templates['plot2'].figure.axes[0]
+    assert [date.year for date in num2date(axe.get_xlim())] in \
+        ([1999, 2001], [2000, 2001])
+    assert artists['subtitle'].get_text() == \
+        "BRL-USD exchange rates in 2000"
+    assert not artists['peak'].get_visible()
+
+    plots.render_job(RenderJob('graph2', 'JPY', io.BytesIO()))
+    assert artists['title'].get_text().startswith("JPY-USD rate peaked at")
+    assert artists['peak'].get_visible()
+    plots.close()
+
+
+def test_plots_without_real(currencies_config):
+    """
+    This function performs the test of the plots of a processed dataframe
+    without the real, that must select its first currency
+    """
+    plots = GeneratePlots(currencies_config, currencies=['JPY'])
+    assert plots.currency == 'JPY'
+    plots.render_job(RenderJob('graph2', 'JPY', io.BytesIO()))
+    plots.close()
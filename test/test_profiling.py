@@ -0,0 +1,44 @@
+"""
+This module implements the tests of the profiling of the pipeline steps
+"""
+import json
+import logging
+import tracemalloc
+from scripts.profiling import StepProfiler, ProfileCollector
+
+
+def test_step_profiler(tmp_path):
+    """
+    This function performs the test of the StepProfiler, whose measures of
+    nested steps must reach the collector of the logger with their depth
+    """
+    logger = logging.getLogger("test_profiling")
+    logger.setLevel(logging.INFO)
+    collector = ProfileCollector()
+    logger.addHandler(collector)
+
+    profiler = StepProfiler(logger)
+    tracemalloc.start()
+    try:
+        with profiler.step("outer", rows_in=3) as outer:
+            with profiler.step("inner") as inner:
+                inner['rows_out'] = 2
+                buffer = bytearray(1 << 20)
+            del buffer
+            outer['rows_out'] = 1
+    finally:
+        tracemalloc.stop()
+        logger.removeHandler(collector)
+
+    inner, outer = collector.records
+    assert [inner['step'], inner['depth'], inner['rows_out']] == ['inner', 1, 2]
+    assert [outer['step'], outer['depth'], outer['rows_in'],
+            outer['rows_out']] == ['outer', 0, 3, 1]
+    assert outer['seconds'] >= inner['seconds'] >= 0
+    assert outer['traced_peak'] >= inner['traced_peak'] >= 1 << 20
+
+    collector.write(tmp_path / 'profile.json')
+    with open(tmp_path / 'profile.json', encoding="utf-8") as file:
+        summary = json.load(file)
+    assert summary['stage_seconds'] == {'test_profiling': outer['seconds']}
+    assert summary['slowest'][0] == 'test_profiling.outer'
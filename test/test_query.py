@@ -0,0 +1,63 @@
+"""
+This module implements the tests of the queries of the processed store
+"""
+import math
+import pandas as pd
+import pytest
+from scripts.query import RateStore
+from scripts.store import read_processed
+from scripts.utils import parse_config
+
+
+@pytest.fixture(name="processed")
+def fixture_processed() -> pd.DataFrame:
+    """
+    This fixture loads the processed dataframe of the repository
+    """
+    return read_processed(parse_config("./config.yml"))
+
+
+def test_rate_store_range(processed):
+    """
+    This function performs the test of the range queries, that must select
+    the same rows of a boolean filter
+    """
+    store = RateStore(processed)
+    rates = store['BRL', '2020-03-01':'2020-06-30']
+
+    dates = processed['Date']
+    expected = processed[(dates >= '2020-03-01') & (dates <= '2020-06-30')]
+    expected = expected.set_index('Date')['BRL'].dropna().sort_index()
+    pd.testing.assert_series_equal(rates, expected)
+    assert len(store['BRL']) == processed['BRL'].notna().sum()
+
+    between = store.between('2020-03-01', '2020-03-31', ['BRL'])
+    assert list(between.columns) == ['BRL'] and len(between) > 0
+
+
+def test_rate_store_asof_and_resample(processed):
+    """
+    This function performs the test of the as-of and resample queries
+    """
+    store = RateStore(processed)
+    series = processed.set_index('Date')['BRL'].dropna().sort_index()
+
+    # a saturday takes the rate of the friday before it
+    assert store['BRL', '2020-03-07'] == series.loc['2020-03-06']
+    assert math.isnan(store.asof('BRL', '1990-01-01'))
+
+    monthly = store.resample('BRL', 'MS', '2020-01-01', '2020-12-31')
+    march = series.loc['2020-03']
+    assert len(monthly) == 12
+    assert list(monthly.loc['2020-03-01']) == [march.iloc[0], march.max(),
+                                               march.min(), march.iloc[-1]]
+
+    with pytest.raises(ValueError):
+        store.rate('XYZ')
+
+
+def test_rate_store_from_config():
+    """
+    This function performs the test of the reuse of the loaded store
+    """
+    assert RateStore.from_config() is RateStore.from_config()
@@ -0,0 +1,39 @@
+"""
+This module implements the tests of the rendering of the charts
+"""
+import matplotlib.pyplot as plt
+from scripts.rendering import FigureTemplate
+
+
+def build_chart(figure, series):
+    """
+    This function draws a chart with one subplot and one line
+    """
+    axe = figure.add_subplot()
+    axe.set_ylim(0.0, 10.0)
+    axe.set_title('chart')
+    line, = axe.plot(*series['line'])
+    return {'line': [line]}
+
+
+def test_figure_template(tmp_path):
+    """
+    This function performs the test of the FigureTemplate, that must
+    build the figure once, replace the data of its lines and rescale only
+    the x axis, without registering the figure in pyplot
+    """
+    template = FigureTemplate(build_chart)
+    template.render({'line': ([0, 1, 2], [1, 2, 3])}, tmp_path / 'a.png')
+    figure = template.figure
+    template.render({'line': ([10, 20, 30], [4, 5, 6])}, tmp_path / 'b.png')
+
+    assert template.figure is figure and template.renders == 2
+    axe = figure.axes[0]
+    assert list(axe.lines[0].get_xdata()) == [10, 20, 30]
+    assert axe.get_xlim()[0] < 10 and axe.get_xlim()[1] > 30
+    assert axe.get_ylim() == (0.0, 10.0)
+    assert (tmp_path / 'a.png').is_file() and (tmp_path / 'b.png').is_file()
+    assert not plt.get_fignums()
+
+    template.close()
+    assert template.figure is None
@@ -0,0 +1,63 @@
+"""
+This module implements the tests of the command line of the pipeline
+"""
+import subprocess
+import sys
+import yaml
+from click.testing import CliRunner
+from run import build_graph, cli
+from scripts.commands import serve
+from scripts.context import PipelineContext
+from scripts.utils import parse_config
+
+
+def test_status_imports(tmp_path):
+    """
+    This function performs the test of the command status, that must
+    report the stages without importing pandas nor matplotlib
+    """
+    config = parse_config("./config.yml")
+    config['build']['manifest_path'] = str(tmp_path / 'manifest.json')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+
+    code = ("import sys\n"
+            "from click.testing import CliRunner\n"
+            "from run import cli\n"
+            f"result = CliRunner().invoke(cli, ['status', r'{config_path}'])\n"
+            "print(result.output, end='')\n"
+            "print(sorted({'pandas', 'matplotlib'} & set(sys.modules)))\n")
+    output = subprocess.run([sys.executable, "-c", code], check=True,
+                            capture_output=True, text=True).stdout
+    assert output.splitlines() == ["etl: outdated", "plot1: outdated",
+                                   "plot2: outdated", "[]"]
+    assert cli.commands['serve'] is serve
+
+    result = CliRunner().invoke(cli, ['status', str(config_path),
+                                      '--exit-code'])
+    assert result.exit_code == 1
+
+
+def test_plot_stages_config(tmp_path):
+    """
+    This function performs the test of the fingerprints of the plot stages,
+    that must only change with the settings read by each stage
+    """
+    config = parse_config("./config.yml")
+    config['build']['manifest_path'] = str(tmp_path / 'manifest.json')
+    config['plots']['render_jobs'] = [{'chart': 'graph1', 'currency': 'BRL',
+                                       'output': str(tmp_path / 'chart.png')}]
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+
+    def fingerprints() -> dict:
+        graph = build_graph(PipelineContext(str(config_path)))
+        return {name: graph.fingerprint(stage)
+                for name, stage in graph.stages.items()}
+
+    before = fingerprints()
+    config['plots']['plot2_path'] = str(tmp_path / 'plot2.png')
+    config_path.write_text(yaml.safe_dump(config))
+    after = fingerprints()
+    assert [name for name in before if before[name] != after[name]] == \
+        ['plot2']
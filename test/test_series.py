@@ -0,0 +1,129 @@
+"""
+This module implements the tests of the compact series store
+"""
+import filecmp
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from scripts.etl import ExchangeETL
+from scripts.paths import series_index_path
+from scripts.plots import GeneratePlots
+from scripts.query import RateStore
+from scripts.series import SeriesStore
+from scripts.store import read_processed
+from scripts.utils import parse_config
+
+
+@pytest.fixture(name="processed")
+def fixture_processed() -> pd.DataFrame:
+    """
+    This fixture loads the processed dataframe of the repository
+    """
+    return read_processed(parse_config("./config.yml"))
+
+
+def test_compact_series(processed):
+    """
+    This function performs the test of the queries of a series, that must
+    answer the same rates of the RateStore
+    """
+    series = SeriesStore.from_processed(processed)['BRL']
+    rates = RateStore(processed)
+    assert series.days.dtype == np.int32 and len(series) == \
+        processed['BRL'].notna().sum()
+
+    period = series.between('2020-03-01', '2020-06-30')
+    expected = rates['BRL', '2020-03-01':'2020-06-30']
+    pd.testing.assert_series_equal(period.to_series(), expected,
+                                   check_index_type=False)
+    assert np.shares_memory(period.rates, series.rates)
+    assert series.asof('2020-03-07') == rates['BRL', '2020-03-07']
+    assert np.isnan(series.asof('1990-01-01'))
+    assert len(series.between('2030-01-01', '2031-01-01')) == 0
+
+    smoothed = series.rolling_pairs().to_series()
+    pd.testing.assert_series_equal(
+        smoothed, series.to_series().rolling(2).mean().shift(-1),
+        check_exact=False)
+
+    assert SeriesStore.from_processed(processed, 'float32').nbytes == \
+        len(series) * 8
+
+
+def test_series_store_files(processed, tmp_path):
+    """
+    This function performs the test of the store written to a directory,
+    whose arrays must be mapped in memory and mapped again when pickled,
+    and whose currencies with the same dates must share the days
+    """
+    processed = processed.assign(EUR=processed['BRL'] / 4)
+    SeriesStore.from_processed(processed).write(tmp_path)
+    store = SeriesStore.open(tmp_path)
+    assert store.currencies == ['BRL', 'EUR']
+    assert store['EUR'].days is store['BRL'].days
+    assert not (tmp_path / 'EUR.days.npy').exists()
+    assert store.nbytes == len(store['BRL']) * (4 + 8 + 8)
+    assert isinstance(store['BRL'].rates, np.memmap)
+    assert isinstance(store['BRL'][10:20].rates, np.memmap)
+
+    copy = pickle.loads(pickle.dumps(store))
+    assert isinstance(copy['BRL'].days, np.memmap)
+    np.testing.assert_array_equal(copy['BRL'].rates, store['BRL'].rates)
+    with pytest.raises(ValueError):
+        store['XYZ']  # pylint: disable=pointless-statement
+
+
+def test_series_store_intraday(tmp_path):
+    """
+    This function performs the test of the dates with a time of day, that
+    must be kept in the series instead of their day
+    """
+    dates = ['2021-11-18 09:00', '2021-11-18 17:30', '2021-11-19 09:00']
+    processed = pd.DataFrame({'Date': pd.to_datetime(dates),
+                              'BRL': [5.50, 5.52, 5.54]})
+    series = SeriesStore.from_processed(processed)['BRL']
+    assert series.unit == 'us' and series.days.dtype == np.int64
+    np.testing.assert_array_equal(series.dates,
+                                  processed['Date'].to_numpy())
+    assert series.asof('2021-11-18 12:00') == 5.50
+    assert len(series.between('2021-11-18 09:00', '2021-11-18 17:30')) == 2
+
+    SeriesStore.from_processed(processed).write(tmp_path)
+    store = SeriesStore.open(tmp_path)
+    pd.testing.assert_series_equal(store['BRL'].to_series(),
+                                   series.to_series())
+
+    # the arrays of an other export do not match the index
+    SeriesStore.from_processed(processed.iloc[1:]).write(tmp_path / 'other')
+    (tmp_path / 'other' / 'BRL.rates.npy').replace(tmp_path / 'BRL.rates.npy')
+    with pytest.raises(ValueError, match="index"):
+        SeriesStore.open(tmp_path)
+
+
+def test_plots_series_store(tmp_path):
+    """
+    This function performs the test of the plots of the series store
+    exported by the ETL, that must equal the plots of the processed dataframe
+    """
+    config = parse_config("./config.yml")
+    config['etl']['processed_path'] = str(tmp_path / 'processed_data.csv')
+    config['series']['enabled'] = True
+    config['series']['path'] = str(tmp_path / 'series')
+    for key in config['log']:
+        config['log'][key] = str(tmp_path / f'{key}.log')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+
+    ExchangeETL(str(config_path)).processing()
+    assert series_index_path(config).is_file()
+
+    mapped = GeneratePlots(str(config_path))
+    loaded = GeneratePlots(str(config_path), read_processed(config))
+    assert mapped.store.directory is not None
+    assert loaded.store.directory is None
+    mapped.plot_graph2(str(tmp_path / 'mapped.png'))
+    loaded.plot_graph2(str(tmp_path / 'loaded.png'))
+    assert filecmp.cmp(tmp_path / 'mapped.png', tmp_path / 'loaded.png',
+                       shallow=False)
@@ -0,0 +1,113 @@
+"""
+This module implements the tests of the server of the rates and charts
+"""
+import asyncio
+import json
+import os
+import pytest
+import yaml
+from scripts.paths import store_path
+from scripts.query import RateStore
+from scripts.serve import ChartCache, RateServer
+from scripts.store import read_processed, write_processed
+from scripts.utils import parse_config
+
+
+@pytest.fixture(name="tmp_config")
+def fixture_tmp_config(tmp_path) -> str:
+    """
+    This fixture creates a config file with a copy of the processed store
+    and the logs in tmp_path
+    """
+    config = parse_config("./config.yml")
+    processed = read_processed(config)
+    config['etl']['processed_path'] = str(tmp_path / 'processed_data.csv')
+    for key in config['log']:
+        config['log'][key] = str(tmp_path / f'{key}.log')
+    write_processed(processed, config)
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+    return str(config_path)
+
+
+async def get(port: int, target: str) -> tuple:
+    """
+    This function sends a GET request to the server
+    Args:
+        port (int): port of the server.
+        target (str): path and query string of the request.
+    Returns:
+        tuple: the status code, the headers and the body of the response.
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n"
+                 .encode())
+    head, _, body = (await reader.read()).partition(b"\r\n\r\n")
+    writer.close()
+    lines = head.decode().split("\r\n")
+    headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, body
+
+
+def test_chart_cache():
+    """
+    This function performs the test of the cache, that must discard the
+    least recently used image
+    """
+    cache = ChartCache(2)
+    cache.put('a', b'a')
+    cache.put('b', b'b')
+    assert cache.get('a') == b'a'
+    cache.put('c', b'c')
+    assert cache.get('b') is None and cache.get('a') == b'a'
+    assert cache.stats() == {'images': 2, 'size': 2, 'hits': 2, 'misses': 1}
+
+
+def test_rate_server(tmp_config):
+    """
+    This function performs the test of the answers of the server, of the
+    cache of the charts and of the reload of a new processed store
+    """
+    server = RateServer(tmp_config)
+    processed = read_processed(server.config)
+
+    async def scenario():
+        listening = await server.start("127.0.0.1", 0)
+        port = listening.sockets[0].getsockname()[1]
+
+        status, _, body = await get(port, "/rates?currency=BRL"
+                                          "&start=2020-03-01&end=2020-03-31")
+        expected = RateStore(processed)['BRL', '2020-03-01':'2020-03-31']
+        assert status == 200
+        assert json.loads(body)['rates'] == expected.tolist()
+
+        status, _, body = await get(port, "/asof?currency=BRL&date=2020-03-07")
+        assert json.loads(body)['rate'] == expected.loc['2020-03-06']
+        assert (await get(port, "/rates?currency=XYZ"))[0] == 400
+        assert (await get(port, "/unknown"))[0] == 404
+
+        target = "/chart?chart=graph2&currency=BRL&start=2019-06-01"
+        first, second = await asyncio.gather(get(port, target),
+                                             get(port, target))
+        assert first[0] == 200 and first[1]['Content-Type'] == "image/png"
+        assert first[2] == second[2] and first[2][:4] == b"\x89PNG"
+        await get(port, "/chart?chart=graph2&currency=BRL&start=2019-6-1")
+        assert server.cache.stats()['images'] == 1
+
+        # a new processed store is loaded and the charts are discarded
+        write_processed(processed.iloc[100:], server.config)
+        path = store_path(server.config)
+        os.utime(path, ns=(server.version + 1, server.version + 1))
+        assert await server.reload()
+        assert server.cache.stats()['images'] == 0
+        status, _, body = await get(port, "/health")
+        assert json.loads(body)['last_date'] == \
+            str(processed['Date'].iloc[100:].max().date())
+
+        listening.close()
+        await listening.wait_closed()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        server.close()
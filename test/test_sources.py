@@ -0,0 +1,144 @@
+"""
+This module implements the tests of the source adapters and of their merge
+by precedence
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from scripts.etl import ExchangeETL
+from scripts.sources import (SourceAdapter, SOURCE_ADAPTERS, create_sources,
+                             merge_sources, parse_precedence,
+                             register_adapter, streaming_sources)
+from scripts.store import read_processed
+from scripts.utils import parse_config
+
+
+class FrameSource(SourceAdapter):
+    """
+    This class is an adapter of rates given in the settings of the source
+    """
+
+    def read(self, schema, engine="c", since=None, chunksize=1000):
+        """
+        This function returns the rates of the settings after since
+        """
+        frame = pd.DataFrame(self.schema['rows'], columns=list(schema['columns']))
+        frame['day'] = pd.to_datetime(frame['day'])
+        return frame if since is None else frame[frame['day'] > since]
+
+    def iter_chunks(self, schema, chunksize):
+        """
+        This function returns the rates of the settings in one chunk
+        """
+        yield self.read(schema)
+
+
+def frame(dates: list, rates: list) -> pd.DataFrame:
+    """
+    This function creates the cleaned rows of a source
+    """
+    return pd.DataFrame({'Date': pd.to_datetime(dates), 'BRL': rates})
+
+
+def test_merge_sources():
+    """
+    This function performs the test of the merge, that must take each date
+    from the source with the highest precedence that has it
+    """
+    frames = {'a': frame(['2020-01-01', '2020-01-03', '2020-02-03'],
+                         [1.0, 3.0, 5.0]),
+              'b': frame(['2020-01-02', '2020-01-03', '2020-02-04'],
+                         [2.0, 30.0, 6.0])}
+    ranges = parse_precedence(
+        [{'start': '2020-02-01', 'end': None, 'sources': ['b']},
+         {'start': None, 'end': '2020-02-01', 'sources': ['a', 'b']}],
+        ['a', 'b'])
+    merged = merge_sources(frames, ranges, ['BRL'])
+    pd.testing.assert_frame_equal(
+        merged, frame(['2020-02-04', '2020-01-03', '2020-01-02', '2020-01-01'],
+                      [6.0, 3.0, 2.0, 1.0]))
+
+    assert [name for name, _ in streaming_sources(ranges[1:])] == ['b']
+    with pytest.raises(ValueError):
+        streaming_sources(ranges)
+    with pytest.raises(ValueError):
+        parse_precedence([{'start': None, 'end': '2020-02-01',
+                           'sources': ['a']},
+                          {'start': '2020-01-01', 'end': None,
+                           'sources': ['b']}], ['a', 'b'])
+    with pytest.raises(ValueError):
+        parse_precedence([{'sources': ['c']}], ['a', 'b'])
+    with pytest.raises(ValueError):
+        create_sources([{'name': 'a', 'adapter': 'xml', 'path': 'a.xml',
+                         'schema': {}}])
+
+
+def test_merge_sources_currencies():
+    """
+    This function performs the test of the merge of many currencies, that
+    must take each rate from the source with the highest precedence that
+    has a rate of its currency at the date
+    """
+    frames = {'a': pd.DataFrame({'Date': pd.to_datetime(['2020-01-01',
+                                                         '2020-01-02']),
+                                 'BRL': [1.0, np.nan], 'EUR': [0.9, 0.8]}),
+              'b': pd.DataFrame({'Date': pd.to_datetime(['2020-01-02']),
+                                 'BRL': [20.0], 'EUR': [80.0]})}
+    ranges = parse_precedence([{'start': None, 'end': None,
+                                'sources': ['a', 'b']}], ['a', 'b'])
+    merged = merge_sources(frames, ranges, ['BRL', 'EUR'])
+    assert merged['BRL'].tolist() == [20.0, 1.0]
+    assert merged['EUR'].tolist() == [0.8, 0.9]
+
+
+def test_register_abstract_adapter():
+    """
+    This function performs the test of an adapter that does not implement
+    the reading of its source, that must not be registered
+    """
+    class PartialSource(SourceAdapter):
+        """
+        This class reads its source whole but not in chunks
+        """
+
+        def read(self, schema, engine="c", since=None, chunksize=1000):
+            return pd.DataFrame()
+
+    with pytest.raises(ValueError, match="iter_chunks"):
+        register_adapter('partial', PartialSource)
+
+
+def test_processing_registered_adapter(tmp_path):
+    """
+    This function performs the test of the ETL with a third source of a
+    registered adapter, whose dates must follow the dates of the files
+    """
+    register_adapter('frame', FrameSource)
+    config = parse_config("./config.yml")
+    config['etl']['processed_path'] = str(tmp_path / 'processed_data.csv')
+    config['etl']['sources'].append({
+        'name': 'frame', 'adapter': 'frame', 'path': 'memory',
+        'schema': {'columns': {'day': 'datetime'},
+                   'currency_columns': {'BRL': 'real'},
+                   'rows': [['2021-11-19', 5.5], ['2021-11-22', 5.6]]}})
+    config['etl']['precedence'][-1]['end'] = '2021-11-19'
+    config['etl']['precedence'].append(
+        {'start': '2021-11-19', 'end': None, 'sources': ['frame', 'ecb']})
+    for key in config['log']:
+        config['log'][key] = str(tmp_path / f'{key}.log')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+
+    try:
+        etl = ExchangeETL(str(config_path))
+        etl.processing()
+        processed = read_processed(etl.config)
+        assert list(processed['BRL'].iloc[:2]) == [5.6, 5.5]
+        assert processed['Date'].iloc[2] == pd.Timestamp('2021-11-18')
+
+        etl.config['etl']['streaming'] = True
+        with pytest.raises(ValueError):
+            etl.processing()
+    finally:
+        del SOURCE_ADAPTERS['frame']
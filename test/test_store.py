@@ -0,0 +1,51 @@
+"""
+This module implements the tests of the processed store
+"""
+import pandas as pd
+import numpy as np
+import pytest
+from scripts.store import write_processed, read_processed
+
+
+def make_config(tmp_path, store_format: str, keep_csv: bool = True) -> dict:
+    """
+    This function creates a config pointing the processed store to tmp_path
+    """
+    return {'etl': {'processed_path': str(tmp_path / 'processed_data.csv'),
+                    'processed_format': store_format,
+                    'keep_csv': keep_csv}}
+
+
+def make_dataframe() -> pd.DataFrame:
+    """
+    This function creates a small processed dataframe
+    """
+    return pd.DataFrame({'Date': pd.to_datetime(['2021-11-18', '2021-11-17']),
+                         'BRL': [5.5389, 5.4814]})
+
+
+@pytest.mark.parametrize('store_format', ['csv', 'parquet', 'feather'])
+def test_write_read_processed(tmp_path, store_format):
+    """
+    This function performs the test of the round trip of the processed store
+    """
+    if store_format != 'csv':
+        pytest.importorskip('pyarrow')
+    config = make_config(tmp_path, store_format)
+    paths = write_processed(make_dataframe(), config)
+    dataframe = read_processed(config)
+    assert (tmp_path / 'processed_data.csv') in paths
+    assert dataframe.dtypes['Date'].type == np.datetime64
+    assert dataframe.dtypes['BRL'] == np.float64
+    assert dataframe['BRL'].tolist() == [5.5389, 5.4814]
+
+
+def test_write_processed_without_csv(tmp_path):
+    """
+    This function performs the test of the columnar store replacing the csv
+    """
+    pytest.importorskip('pyarrow')
+    config = make_config(tmp_path, 'parquet', keep_csv=False)
+    paths = write_processed(make_dataframe(), config)
+    assert paths == [tmp_path / 'processed_data.parquet']
+    assert not (tmp_path / 'processed_data.csv').exists()
@@ -0,0 +1,125 @@
+"""
+This module implements the tests of the checks of the sources
+"""
+from pathlib import Path
+import pickle
+import pandas as pd
+import pytest
+import yaml
+from scripts.etl import ExchangeETL
+from scripts.store import processed_exists
+from scripts.utils import parse_config
+from scripts.validation import (SourceValidator, ValidationError,
+                                check_dates)
+
+# schema and settings of the synthetic source
+SCHEMA = {'columns': {'Date': 'datetime', 'BRL': 'float'}}
+SETTINGS = {'max_gap_days': 5, 'outlier_window': 5, 'outlier_threshold': 0.5}
+
+
+@pytest.fixture(name="source")
+def fixture_source() -> pd.DataFrame:
+    """
+    This fixture creates a source of business days in ascending order
+    """
+    dates = pd.bdate_range("2020-01-01", periods=30)
+    return pd.DataFrame({'Date': dates, 'BRL': 4.0 + 0.01 * pd.Series(range(30))})
+
+
+def test_source_validator(source):
+    """
+    This function performs the test of the checks, that must pass for a
+    good source and fail for each kind of bad source
+    """
+    validator = SourceValidator("source.csv", SCHEMA, SETTINGS, 'ascending')
+    assert validator.failures(source) == []
+
+    bad_sources = {
+        'missing': source.drop(columns='BRL'),
+        'dtype': source.astype({'BRL': str}),
+        'order': source.iloc[::-1],
+        'repeated': pd.concat([source, source.iloc[[3]]]).sort_values('Date'),
+        'gap': source.drop(index=range(10, 20)),
+        'outlier': source.assign(BRL=source['BRL'].where(source.index != 12,
+                                                         400.0))}
+    for name, frame in bad_sources.items():
+        validator = SourceValidator("source.csv", SCHEMA, SETTINGS,
+                                    'ascending')
+        failures = validator.failures(frame)
+        assert len(failures) == 1, name
+        with pytest.raises(ValidationError, match="source.csv"):
+            validator.check_failures(failures)
+
+
+def test_source_validator_chunks(source):
+    """
+    This function performs the test of the checks of a source read chunk by
+    chunk, whose order must also be checked between the chunks
+    """
+    validator = SourceValidator("source.csv", SCHEMA, SETTINGS, 'ascending')
+    assert validator.failures(source.iloc[:15]) == []
+    assert validator.failures(source.iloc[15:]) == []
+
+    validator = SourceValidator("source.csv", SCHEMA, SETTINGS, 'ascending')
+    validator.failures(source.iloc[15:])
+    assert validator.failures(source.iloc[:15])[0] == \
+        "the dates are not in ascending order from 2020-01-01"
+    with pytest.raises(ValueError):
+        check_dates(source['Date'], order='sorted')
+
+
+def test_check_dates_intraday():
+    """
+    This function performs the test of the checks of intraday dates, many
+    dates of a day being valid and only a repeated timestamp being reported
+    """
+    days = pd.bdate_range("2020-01-01", periods=10)
+    dates = pd.Series((days.values[:, None] + pd.to_timedelta(
+        [0, 8, 16], unit='h').values).ravel())
+    assert check_dates(dates, 'ascending', 5) == []
+
+    repeated = pd.concat([dates, dates.iloc[[4]]]).sort_values()
+    assert check_dates(repeated, 'ascending', 5) == \
+        ["1 dates are repeated, e.g. 2020-01-02 08:00:00"]
+
+
+def test_validation_error_pickle():
+    """
+    This function performs the test of the error unpickled, as when it is
+    raised in a process pool, that must keep its source and failures
+    """
+    error = ValidationError("source.csv", ["2 dates are missing"])
+    loaded = pickle.loads(pickle.dumps(error))
+    assert isinstance(loaded, ValidationError)
+    assert loaded.source == "source.csv"
+    assert loaded.failures == ["2 dates are missing"]
+    assert str(loaded) == str(error)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_processing_invalid_source(tmp_path, streaming):
+    """
+    This function performs the test of the ETL with a source holding a rate
+    multiplied by 100, that must be aborted before exporting the processed
+    dataset
+    """
+    config = parse_config("./config.yml")
+    lines = Path(config['etl']['sources'][1]['path']).read_text().splitlines()
+    fields = lines[3000].split(',')
+    fields[6] = str(float(fields[6]) * 100)
+    lines[3000] = ','.join(fields)
+    corrupted = tmp_path / 'Foreign_Exchange_Rates.csv'
+    corrupted.write_text('\n'.join(lines) + '\n')
+
+    config['etl']['sources'][1]['path'] = str(corrupted)
+    config['etl']['processed_path'] = str(tmp_path / 'processed_data.csv')
+    config['etl']['streaming'] = streaming
+    for key in config['log']:
+        config['log'][key] = str(tmp_path / f'{key}.log')
+    config_path = tmp_path / 'config.yml'
+    config_path.write_text(yaml.safe_dump(config))
+
+    etl = ExchangeETL(str(config_path))
+    with pytest.raises(ValidationError, match="REAL"):
+        etl.processing()
+    assert not processed_exists(etl.config)